@@ -1,20 +1,34 @@
 import os
-import sounddevice as sd
 import soundfile as sf
 import numpy as np
-import requests
+import elevenlabs_client
 from io import BytesIO
-import random
-import glob
 import time
-from motors_just_fcns import motorA_forward, motorB_forward, stop_motors, cleanup_motors
+from motors_just_fcns import motorA_forward, motorB_forward, stop_motors, cleanup_motors, get_motors
+from tts_stream import iter_tts_pcm, play_pcm_stream, prefetch, STREAM_SR
+from sentence_tts import SentenceSynthesizer, play_sentences
+from vad_recorder import record_until_silence
+from stt import STTSelector, default_backends
+from sound_bank import SoundBank
+from resampler import resample
+from lipsync import play_with_lipsync
+from word_timing import timings_from_envelope
+from envelope import envelope, jaw_speeds
+from conversation_memory import ConversationMemory
+from response_cache import ResponseCache, cache_key, normalize_text
+from canned_responses import CannedLibrary
+from lazy_init import once, once_per, probe_in_parallel
+from audio_devices import AudioDeviceManager
+from audio_engine import AudioEngine
+from barge_in import BargeIn, EchoGate
+from wake_word import WakeDetector, KeywordSpotter
+import itertools
 
 import asyncio
 import websockets
-import json
-from threading import Thread
-from http.server import SimpleHTTPRequestHandler, HTTPServer
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread, Event
+from static_server import make_server
+from broadcast_hub import BroadcastHub
 
 FRONTEND_HTML = """<!DOCTYPE html>
 <html lang="en">
@@ -466,6 +480,7 @@ FRONTEND_HTML = """<!DOCTYPE html>
 
         // Update speech text
         function updateSpeech(text) {
+            stopReveal();
             const speechElement = document.getElementById('speechText');
             speechElement.style.animation = 'none';
             setTimeout(() => {
@@ -474,66 +489,74 @@ FRONTEND_HTML = """<!DOCTYPE html>
             }, 10);
         }
 
-        // Terminal typing animation
-        let typingInterval = null;
+        // Text reveal: the backend sends [[seconds, endChar], ...] and text.slice(0, endChar)
+        // becomes visible that many seconds after the message arrives. Driven by
+        // requestAnimationFrame, so there is at most one DOM write per frame, and none
+        // at all on frames where the visible text didn't change.
+        let reveal = null;
 
-        function typeText(text, speed = 100) {
-            const speechElement = document.getElementById('speechText');
-            
-            console.log(`⌨️  typeText() called with: "${text}", speed: ${speed}ms`);
-            console.log(`   Speech element found:`, speechElement ? 'YES' : 'NO');
-            
-            // Clear any existing typing animation
-            if (typingInterval) {
-                console.log(`   Clearing existing typing interval`);
-                clearInterval(typingInterval);
-                typingInterval = null;
+        function stopReveal() {
+            if (reveal) {
+                cancelAnimationFrame(reveal.frame);
+                reveal = null;
             }
+        }
 
-            // Clear the text box
+        function revealText(text, times) {
+            const speechElement = document.getElementById('speechText');
+            stopReveal();
             speechElement.textContent = '';
-            console.log(`   Cleared text box, starting to type...`);
-            
-            let index = 0;
-            
-            typingInterval = setInterval(() => {
-                if (index < text.length) {
-                    speechElement.textContent += text[index];
-                    console.log(`   Typed character ${index + 1}/${text.length}: "${text[index]}" - Current text: "${speechElement.textContent}"`);
-                    index++;
+
+            const state = { frame: 0, next: 0, shown: 0, start: performance.now() };
+            reveal = state;
+
+            function step(now) {
+                if (reveal !== state) return;
+                const elapsed = (now - state.start) / 1000;
+                let end = state.shown;
+                while (state.next < times.length && times[state.next][0] <= elapsed) {
+                    end = times[state.next][1];
+                    state.next++;
+                }
+                if (end !== state.shown) {
+                    speechElement.textContent = text.slice(0, end);
+                    state.shown = end;
+                }
+                if (state.next < times.length) {
+                    state.frame = requestAnimationFrame(step);
                 } else {
-                    clearInterval(typingInterval);
-                    typingInterval = null;
-                    console.log(`✅ Finished typing complete text: "${speechElement.textContent}"`);
+                    if (state.shown !== text.length) speechElement.textContent = text;
+                    reveal = null;
                 }
-            }, speed);
+            }
+            state.frame = requestAnimationFrame(step);
         }
 
-        function clearSpeechBox() {
-            const speechElement = document.getElementById('speechText');
-            
-            console.log(`🧹 clearSpeechBox() called`);
-            
-            // Stop any typing animation
-            if (typingInterval) {
-                clearInterval(typingInterval);
-                typingInterval = null;
-                console.log(`   Stopped typing animation`);
+        // Terminal typing animation, one character every `speed` ms on the same renderer
+        function typeText(text, speed = 100) {
+            const times = [];
+            for (let i = 0; i < text.length; i++) {
+                times.push([i * speed / 1000, i + 1]);
             }
-            
-            // Clear the text
-            speechElement.textContent = '';
-            console.log(`   Text cleared`);
+            revealText(text, times);
+        }
+
+        function clearSpeechBox() {
+            stopReveal();
+            document.getElementById('speechText').textContent = '';
         }
 
+
         // API integration - call this from your Python backend
         function updateFromBackend(data) {
             if (data.mood) {
                 changeMood(data.mood);
             }
             if (data.response) {
-                // Use typing animation if specified, otherwise instant update
-                if (data.typing === true) {
+                // Word timings follow the voice; otherwise fall back to typing or an instant update
+                if (Array.isArray(data.word_times)) {
+                    revealText(data.response, data.word_times);
+                } else if (data.typing === true) {
                     const speed = data.typing_speed || 100; // Default 100ms per char
                     typeText(data.response, speed);
                 } else {
@@ -586,196 +609,401 @@ FRONTEND_HTML = """<!DOCTYPE html>
 </html>
 """
 
-class MyHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type','text/html')
-        self.end_headers()
-        self.wfile.write(FRONTEND_HTML.encode('utf-8'))
-
 def start_http_server():
-    server = HTTPServer(("0.0.0.0", HTTP_PORT), MyHandler)
+    # page + toxiccat-frontend/assets, pre-encoded once (gzip/br, ETags) on a threaded server
+    server = make_server(("0.0.0.0", HTTP_PORT), FRONTEND_HTML)
     print(f"🌐 UI → http://localhost:{HTTP_PORT}")
     server.serve_forever()
 
 
 # ---------------------------- CONFIG ----------------------------
-API_KEY = os.getenv("ELEVENLABS_API_KEY")
-if not API_KEY:
-    raise ValueError("Set ELEVENLABS_API_KEY environment variable!")
+# Hardware and API config are set up on first use (or by the startup probes in main),
+# so importing this module touches neither the audio devices, the GPIO nor the environment.
+@once
+def api_key():
+    key = os.getenv("ELEVENLABS_API_KEY")
+    if not key:
+        raise ValueError("Set ELEVENLABS_API_KEY environment variable!")
+    return key
 
 AGENT_ID = "agent_1601khf3r1jfff2saez29f6frfny"  # your agent ID
 VOICE_ID = "XdflFrQO8wbGpWMNZHFr"                 # your TTS voice ID
 
-RECORD_SECONDS = 5
+RECORD_SECONDS = 15  # max utterance length, recording ends on silence
+# "stream": start talking while the TTS response is still downloading
+# "sentences": synthesize sentences in parallel and play each as soon as it is ready
+# "full": download the whole clip first
+TTS_MODE = "stream"
+# If the real reply isn't playing this long after recording ends, a pre-rendered line fills the gap
+FALLBACK_AFTER_SECONDS = 2.0
 CAT_SOUNDS_FOLDER = "cat_sounds"
+# Sound effects are mixed over the reply instead of played before/after it
+BED_SOUND = "purr.wav"          # quiet purr under the whole reply (None to turn off)
+BED_GAIN = 0.4
+OUTRO_OVERLAP_SECONDS = 0.4     # the closing meow starts this long before the reply ends
+# Hands-free: a turn starts when the user starts talking, or, if this folder has WAV
+# recordings of a wake word ("hey kitty"), when they say it
+WAKE_WORDS_FOLDER = "wake_words"
 WS_PORT = 8765
 HTTP_PORT = 8000
 
-connected_clients = set()
+ui_hub = BroadcastHub()
+memory = ConversationMemory()   # rolling, token-bounded history sent with every agent call
+TTS_MODEL_ID = "eleven_monolingual_v1"
+# Frequent prompts skip the agent and TTS: user text -> reply, and reply -> decoded speech + envelope
+@once
+def reply_cache():
+    return ResponseCache("replies")
+
+@once
+def speech_cache():
+    return ResponseCache("speech")
 
 # ---------------------------- AUDIO DEVICE ----------------------------
-for i, d in enumerate(sd.query_devices()):
-    if d["max_input_channels"] > 0 and d["max_output_channels"] > 0:
-        sd.default.device = (i, i)
-        print("Using audio device:", d["name"])
-        DEFAULT_SR = int(d['default_samplerate'])
-        break
-else:
-    raise RuntimeError("No suitable input/output device found")
+# Remembered across restarts and re-resolved if the USB dongle is replugged
+@once
+def audio_devices():
+    return AudioDeviceManager()
+
+def default_sr():
+    return audio_devices().samplerate
+
+# One duplex stream for the whole session: every clip, reply and recording goes through it
+@once
+def audio_engine():
+    return audio_devices().keep_open(AudioEngine())
+
+# Speech-to-text: ElevenLabs scribe, plus offline Whisper if faster-whisper is installed;
+# each turn goes to whichever has been answering fastest (see stt.py)
+@once
+def stt():
+    return STTSelector(default_backends(api_key())).warm()
+
+# Always-on listener that starts each turn; its noise floor carries over between turns
+@once_per(default_sr)
+def wake_detector():
+    return WakeDetector(default_sr(), KeywordSpotter.from_folder(WAKE_WORDS_FOLDER, default_sr()))
 
 # ---------------------------- AUDIO HELPERS ----------------------------
-def resample_audio(audio, orig_sr, target_sr):
-    if orig_sr == target_sr:
-        return audio.astype(np.float32)
-    duration = len(audio) / orig_sr
-    new_length = int(duration * target_sr)
-    if audio.ndim == 1:
-        resampled = np.interp(np.linspace(0, len(audio)-1, new_length), np.arange(len(audio)), audio)
-    else:
-        channels = [np.interp(np.linspace(0, len(audio)-1, new_length), np.arange(len(audio)), audio[:, ch])
-                    for ch in range(audio.shape[1])]
-        resampled = np.stack(channels, axis=1)
-    return resampled.astype(np.float32)
-
-def record_audio(seconds, samplerate):
-    print(f"Recording for {seconds} seconds at {samplerate} Hz...")
-    audio = sd.rec(int(seconds * samplerate), samplerate=samplerate, channels=1, dtype="float32")
-    sd.wait()
-    return audio.flatten()
+def resample_audio(audio, orig_sr, target_sr, out=None):
+    return resample(audio, orig_sr, target_sr, out=out)
+
+def record_audio(seconds, since=None, noise_floor=None, wake=False):
+    # Stops on its own once the speaker goes quiet; `seconds` is only the upper bound.
+    # After a barge-in, `since` picks up the speech that interrupted the cat; otherwise
+    # with `wake` the wake detector waits for the user to start (or say the wake word).
+    # Recorded at default_sr(), which a retry after a replug may have changed.
+    def record(samplerate):
+        return record_until_silence(samplerate, max_seconds=seconds, engine=audio_engine(), since=since,
+                                    noise_floor=noise_floor, wake=wake_detector() if wake else None)
+    return audio_devices().with_device(record)
 
 def speech_to_text(audio_np, samplerate):
-    wav_file = "temp.wav"
-    sf.write(wav_file, audio_np, samplerate)
-    url = "https://api.elevenlabs.io/v1/speech-to-text"
-    headers = {"xi-api-key": API_KEY}
-    files = {"file": ("temp.wav", open(wav_file, "rb"), "audio/wav")}
-    data = {"model_id": "scribe_v2"}
-    r = requests.post(url, headers=headers, files=files, data=data)
-    if r.status_code != 200:
-        print("STT failed:", r.text)
-        return ""
-    return r.json().get("text", "")
+    # the local backend yields text as it decodes: show it while the rest comes in
+    start = time.perf_counter()
+    text = stt().transcribe(audio_np, samplerate, on_partial=lambda partial: print(f"YOU (so far): {partial}"))
+    print(f"YOU: {text}  [STT {time.perf_counter() - start:.2f}s; recent: {stt().report()}]")
+    return text
 
 def play_audio(audio_data, sr):
-    audio_data = resample_audio(audio_data, sr, DEFAULT_SR)
+    audio_data = resample_audio(audio_data, sr, default_sr())
     audio_data = audio_data.astype(np.float32)
     audio_data = audio_data / np.max(np.abs(audio_data))
-    sd.play(audio_data, DEFAULT_SR)
-    sd.wait()
+    audio_engine().queue(audio_data).wait()
 
-def play_audio_dont_wait(audio_data, sr):
-    audio_data = resample_audio(audio_data, sr, DEFAULT_SR)
-    audio_data = audio_data.astype(np.float32)
-    audio_data = audio_data / np.max(np.abs(audio_data))
-    sd.play(audio_data, DEFAULT_SR)
+def prepare_audio(audio_data, sr):
+    # speech plays at the level it was synthesized at, not peak-normalized: a streamed
+    # reply can't be (its peak isn't known until it's over), and a replay from the
+    # speech cache has to sound like the first time
+    return resample_audio(audio_data, sr, default_sr())
+
+def speech_key(text):
+    return cache_key(VOICE_ID, TTS_MODEL_ID, text)
+
+def cache_speech(text, data, sr):
+    speech_cache().put(speech_key(text), {"data": data, "sr": sr, "levels": get_amplitude_envelope(data, sr, fps=30)})
 
 def get_speech_from_elevenlabs(text):
+    cached = speech_cache().get(speech_key(text))
+    if cached is not None:
+        return cached["data"], int(cached["sr"])
     url = f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}"
-    headers = {"xi-api-key": API_KEY, "Content-Type": "application/json"}
-    payload = {"text": text, "model_id": "eleven_monolingual_v1"}
-    r = requests.post(url, headers=headers, json=payload)
+    headers = {"xi-api-key": api_key(), "Content-Type": "application/json"}
+    payload = {"text": text, "model_id": TTS_MODEL_ID}
+    r = elevenlabs_client.post(url, headers=headers, json=payload)
     if r.status_code != 200:
         print("TTS failed:", r.text)
         return None, None
     data, sr = sf.read(BytesIO(r.content), dtype="float32")
+    cache_speech(text, data, sr)
     return data, sr
 
+def iter_speech_and_cache(text):
+    # streams as usual and caches the whole clip once it has arrived in full
+    parts = []
+    for chunk in iter_tts_pcm(text, api_key(), VOICE_ID, model_id=TTS_MODEL_ID):
+        parts.append(chunk)
+        yield chunk
+    if parts:
+        cache_speech(text, np.concatenate(parts), STREAM_SR)
+
+@once_per(default_sr)
+def cat_sounds():
+    return SoundBank(CAT_SOUNDS_FOLDER, default_sr(), resample_audio)
+
+@once_per(default_sr)
+def canned():
+    return CannedLibrary(default_sr(), resample_audio)
+
 def get_amplitude_envelope(data, sr, fps=30):
-    chunk_size = sr // fps
-    if len(data.shape) > 1:
-        data = np.mean(data, axis=1)
-    num_chunks = len(data) // chunk_size
-    truncated_data = data[:num_chunks * chunk_size]
-    chunks = truncated_data.reshape(num_chunks, chunk_size)
-    rms_values = np.sqrt(np.mean(chunks**2, axis=1))
-    max_rms = np.max(rms_values)
-    return rms_values / max_rms if max_rms > 0 else rms_values
-
-def play_cat_sound():
-    cat_files = glob.glob(os.path.join(CAT_SOUNDS_FOLDER, "*.wav"))
-    if not cat_files:
+    # [level, low band, high band] per frame; see envelope.py
+    return envelope(data, sr, fps)
+
+def play_cat_sound(**mix):
+    # clips are already decoded, resampled to the device rate and normalized at startup;
+    # mixed over whatever is playing (and ducked under speech), so this returns at once
+    clip = cat_sounds().random_clip()
+    if clip is None:
+        return None
+    return audio_engine().play(clip, duckable=True, **mix)
+
+def dress_speech(speech):
+    # purr under the reply and a meow over its last moments, instead of around it
+    if reply_cut.is_set():
+        speech.stop()   # the user already talked over this reply: don't start it
         return
-    cat_file = random.choice(cat_files)
-    data, sr = sf.read(cat_file, dtype="float32")
-    play_audio(data, sr)
-
-def play_cat_sound_and_move_motor(data, sr):
-    play_cat_sound()
-    amplitudes = get_amplitude_envelope(data, sr, fps=30)
-    delay_between_frames = 1.0 / 30
-    play_audio_dont_wait(data, sr)
-    for amp in amplitudes:
-        start_time = time.time()
-        if amp > 0.1:
-            speed = int(amp * 100)
-            motorA_forward(speed=speed)
-            motorB_forward(speed=speed)
-        else:
-            stop_motors()
-        elapsed = time.time() - start_time
-        time.sleep(max(0, delay_between_frames - elapsed))
+    bed = cat_sounds().get(BED_SOUND) if BED_SOUND else None
+    if bed is not None:
+        audio_engine().play(bed, gain=BED_GAIN, duckable=True, sync_to=speech, until=speech)
+    clip = cat_sounds().random_clip()
+    if clip is not None:
+        audio_engine().play(clip, sync_to=speech, from_end=True, delay=-OUTRO_OVERLAP_SECONDS)
+
+def set_jaw(level):
+    speed_a, speed_b = jaw_speeds(level)
+    if speed_a or speed_b:
+        motorA_forward(speed=speed_a)
+        motorB_forward(speed=speed_b)
+    else:
+        stop_motors()
+
+def play_cat_sound_and_move_motor(data, sr, intro=True, amplitudes=None):
+    if intro:
+        play_cat_sound()
+    if amplitudes is None:
+        amplitudes = get_amplitude_envelope(data, sr, fps=30)
+    # jaw frames are scheduled off the output stream's own clock, so they can't drift
+    sync = play_with_lipsync(prepare_audio(data, sr), default_sr(), amplitudes, set_jaw, fps=30,
+                             engine=audio_engine(), on_voice=dress_speech)
+    stop_motors()
+    print(sync.report())
+
+def reveal_as_heard(text):
+    """An on_envelope hook: posts the reply with word timings from the audio that is
+    actually playing, shifted by however much of it the speaker has already played."""
+    def post(levels, start):
+        elapsed = time.monotonic() - start
+        word_times = [[max(0.0, t - elapsed), end] for t, end in timings_from_envelope(text, levels, fps=30)]
+        post_ui_update({"response": text, "word_times": word_times})
+    return post
+
+def stream_cat_speech_and_move_motor(chunks, intro=True, text=None):
+    if intro:
+        play_cat_sound()
+    stats = play_pcm_stream(chunks, STREAM_SR, out_sr=default_sr(), on_frame=set_jaw, fps=30,
+                            engine=audio_engine(), on_voice=dress_speech,
+                            on_envelope=reveal_as_heard(text) if text else None)
     stop_motors()
-    sd.wait()
-    play_cat_sound()
+    if stats["first_audio_s"] is not None:
+        print(f"First TTS audio after {stats['first_audio_s']:.2f}s")
+
+def speak_sentences_and_move_motor(synthesizer, intro=True, text=None):
+    if intro:
+        play_cat_sound()
+    play_sentences(synthesizer, get_amplitude_envelope, default_sr(), on_frame=set_jaw, fps=30,
+                   engine=audio_engine(), on_voice=dress_speech,
+                   on_envelope=reveal_as_heard(text) if text else None)
+    stop_motors()
+    # the sentences are cached one by one; the whole reply too, so next time it's one lookup
+    data, sr = synthesizer.whole(fps=30)
+    if text and data is not None:
+        cache_speech(text, data, sr)
 
 def agent_reply(user_text):
+    key = cache_key(AGENT_ID, normalize_text(user_text))
+    cached = reply_cache().get(key)
+    if cached is not None:
+        reply = str(cached["text"])
+        memory.add(user_text, reply)
+        return reply
     url = f"https://api.elevenlabs.io/v1/convai/agents/{AGENT_ID}/simulate-conversation"
-    headers = {"xi-api-key": API_KEY, "Content-Type": "application/json"}
+    headers = {"xi-api-key": api_key(), "Content-Type": "application/json"}
     payload = {
         "simulation_specification": {
             "simulated_user_config": {"first_message": user_text, "language": "en"},
-            "agent_config": {"persona": "You are a toxic cat assistant...", "llm_override": "Respond in toxic cat style"}
+            "agent_config": {"persona": "You are a toxic cat assistant...", "llm_override": "Respond in toxic cat style"},
+            "partial_conversation_history": memory.history(),
         },
         "new_turns_limit": 1
     }
-    r = requests.post(url, headers=headers, json=payload)
+    r = elevenlabs_client.post(url, headers=headers, json=payload)
     if r.status_code != 200:
         print("Agent call failed:", r.text)
         return ""
     turns = r.json().get("simulated_conversation", [])
     for turn in turns:
         if turn.get("role") == "agent":
-            return turn.get("message", "").replace("[sarcastic]", "").strip()
+            reply = turn.get("message", "").replace("[sarcastic]", "").strip()
+            memory.add(user_text, reply)
+            if reply:
+                reply_cache().put(key, {"text": reply})
+            return reply
     return ""
 
 # ---------------------------- WEBSOCKET ----------------------------
 async def ws_handler(websocket):
-    connected_clients.add(websocket)
+    ui_hub.register(websocket)
     try:
         await websocket.wait_closed()
     finally:
-        connected_clients.remove(websocket)
+        ui_hub.unregister(websocket)
+
+def post_ui_update(data):
+    # queued per client and sent by the hub, so a slow tab never holds up the voice turn.
+    # Also called from player threads (reveal_as_heard): the hub hands those to the loop
+    ui_hub.publish(data)
+
+# ---------------------------- FALLBACK ----------------------------
+def play_canned(entry, stop_event):
+    _, audio, levels = entry
+    play_with_lipsync(audio, default_sr(), levels, set_jaw, fps=30, stop_event=stop_event,
+                      engine=audio_engine())
+    stop_motors()
+
+class TurnFiller:
+    """Caps perceived latency: if a step is still running at the deadline, a canned line
+    plays (at most once per turn) and is faded out as soon as the step finishes."""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.used = False
+
+    async def wait(self, aw):
+        task = asyncio.ensure_future(aw)
+        done, _ = await asyncio.wait({task}, timeout=max(0.0, self.deadline - time.perf_counter()))
+        if done or self.used:
+            return await task
+        entry = canned().pick()
+        if entry is None:
+            return await task
+        self.used = True
+        stop = Event()
+        post_ui_update({"response": entry[0], "word_times": timings_from_envelope(entry[0], entry[2], fps=30)})
+        filler = asyncio.create_task(asyncio.to_thread(play_canned, entry, stop))
+        try:
+            return await task
+        finally:
+            stop.set()
+            await filler
+
+# ---------------------------- BARGE-IN ----------------------------
+# learned speaker -> mic echo path, kept across replies
+@once_per(default_sr)
+def echo_gate():
+    return EchoGate(default_sr())
+
+# set once the user has cut the current reply off; players that queue (more of) it
+# afterwards stop it in dress_speech, their on_voice hook
+reply_cut = Event()
+
+def interrupt_reply():
+    # called from the barge-in thread: fade every voice out within a block, stop the jaw now
+    reply_cut.set()
+    audio_engine().stop_all()
+    stop_motors()
+    print("Interrupted, listening")
 
-async def send_ui_update(data):
-    if connected_clients:
-        msg = json.dumps(data)
-        await asyncio.gather(*(ws.send(msg) for ws in connected_clients))
+async def speak(fn, *args):
+    """Plays a reply while listening for the user talking over it. Returns the BargeIn,
+    whose `detected` is set if they did (the reply has then been cut off)."""
+    reply_cut.clear()
+    barge = BargeIn(audio_engine(), on_barge_in=interrupt_reply, gate=echo_gate())
+    try:
+        await asyncio.to_thread(fn, *args)
+    finally:
+        barge.close()
+    return barge
 
 # ---------------------------- VOICE LOOP ----------------------------
+# Every blocking step runs in a worker thread so the event loop keeps serving the
+# websocket while a turn is in progress.
 async def voice_loop():
-    print("\nVoice agent ready! Speak into your mic.\n")
+    print("\nVoice agent ready! Just start talking to the cat.\n")
+    barge = None
     try:
         while True:
-            input("Press Enter to record your message...")
-            await send_ui_update({"mood": "responding", "clear_response": True})
-            audio_np = record_audio(RECORD_SECONDS, DEFAULT_SR)
-            user_text = speech_to_text(audio_np, DEFAULT_SR)
+            if barge is not None and barge.detected.is_set():
+                # they talked over the cat: their turn has already started
+                since, noise_floor, wake = barge.since, barge.noise_floor, False
+            else:
+                since, noise_floor, wake = None, None, True
+            barge = None
+            await asyncio.to_thread(audio_devices().ensure)   # picks the dongle up again after a replug
+            audio_np = await asyncio.to_thread(record_audio, RECORD_SECONDS, since, noise_floor, wake)
+            if not len(audio_np):
+                continue
+            post_ui_update({"mood": "responding", "clear_response": True})
+            turn_start = time.perf_counter()
+
+            # The intro meow plays while STT -> agent -> TTS are in flight, and the reply
+            # (or a canned line) can start over its tail: the mixer ducks it under speech
+            play_cat_sound()
+            filler = TurnFiller(turn_start + FALLBACK_AFTER_SECONDS)
+            user_text = await filler.wait(asyncio.to_thread(speech_to_text, audio_np, default_sr()))
             if not user_text:
                 continue
-            reply_text = agent_reply(user_text)
+            reply_text = await filler.wait(asyncio.to_thread(agent_reply, user_text))
             if not reply_text:
                 continue
-            await send_ui_update({"response": reply_text, "typing": True, "typing_speed": 40})
-            data, sr = get_speech_from_elevenlabs(reply_text)
-            if data is not None:
-                play_cat_sound_and_move_motor(data, sr)
-            await send_ui_update({"mood": "idle"})
+            # The text is sent with per-word timings from the speech audio, so the browser
+            # reveals it in step with the voice instead of typing it on a timer. Streamed
+            # replies post it once all their audio is in, anchored to where playback is
+            cached = speech_cache().get(speech_key(reply_text))
+            if cached is not None:
+                # heard this one before: no TTS at all, straight to the speaker
+                levels = cached["levels"]
+                post_ui_update({"response": reply_text, "word_times": timings_from_envelope(reply_text, levels, fps=30)})
+                barge = await speak(play_cat_sound_and_move_motor, cached["data"], int(cached["sr"]), False, levels)
+            elif TTS_MODE == "stream":
+                chunks = prefetch(iter_speech_and_cache(reply_text))
+                first = await filler.wait(asyncio.to_thread(next, chunks, None))
+                chunks = itertools.chain([first], chunks) if first is not None else iter(())
+                barge = await speak(stream_cat_speech_and_move_motor, chunks, False, reply_text)
+            elif TTS_MODE == "sentences":
+                synthesizer = SentenceSynthesizer(reply_text, get_speech_from_elevenlabs)
+                if synthesizer.futures:
+                    await filler.wait(asyncio.wrap_future(synthesizer.futures[0]))
+                barge = await speak(speak_sentences_and_move_motor, synthesizer, False, reply_text)
+            else:
+                data, sr = await filler.wait(asyncio.to_thread(get_speech_from_elevenlabs, reply_text))
+                if data is not None:
+                    levels = get_amplitude_envelope(data, sr, fps=30)   # once, for the text and the jaw
+                    post_ui_update({"response": reply_text, "word_times": timings_from_envelope(reply_text, levels, fps=30)})
+                    barge = await speak(play_cat_sound_and_move_motor, data, sr, False, levels)
+            post_ui_update({"mood": "idle"})
+            print(f"Turn took {time.perf_counter() - turn_start:.2f}s after recording")
     except KeyboardInterrupt:
         cleanup_motors()
 
 # ---------------------------- MAIN ----------------------------
 async def main():
+    # Open the keep-alive connections to ElevenLabs while everything else starts
+    elevenlabs_client.prewarm()
+
+    # Probe the audio device, motors and API config and load the sounds all at once
+    await asyncio.to_thread(probe_in_parallel, api_key, audio_engine, get_motors,
+                            cat_sounds, canned, reply_cache, speech_cache, wake_detector, stt)
+
     # Run HTTP server in separate thread
     Thread(target=start_http_server, daemon=True).start()
 
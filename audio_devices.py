@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import threading
+import sounddevice as sd
+
+# ---------------------------- CONFIG ----------------------------
+STATE_FILE = ".audio_device.json"   # last device we used, by name + host API rather than index
+CANDIDATE_RATES = (48000, 44100, 32000, 22050, 16000)
+ALSA_CARDS = "/proc/asound/cards"   # changes whenever a USB sound card is plugged or unplugged
+WATCH_SECONDS = 2.0
+
+
+def hostapi_name(device):
+    return sd.query_hostapis(device["hostapi"])["name"]
+
+
+def supported_rates(index, rates=CANDIDATE_RATES):
+    """The candidate rates the device accepts for mono float32 both in and out."""
+    ok = []
+    for rate in rates:
+        try:
+            sd.check_input_settings(device=index, channels=1, dtype="float32", samplerate=rate)
+            sd.check_output_settings(device=index, channels=1, dtype="float32", samplerate=rate)
+        except Exception:
+            continue
+        ok.append(rate)
+    return ok
+
+
+def refresh_portaudio():
+    # PortAudio only enumerates devices when it initializes, so a replugged dongle
+    # is invisible (or sits at a new index) until we restart it. sounddevice has no
+    # public call for that: _terminate/_initialize are the private pair it runs itself
+    # at import and exit, so check they still exist instead of relying on them.
+    if not (hasattr(sd, "_terminate") and hasattr(sd, "_initialize")):
+        print("This sounddevice version can't restart PortAudio; restart to pick up a replugged device")
+        return
+    sd._terminate()
+    sd._initialize()
+
+
+class AudioDeviceManager:
+    """Picks the duplex audio device once and keeps it picked.
+
+    The choice is saved as (name, host API, index, sample rate). On the next start a
+    single query confirms the device at that index is still the same one, skipping
+    enumeration and sample-rate validation. If the dongle moved, it is found again by
+    name. When ALSA's card list changes (replug) the device is marked stale and
+    re-resolved at the next ensure(), without restarting the process.
+    """
+
+    def __init__(self, match=None, state_file=STATE_FILE, watch=True):
+        self.match = match            # substring the device name must contain, e.g. "USB"
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.stale = threading.Event()
+        self.device = None
+        self.owners = []              # long-lived streams (AudioEngine) to carry across a replug
+        self.resolve()
+        if watch and os.path.exists(ALSA_CARDS):
+            threading.Thread(target=self._watch, name="audio-hotplug", daemon=True).start()
+
+    @property
+    def samplerate(self):
+        return self.device["samplerate"]
+
+    @property
+    def index(self):
+        return self.device["index"]
+
+    # ---- state file ----
+    def _load_state(self):
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self):
+        if not self.state_file:
+            return
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.device, f)
+        os.replace(tmp, self.state_file)
+
+    # ---- resolving ----
+    def _usable(self, d):
+        return (d["max_input_channels"] > 0 and d["max_output_channels"] > 0
+                and (self.match is None or self.match in d["name"]))
+
+    def _still_valid(self, state):
+        try:
+            d = sd.query_devices(state["index"])
+        except Exception:
+            return False
+        return d["name"] == state["name"] and hostapi_name(d) == state["hostapi"] and self._usable(d)
+
+    def _search(self, previous):
+        devices = list(enumerate(sd.query_devices()))
+        if previous:
+            # the same physical device first, wherever it has moved to
+            devices.sort(key=lambda item: (item[1]["name"], hostapi_name(item[1])) != (previous["name"], previous["hostapi"]))
+        for i, d in devices:
+            if not self._usable(d):
+                continue
+            rates = supported_rates(i)
+            if not rates:
+                continue
+            preferred = [previous["samplerate"]] if previous else []
+            preferred.append(int(d["default_samplerate"]))
+            samplerate = next((r for r in preferred if r in rates), rates[0])
+            return {"name": d["name"], "hostapi": hostapi_name(d), "index": i,
+                    "samplerate": samplerate, "rates": rates}
+        raise RuntimeError("No suitable input/output device found")
+
+    def resolve(self, rescan=False):
+        with self.lock:
+            previous = self.device or self._load_state()
+            if not rescan and previous and self._still_valid(previous):
+                device = previous
+            else:
+                device = self._search(previous)
+            if self.device and device["samplerate"] != self.device["samplerate"]:
+                print(f"Audio device rate changed {self.device['samplerate']} -> {device['samplerate']} Hz")
+            if device != self.device:
+                print(f"Using audio device: {device['name']} ({device['hostapi']}, "
+                      f"index {device['index']}) at {device['samplerate']} Hz")
+            self.device = device
+            sd.default.device = (device["index"], device["index"])
+            if device != previous:
+                self._save_state()
+            return device
+
+    def keep_open(self, owner):
+        """Opens `owner` (anything with open(samplerate, device) and close()) on this device
+        and moves it along whenever the device is re-resolved."""
+        self.owners.append(owner)
+        owner.open(self.samplerate, self.index)
+        return owner
+
+    def ensure(self):
+        """Re-resolves if a replug was seen. Call before opening a stream; returns the sample rate."""
+        if self.stale.is_set():
+            self.stale.clear()
+            # restarting PortAudio invalidates every open stream, so close ours first
+            for owner in self.owners:
+                owner.close()
+            refresh_portaudio()
+            self.resolve(rescan=True)
+            for owner in self.owners:
+                owner.open(self.samplerate, self.index)
+        return self.samplerate
+
+    def with_device(self, fn, *args, **kwargs):
+        """Runs fn(samplerate, *args, **kwargs) at the device's rate; if PortAudio fails
+        (unplugged mid-call), re-resolves and tries once more at the new device's rate."""
+        try:
+            return fn(self.samplerate, *args, **kwargs)
+        except sd.PortAudioError as e:
+            print(f"Audio device error ({e}), looking for the device again")
+            self.stale.set()
+            self.ensure()
+            return fn(self.samplerate, *args, **kwargs)
+
+    # ---- hot-plug ----
+    def _watch(self):
+        last = None
+        while True:
+            try:
+                with open(ALSA_CARDS) as f:
+                    cards = f.read()
+            except OSError:
+                cards = None
+            if last is not None and cards != last:
+                print("Sound cards changed, will re-resolve the audio device")
+                self.stale.set()
+            last = cards
+            time.sleep(WATCH_SECONDS)
+
+
+# ---------------------------- TEST BLOCK ----------------------------
+if __name__ == "__main__":
+    # Cold start (full enumeration + rate checks) vs warm start from the state file.
+    if os.path.exists(STATE_FILE):
+        os.remove(STATE_FILE)
+    start = time.perf_counter()
+    AudioDeviceManager(watch=False)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    manager = AudioDeviceManager(watch=False)
+    warm = time.perf_counter() - start
+    print(f"cold start {cold * 1000:.1f} ms, warm start {warm * 1000:.1f} ms, rates {manager.device['rates']}")
@@ -0,0 +1,470 @@
+import time
+import threading
+from collections import deque
+import numpy as np
+import sounddevice as sd
+from lipsync import AudioClock, FADE_SECONDS
+
+# ---------------------------- CONFIG ----------------------------
+BLOCKSIZE = 512               # frames per callback (~11 ms at 48 kHz)
+CAPTURE_SECONDS = 30          # mic history kept in the input ring
+INPUT_TIMEOUT = 1.0           # a reader that gets nothing for this long assumes the device is gone
+DUCK_GAIN = 0.25              # duckable voices (purr beds, meows) drop to this while speech is loud
+DUCK_THRESHOLD = 0.02         # block RMS of the speech voices that counts as "talking"
+DUCK_RELEASE = 0.15           # per-block step back towards full volume once speech pauses
+
+
+# ---------------------------- SOURCES ----------------------------
+class ArraySource:
+    """A whole clip already in memory."""
+
+    def __init__(self, data):
+        data = np.asarray(data, dtype=np.float32)
+        self.data = data.mean(axis=1) if data.ndim > 1 else data
+        self.pos = 0
+        self.length = len(self.data)
+
+    @property
+    def exhausted(self):
+        return self.pos >= self.length
+
+    @property
+    def remaining(self):
+        return self.length - self.pos
+
+    def read_into(self, out):
+        n = min(len(out), self.length - self.pos)
+        out[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+
+class StreamSource:
+    """Audio still arriving, e.g. tts_stream's RingBuffer (read_into + closed/available)."""
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.length = None   # unknown while audio is still arriving
+
+    @property
+    def exhausted(self):
+        return self.ring.closed and self.ring.available == 0
+
+    @property
+    def remaining(self):
+        """Samples left to play, once nothing more can arrive; None until then."""
+        return self.ring.available if self.ring.closed else None
+
+    def read_into(self, out):
+        return self.ring.read_into(out)
+
+
+# ---------------------------- VOICE ----------------------------
+class Voice:
+    """One clip or stream being played by the engine.
+
+    `start` and `end` are output frame numbers, filled in by the audio callback.
+    `clock` maps this voice's own sample positions to speaker time, so jaw frames
+    can be scheduled against it exactly like against a dedicated stream.
+
+    Mixing: `gain` scales the voice; voices that `duck` (speech) push `duckable`
+    ones (effects) down to DUCK_GAIN while they are loud. A voice can start
+    `delay` seconds after now, after another voice's start (`sync_to`) or, with
+    `from_end`, relative to its end; `until` fades it out when that voice ends.
+    """
+
+    def __init__(self, engine, source, after=None, gain=1.0, ducks=False, duckable=False,
+                 sync_to=None, delay=0.0, from_end=False, until=None):
+        self.engine = engine
+        self.source = source
+        self.after = after     # voice to follow back-to-back, or None to start right away
+        self.gain = gain
+        self.ducks = ducks
+        self.duckable = duckable
+        self.sync_to = sync_to
+        self.delay = delay
+        self.from_end = from_end
+        self.until = until
+        self.start = None
+        self.end = None
+        self.played = 0        # real samples of this voice rendered so far
+        self.clock = AudioClock(engine.samplerate)
+        self.stopping = False
+        self.done = threading.Event()
+
+    def stop(self):
+        """Fades the voice out within one callback block."""
+        self.stopping = True
+
+    def wait(self, timeout=None):
+        """Blocks until the voice has finished playing (or the stream went away)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.done.wait(0.1):
+            if not self.engine.running or (deadline is not None and time.monotonic() > deadline):
+                return False
+        return True
+
+
+# ---------------------------- CAPTURE ----------------------------
+class CaptureRing:
+    """Mic samples from the duplex stream, overwriting the oldest once full.
+
+    `written` counts every sample ever captured, so positions are absolute and
+    several readers can follow the same input independently.
+    """
+
+    def __init__(self, capacity):
+        self.buf = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.written = 0
+        self.cond = threading.Condition()
+        self.notify_at = 0      # lowest position a waiting reader needs, so idle readers sleep through blocks
+
+    def write(self, samples):
+        n = min(len(samples), self.capacity)
+        samples = samples[len(samples) - n:]
+        with self.cond:
+            start = self.written % self.capacity
+            first = min(n, self.capacity - start)
+            self.buf[start:start + first] = samples[:first]
+            self.buf[:n - first] = samples[first:]
+            self.written += len(samples)
+            if self.written >= self.notify_at:
+                self.notify_at = float("inf")
+                self.cond.notify_all()
+
+    def read(self, pos, end):
+        """Copy of samples [pos, end); pos must still be in the ring."""
+        n = end - pos
+        start = pos % self.capacity
+        first = min(n, self.capacity - start)
+        return np.concatenate([self.buf[start:start + first], self.buf[:n - first]])
+
+    def reader(self, since=None):
+        return CaptureReader(self, since)
+
+
+class CaptureReader:
+    """Follows the mic from the moment it was created (or from an earlier position
+    still in the ring), one read() at a time."""
+
+    def __init__(self, ring, since=None):
+        self.ring = ring
+        self.pos = ring.written if since is None else min(ring.written, max(since, ring.written - ring.capacity))
+
+    def _ready(self, target):
+        ring = self.ring
+        if ring.written >= target:
+            return True
+        ring.notify_at = min(ring.notify_at, target)   # woken readers re-register here
+        return False
+
+    def read(self, timeout=INPUT_TIMEOUT, min_samples=1):
+        """Everything captured since the last read; waits for at least `min_samples`
+        (one block, by default). Asking for more wakes this thread less often."""
+        ring = self.ring
+        with ring.cond:
+            if not ring.cond.wait_for(lambda: self._ready(self.pos + min_samples), timeout):
+                raise sd.PortAudioError(f"no audio input for {timeout:.1f}s")
+            end = ring.written
+            self.pos = max(self.pos, end - ring.capacity)   # fell behind: skip what was overwritten
+            data = ring.read(self.pos, end)
+        self.pos = end
+        return data
+
+
+# ---------------------------- ENGINE ----------------------------
+class AudioEngine:
+    """Owns the one duplex stream for the whole session.
+
+    Mic input goes into a ring buffer that any number of readers can follow.
+    Output is mixed from voices: play() starts a clip at the next block (overlapping
+    whatever is playing), queue() starts it on the exact sample the previously queued
+    one ends. Opening a stream per clip costs tens of milliseconds and can click on
+    USB dongles; here the stream stays open and idle blocks are just silence.
+
+    Each block, the speech voices are mixed first and their level decides the
+    ducking gain, which is ramped across the block onto the effect voices.
+    """
+
+    def __init__(self, samplerate=None, device=None, blocksize=BLOCKSIZE, capture_seconds=CAPTURE_SECONDS):
+        self.samplerate = samplerate
+        self.device = device
+        self.blocksize = blocksize
+        self.capture_seconds = capture_seconds
+        self.capture = None     # mic input
+        self.output = None      # what we sent to the speaker, sample-aligned with `capture`
+        self.stream = None
+        self.latency = 0.0
+        self.round_trip = 0     # samples from writing a frame to hearing it back in the mic
+        self.frame = 0          # output frames rendered since the stream opened
+        self.inbox = deque()    # new voices, handed to the callback without a lock
+        self.pending = []       # callback-only: voices waiting for their predecessor to end
+        self.voices = []        # callback-only: voices being mixed
+        self.last_queued = None
+        self.duck = 1.0         # current gain applied to duckable voices
+        self._allocate(0)
+        self.lock = threading.Lock()
+        if samplerate is not None:
+            self.open(samplerate, device)
+
+    @property
+    def running(self):
+        return self.stream is not None and self.stream.active
+
+    @property
+    def speaking(self):
+        """Whether a speech (ducking) voice has started and not finished. A hint off the audio thread."""
+        return any(v.ducks and v.played for v in list(self.voices))
+
+    @property
+    def playing(self):
+        """Whether any voice is playing or waiting to. Read from other threads it is a hint."""
+        return bool(self.inbox or self.pending or self.voices)
+
+    def open(self, samplerate, device=None):
+        """Opens (or reopens, after a replug or rate change) the duplex stream."""
+        with self.lock:
+            if self.running and (samplerate, device) == (self.samplerate, self.device):
+                return
+            self._close_stream()
+            self.samplerate, self.device = samplerate, device
+            if self.capture is None or self.capture.capacity != int(self.capture_seconds * samplerate):
+                self.capture = CaptureRing(int(self.capture_seconds * samplerate))
+                self.output = CaptureRing(self.capture.capacity)
+            self._allocate(self.blocksize)
+            self.stream = sd.Stream(samplerate=samplerate, blocksize=self.blocksize, device=device,
+                                    channels=1, dtype="float32", callback=self._callback)
+            latency = self.stream.latency
+            if isinstance(latency, (tuple, list)):
+                self.latency = latency[1]
+                self.round_trip = int((latency[0] + latency[1]) * samplerate)
+            else:
+                self.latency = latency
+                self.round_trip = int(2 * latency * samplerate)
+            self.stream.start()
+
+    def close(self):
+        with self.lock:
+            self._close_stream()
+
+    def _allocate(self, frames):
+        # per-block buffers, sized once so the callback never allocates
+        self.scratch = np.zeros(frames, dtype=np.float32)
+        self.duck_curve = np.ones(frames, dtype=np.float32)
+        self.ramp = np.arange(1, frames + 1, dtype=np.float32) / max(frames, 1)   # 0..1 across a block
+
+    def _close_stream(self):
+        if self.stream is None:
+            return
+        try:
+            self.stream.close()
+        except sd.PortAudioError:
+            pass   # device already gone
+        self.stream = None
+        # nothing will ever render the voices still in flight: let their waiters go
+        for voice in list(self.inbox) + self.pending + self.voices:
+            voice.done.set()
+        self.inbox.clear()
+        self.pending, self.voices, self.last_queued = [], [], None
+
+    # ---- producer side (any thread) ----
+    def play(self, clip, **mix):
+        """Starts `clip` mixed over anything already playing: at the next block by default,
+        or as scheduled by the Voice options (gain, duckable, sync_to, delay, from_end, until)."""
+        return self._add(Voice(self, ArraySource(clip), **mix))
+
+    def queue(self, clip, **mix):
+        """Starts `clip` right where the previously queued clip (or stream) ends."""
+        voice = Voice(self, ArraySource(clip), after=self._tail(), **mix)
+        self.last_queued = voice
+        return self._add(voice)
+
+    def queue_stream(self, ring, **mix):
+        """Like queue(), for audio still arriving in a tts_stream RingBuffer."""
+        voice = Voice(self, StreamSource(ring), after=self._tail(), **mix)
+        self.last_queued = voice
+        return self._add(voice)
+
+    def _tail(self):
+        # a stopped or finished voice has nothing left to wait for
+        last = self.last_queued
+        if last is None or last.stopping or last.done.is_set():
+            self.last_queued = None
+            return None
+        return last
+
+    def _add(self, voice):
+        if not self.running:
+            voice.done.set()
+            return voice
+        self.inbox.append(voice)
+        return voice
+
+    def stop_all(self):
+        for voice in list(self.inbox) + list(self.pending) + list(self.voices):
+            voice.stop()
+
+    def reader(self, since=None):
+        """A CaptureReader on the mic, starting now or at capture position `since`."""
+        return self.capture.reader(since)
+
+    # ---- audio callback ----
+    def _start_of(self, voice, block_start):
+        """The voice's first output frame, or None while what it waits for hasn't happened."""
+        if voice.after is not None:
+            return None if voice.after.end is None else max(block_start, voice.after.end)
+        anchor = block_start
+        if voice.sync_to is not None:
+            anchor = voice.sync_to.end if voice.from_end else voice.sync_to.start
+            if anchor is None:
+                return None
+        return max(block_start, anchor + int(round(voice.delay * self.samplerate)))
+
+    def _schedule(self, block_start):
+        while self.inbox:
+            self.pending.append(self.inbox.popleft())
+        for voice in self.voices:
+            # a stream's end is known once it is closed: everything left is buffered and
+            # plays back to back, so voices timed off its end can be placed before it
+            if voice.end is None and not voice.stopping:
+                remaining = voice.source.remaining
+                if remaining is not None:
+                    voice.end = max(block_start, voice.start) + remaining
+        waiting = []
+        for voice in self.pending:
+            start = None if voice.stopping else self._start_of(voice, block_start)
+            leader = voice.sync_to
+            if voice.stopping or (start is None and leader is not None and leader.done.is_set()):
+                # stopped, or what it was synced to never played. It ends here, so
+                # voices queued after it move up instead of waiting for it forever
+                voice.end = block_start
+                voice.done.set()
+            elif start is not None:
+                voice.start = start
+                if voice.source.length is not None:
+                    voice.end = start + voice.source.length
+                self.voices.append(voice)
+            else:
+                waiting.append(voice)
+        self.pending = waiting
+
+    def _follow(self, leader, block_start):
+        """A voice cut short ends early: voices already scheduled off its full length
+        (queued after it, or synced to it) are moved up to its real end."""
+        for voice in self.voices:
+            if voice.played or (voice.after is not leader and voice.sync_to is not leader):
+                continue
+            voice.start = self._start_of(voice, block_start)
+            # a stream's end is worked out again from what it has buffered
+            voice.end = None if voice.source.length is None else voice.start + voice.source.length
+            self._follow(voice, block_start)
+
+    def _render(self, voice, out, time_info, offset, duck):
+        scratch = self.scratch[:len(out)]
+        voice.clock.update(voice.played, time_info, self.latency, offset / self.samplerate)
+        n = voice.source.read_into(scratch)
+        if voice.gain != 1.0:
+            scratch[:n] *= voice.gain
+        if voice.duckable:
+            scratch[:n] *= duck[offset:offset + n]
+        if voice.stopping:
+            fade = min(n, max(1, int(self.samplerate * FADE_SECONDS)))
+            scratch[:fade] *= np.linspace(1, 0, fade, dtype=np.float32)
+            n = fade
+        out[:n] += scratch[:n]
+        voice.played += n
+        return n, voice.stopping or voice.source.exhausted
+
+    def _mix(self, voices, out, block_start, frames, time_info, finished):
+        for voice in voices:
+            if voice.stopping and not voice.played:
+                voice.end = block_start   # stopped before it got to play
+                finished.append(voice)
+                continue
+            offset = max(0, voice.start - block_start)
+            if offset >= frames:
+                continue
+            if voice.until is not None and voice.until.done.is_set():
+                voice.stop()
+            n, done = self._render(voice, out[offset:], time_info, offset, self.duck_curve)
+            if done:
+                voice.end = block_start + offset + n
+                finished.append(voice)
+
+    def _callback(self, indata, outdata, frames, time_info, status):
+        self.capture.write(indata[:, 0])
+        block_start = self.frame
+        self._schedule(block_start)
+        out = outdata[:, 0]
+        out[:] = 0
+        if len(self.ramp) != frames:
+            self._allocate(frames)   # only if the host ignored our blocksize
+        finished = []
+        # speech first, so its level can set the ducking for everything else in this block
+        self._mix([v for v in self.voices if v.ducks], out, block_start, frames, time_info, finished)
+        loud = np.dot(out, out) > DUCK_THRESHOLD * DUCK_THRESHOLD * frames
+        target = DUCK_GAIN if loud else min(1.0, self.duck + DUCK_RELEASE)
+        # ramp across the block instead of jumping, so the bed doesn't click
+        np.multiply(self.ramp, target - self.duck, out=self.duck_curve)
+        self.duck_curve += self.duck
+        self.duck = target
+        self._mix([v for v in self.voices if not v.ducks], out, block_start, frames, time_info, finished)
+        for voice in finished:
+            self.voices.remove(voice)
+            voice.done.set()
+            if voice.stopping:
+                self._follow(voice, block_start + frames)
+        self.output.write(out)
+        self.frame += frames
+
+
+# ---------------------------- TEST BLOCK (benchmark) ----------------------------
+if __name__ == "__main__":
+    # 1. Gap between consecutive clips: sd.play + sd.wait per clip (old) vs queued on the engine.
+    # 2. A turn's wall time (until the reply has finished) with meow -> speech -> meow in
+    #    sequence vs the meows and a purr mixed over the speech.
+    sr = int(sd.query_devices(kind="output")["default_samplerate"])
+    count, seconds = 10, 0.2
+    t = np.arange(int(seconds * sr)) / sr
+    clip = (0.2 * np.sin(2 * np.pi * 440 * t) * np.hanning(len(t))).astype(np.float32)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        sd.play(clip, sr)
+        sd.wait()
+    old_gap = (time.perf_counter() - start - count * seconds) / (count - 1)
+
+    engine = AudioEngine(sr)
+    time.sleep(0.2)   # let the stream settle, as it would have long before the first reply
+    start = time.perf_counter()
+    voices = [engine.queue(clip) for _ in range(count)]
+    voices[-1].wait()
+    new_gap = (time.perf_counter() - start - count * seconds) / (count - 1)
+    sample_gaps = [b.start - a.end for a, b in zip(voices, voices[1:])]
+
+    print(f"sd.play per clip: {old_gap * 1000:6.1f} ms average gap between clips (wall clock)")
+    print(f"engine queue:     {new_gap * 1000:6.1f} ms wall clock, sample gaps {set(sample_gaps)} (0 = seamless)")
+
+    def tone(freq, secs, level):
+        t = np.arange(int(secs * sr)) / sr
+        return (level * np.sin(2 * np.pi * freq * t) * np.hanning(len(t))).astype(np.float32)
+
+    meow, speech, purr = tone(700, 0.8, 0.5), tone(200, 3.0, 0.5), tone(60, 5.0, 0.3)
+    start = time.perf_counter()
+    engine.queue(meow)
+    engine.queue(speech, ducks=True)
+    engine.queue(meow).wait()
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.play(meow, duckable=True)
+    voice = engine.queue(speech, ducks=True)
+    engine.play(purr, gain=0.4, duckable=True, sync_to=voice, until=voice)
+    engine.play(meow, sync_to=voice, from_end=True, delay=-0.4)
+    voice.wait()
+    mixed = time.perf_counter() - start
+    time.sleep(1.0)
+    engine.close()
+    print(f"turn with effects in sequence: {serial:.2f} s, mixed over the speech: {mixed:.2f} s "
+          f"(saved {serial - mixed:.2f} s; effects total {2 * len(meow) / sr:.2f} s)")
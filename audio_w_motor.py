@@ -4,13 +4,16 @@ import os
 import time
 import glob
 import random
-import threading
-import requests
+import elevenlabs_client
 import numpy as np
 import sounddevice as sd
 import soundfile as sf
 from io import BytesIO
-import RPi.GPIO as GPIO
+from motors_just_fcns import get_motors, cleanup_motors
+from motor_drivers import FORWARD, REVERSE, BRAKE, COAST
+from vad_recorder import record_until_silence
+from audio_upload import encode_for_upload
+from audio_devices import AudioDeviceManager
 
 # ============================ CONFIG =============================
 API_KEY = os.getenv("ELEVENLABS_API_KEY")
@@ -20,7 +23,7 @@ if not API_KEY:
 AGENT_ID = "agent_1601khf3r1jfff2saez29f6frfny"
 VOICE_ID = "XdflFrQO8wbGpWMNZHFr"
 
-RECORD_SECONDS = 5
+RECORD_SECONDS = 15  # max utterance length, recording ends on silence
 CAT_SOUNDS_BASE = "cat_sounds"
 
 EMOTIONS = {
@@ -30,30 +33,14 @@ EMOTIONS = {
 }
 
 # ====================== AUDIO DEVICE SETUP =======================
-sd.default.device = sd.query_devices(kind="output")["index"]
-DEFAULT_SR = int(sd.query_devices(kind="output")["default_samplerate"])
-
-# ====================== GPIO / MOTOR SETUP =======================
-MotorA_in1, MotorA_in2 = 17, 27
-MotorB_in3, MotorB_in4 = 22, 23
-MotorA_en, MotorB_en = 18, 24
-
-GPIO.setmode(GPIO.BCM)
-GPIO.setup([MotorA_in1, MotorA_in2, MotorB_in3, MotorB_in4], GPIO.OUT)
-GPIO.setup([MotorA_en, MotorB_en], GPIO.OUT)
-
-pwmA = GPIO.PWM(MotorA_en, 100)
-pwmB = GPIO.PWM(MotorB_en, 100)
-pwmA.start(0)
-pwmB.start(0)
+# Remembered in .audio_device.json, so a normal start is one query, not a full scan
+devices = AudioDeviceManager(watch=False)
+DEFAULT_SR = devices.samplerate
 
 # ============================ HELPERS ============================
 
 def record_audio(seconds):
-    audio = sd.rec(int(seconds * DEFAULT_SR), samplerate=DEFAULT_SR,
-                   channels=1, dtype="float32")
-    sd.wait()
-    return audio.flatten()
+    return record_until_silence(DEFAULT_SR, max_seconds=seconds)
 
 def play_audio(audio, sr):
     # force mono
@@ -81,19 +68,18 @@ def play_audio(audio, sr):
 # ============================ SPEECH =============================
 
 def speech_to_text(audio):
-    sf.write("temp.wav", audio, DEFAULT_SR)
-    r = requests.post(
+    r = elevenlabs_client.post(
         "https://api.elevenlabs.io/v1/speech-to-text",
         headers={"xi-api-key": API_KEY},
-        files={"file": open("temp.wav", "rb")},
+        files={"file": encode_for_upload(audio, DEFAULT_SR)},
         data={"model_id": "scribe_v2"}
     )
-    return r.json().get("text", "") if r.ok else ""
+    return r.json().get("text", "") if r.is_success else ""
 
 # ============================ AGENT ==============================
 
 def agent_reply(text):
-    r = requests.post(
+    r = elevenlabs_client.post(
         f"https://api.elevenlabs.io/v1/convai/agents/{AGENT_ID}/simulate-conversation",
         headers={"xi-api-key": API_KEY, "Content-Type": "application/json"},
         json={
@@ -132,47 +118,32 @@ def play_cat_sound(emotion):
         play_audio(data, sr)
 
 # ============================ MOTORS =============================
-
-def stop_motors():
-    GPIO.output([MotorA_in1, MotorA_in2, MotorB_in3, MotorB_in4], GPIO.LOW)
-    pwmA.ChangeDutyCycle(0)
-    pwmB.ChangeDutyCycle(0)
-
-def gentle_motion():
-    for _ in range(2):
-        pwmA.ChangeDutyCycle(30)
-        pwmB.ChangeDutyCycle(30)
-        GPIO.output(MotorA_in1, GPIO.HIGH)
-        GPIO.output(MotorB_in4, GPIO.HIGH)
-        time.sleep(0.4)
-        GPIO.output(MotorA_in2, GPIO.HIGH)
-        GPIO.output(MotorB_in3, GPIO.HIGH)
-        time.sleep(0.4)
-    stop_motors()
-
-def alert_motion():
-    for _ in range(2):
-        pwmA.ChangeDutyCycle(70)
-        pwmB.ChangeDutyCycle(70)
-        GPIO.output(MotorA_in1, GPIO.HIGH)
-        GPIO.output(MotorB_in3, GPIO.HIGH)
-        time.sleep(0.2)
-        stop_motors()
-        time.sleep(0.1)
-
-def angry_motion():
-    for _ in range(3):
-        pwmA.ChangeDutyCycle(100)
-        pwmB.ChangeDutyCycle(100)
-        GPIO.output(MotorA_in1, GPIO.HIGH)
-        GPIO.output(MotorB_in4, GPIO.HIGH)
-        time.sleep(0.15)
-        stop_motors()
+# Each motion is a list of (seconds from start, {motor: (direction, speed)}) handed to
+# the motor worker in one go; the worker thread applies them on time, so nothing here
+# sleeps or races the lip-sync writes on the same pins.
+
+GENTLE_MOTION = [
+    (0.0, {"A": (FORWARD, 30), "B": (REVERSE, 30)}),
+    (0.4, {"A": (BRAKE, 30), "B": (BRAKE, 30)}),
+    (1.6, {"A": (COAST, 0), "B": (COAST, 0)}),
+]
+ALERT_MOTION = [
+    (0.0, {"A": (FORWARD, 70), "B": (FORWARD, 70)}),
+    (0.2, {"A": (COAST, 0), "B": (COAST, 0)}),
+    (0.3, {"A": (FORWARD, 70), "B": (FORWARD, 70)}),
+    (0.5, {"A": (COAST, 0), "B": (COAST, 0)}),
+]
+ANGRY_MOTION = [
+    (0.0, {"A": (FORWARD, 100), "B": (REVERSE, 100)}),
+    (0.45, {"A": (COAST, 0), "B": (COAST, 0)}),
+]
 
 def perform_motion(emotion):
-    {"purr": gentle_motion,
-     "meow": alert_motion,
-     "hiss": angry_motion}[emotion]()
+    start = time.monotonic()
+    for offset, setpoints in {"purr": GENTLE_MOTION,
+                              "meow": ALERT_MOTION,
+                              "hiss": ANGRY_MOTION}[emotion]:
+        get_motors().submit(setpoints, at=start + offset)
 
 # ============================ SPEAK ==============================
 
@@ -181,7 +152,7 @@ def speak(text):
 
     play_cat_sound(emotion)
 
-    r = requests.post(
+    r = elevenlabs_client.post(
         f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}",
         headers={
             "xi-api-key": API_KEY,
@@ -195,19 +166,20 @@ def speak(text):
     play_audio(data, sr)   # 🔊 AUDIO FIRST
 
     # ⚙️ motors after audio starts
-    threading.Thread(
-        target=perform_motion, args=(emotion,), daemon=True
-    ).start()
+    perform_motion(emotion)
 
 
 # ============================ MAIN ===============================
 
+elevenlabs_client.prewarm()
 print("\n🐱 Cat AI Ready. Press Enter to talk.\n")
 
 try:
     while True:
         input("Press Enter to speak...")
         audio = record_audio(RECORD_SECONDS)
+        if not len(audio):
+            continue
         user_text = speech_to_text(audio)
         if not user_text:
             continue
@@ -220,7 +192,4 @@ try:
 except KeyboardInterrupt:
     print("\nShutting down...")
 finally:
-    stop_motors()
-    pwmA.stop()
-    pwmB.stop()
-    GPIO.cleanup()
+    cleanup_motors()
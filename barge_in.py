@@ -0,0 +1,236 @@
+import math
+import threading
+import numpy as np
+import sounddevice as sd
+from vad_recorder import FRAME_MS, PRE_ROLL_SECONDS
+
+# ---------------------------- CONFIG ----------------------------
+ECHO_MARGIN_DB = 10.0         # the mic must beat the expected echo of our own voice by this much
+NOISE_MARGIN_DB = 12.0        # ...and the room noise floor by this much
+ONSET_FRAMES = 3              # consecutive frames (60 ms) of it before the cat is cut off
+DELAY_SLACK_MS = 30           # uncertainty in the speaker -> mic delay, covered by taking the max
+ECHO_START_DB = 0.0           # first guess of the (residual) echo level relative to what we played
+ECHO_ADAPT = 0.1              # how fast the echo estimates follow frames that were only echo
+ECHO_COHERENCE = 0.5          # squared correlation needed before we trust a delay/level estimate
+LAG_HYSTERESIS = 1.5          # a new delay must correlate this much better than the current one
+NOISE_ADAPT = 0.05
+SILENT_DB = -60.0             # reference frames below this count as "not playing"
+
+
+def frame_db(frames):
+    return 10 * np.log10(np.mean(np.square(frames), axis=1) + 1e-10)
+
+
+# ---------------------------- ECHO GATE ----------------------------
+class EchoGate:
+    """Tells the user's voice apart from the cat's own voice coming back through the mic.
+
+    We know exactly what went to the speaker. A one-tap echo canceller (the speaker ->
+    mic delay and level, learned by cross-correlation while only the cat is talking)
+    subtracts most of it, then each 20 ms frame of what is left is compared with the
+    loudest output frame around that delay plus the learned residual level. Frames
+    clearly louder than that (and than the room) are the user talking over the cat.
+    """
+
+    def __init__(self, samplerate, noise_floor=None):
+        self.frame_len = int(samplerate * FRAME_MS / 1000)
+        self.slack = math.ceil(DELAY_SLACK_MS / FRAME_MS)   # reference frames either side
+        self.lag = self.slack * self.frame_len              # echo offset into the reference window
+        self.gain = 0.0                                     # echo = gain * reference, once learned
+        self.echo_db = ECHO_START_DB
+        self.noise_floor = noise_floor
+        self.run = 0
+
+    def _learn_echo_path(self, mic, ref):
+        # cross-correlate over every lag in the window at once (FFT), keep the best if it is clearly echo
+        size = 1 << (len(ref) + len(mic) - 1).bit_length()
+        corr = np.fft.irfft(np.fft.rfft(ref, size) * np.conj(np.fft.rfft(mic, size)), size)[:len(ref) - len(mic) + 1]
+        # normalize by the reference energy under each lag, or loud stretches always win
+        energy = np.cumsum(np.concatenate([[0.0], np.square(ref, dtype=np.float64)]))
+        power = energy[len(mic):] - energy[:-len(mic)]
+        score = corr / np.sqrt(np.maximum(power, 1e-12))
+        lag = int(np.argmax(score))
+        if lag != self.lag and score[lag] < LAG_HYSTERESIS * score[self.lag]:
+            lag = self.lag   # voiced speech correlates at every pitch period too: only move for a clear win
+        if corr[lag] <= 0 or score[lag] ** 2 < ECHO_COHERENCE * float(np.dot(mic, mic)):
+            return
+        self.lag = lag
+        self.gain += ECHO_ADAPT * (corr[lag] / power[lag] - self.gain)
+
+    def process(self, mic, ref):
+        """mic: (n, frame_len) frames. ref: (n + 2 * slack, frame_len) output frames, where
+        row i + slack is the nominal echo of mic row i. Returns the index of the frame
+        where the user started talking over the cat, or None."""
+        n = len(mic)
+        flat_ref = ref.reshape(-1)
+        residual = mic - self.gain * flat_ref[self.lag:self.lag + n * self.frame_len].reshape(mic.shape)
+        res_db = frame_db(residual)
+        ref_db = np.lib.stride_tricks.sliding_window_view(frame_db(ref), 2 * self.slack + 1).max(axis=1)
+        if self.noise_floor is None:
+            self.noise_floor = float(np.min(res_db))
+        user = (res_db > ref_db + self.echo_db + ECHO_MARGIN_DB) & (res_db > self.noise_floor + NOISE_MARGIN_DB)
+
+        # learn from the frames that weren't the user: echo path and level while playing, noise otherwise
+        playing = ref_db > SILENT_DB
+        echo = ~user & playing
+        if echo.all():
+            self._learn_echo_path(mic.reshape(-1), flat_ref)
+        if echo.any():
+            self.echo_db += ECHO_ADAPT * (float(np.mean(res_db[echo] - ref_db[echo])) - self.echo_db)
+        quiet = ~user & ~playing
+        if quiet.any():
+            self.noise_floor += NOISE_ADAPT * (float(np.mean(res_db[quiet])) - self.noise_floor)
+
+        for i, talking in enumerate(user):
+            self.run = self.run + 1 if talking else 0
+            if self.run >= ONSET_FRAMES:
+                return i - ONSET_FRAMES + 1
+        return None
+
+
+# ---------------------------- MONITOR ----------------------------
+class BargeIn:
+    """Watches the engine's mic while the cat talks and cuts it off when the user does.
+
+    Runs in its own thread from construction until close(), but only listens once
+    the reply's speech is actually playing: before that, someone talking over
+    silence is just talking, not interrupting anything. On detection it calls
+    on_barge_in() once (stop the voices and motors there) and sets `detected`;
+    `since` is then the capture position to record the user's turn from, pre-roll
+    included, and `noise_floor` can seed the recorder's VAD so it needs no calibration.
+    Pass the same `gate` every turn: the speaker -> mic path doesn't change, so what
+    it learned during one reply makes the next one quicker to react.
+    """
+
+    def __init__(self, engine, on_barge_in=None, gate=None):
+        self.engine = engine
+        self.on_barge_in = on_barge_in
+        self.gate = gate or EchoGate(engine.samplerate)
+        self.gate.run = 0
+        self.reader = engine.reader()
+        self.detected = threading.Event()
+        self.onset = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="barge-in", daemon=True)
+        self.thread.start()
+
+    @property
+    def since(self):
+        return None if self.onset is None else self.onset - int(PRE_ROLL_SECONDS * self.engine.samplerate)
+
+    @property
+    def noise_floor(self):
+        return self.gate.noise_floor
+
+    def close(self):
+        self.closed = True
+        self.thread.join(timeout=1.0)
+
+    def _check(self, start, end):
+        """Runs the gate over whole frames of mic [start, end) whose echo reference has been
+        played already. Returns how far it got."""
+        length = self.gate.frame_len
+        pad = self.gate.slack * length
+        delay = self.engine.round_trip
+        output = self.engine.output
+        n = min(end - start, output.written - pad + delay - start) // length
+        if n <= 0:
+            return start
+        mic = self.engine.capture.read(start, start + n * length).reshape(n, length)
+        ref_start = start - delay - pad
+        ref = output.read(max(ref_start, 0), start + n * length - delay + pad)
+        ref = np.concatenate([np.zeros(max(-ref_start, 0), dtype=np.float32), ref])
+        onset = self.gate.process(mic, ref.reshape(n + 2 * self.gate.slack, length))
+        if onset is not None:
+            self.onset = start + onset * length
+        return start + n * length
+
+    def _run(self):
+        armed = False
+        while not self.closed:
+            try:
+                self.reader.read(timeout=0.2)
+            except sd.PortAudioError:
+                continue   # stream paused or gone; close() or the next block will sort it out
+            if not armed:
+                armed = self.engine.speaking
+                pos = self.reader.pos
+                continue
+            pos = self._check(pos, self.reader.pos)
+            if self.onset is not None:
+                self.detected.set()
+                if self.on_barge_in is not None:
+                    self.on_barge_in()
+                return
+
+
+# ---------------------------- TEST BLOCK (benchmark) ----------------------------
+if __name__ == "__main__":
+    # Drives a real AudioEngine callback in real time with a simulated room: the mic hears
+    # the cat's own output (delayed, attenuated) plus noise, and a user who starts talking
+    # at a known moment. Reaction time = user onset -> the cat's output is silent.
+    import time
+    import types
+    from audio_engine import AudioEngine, CaptureRing
+
+    sr, block = 48000, 512
+    delay, echo_gain = int(0.025 * sr), 0.5   # 25 ms round trip, speaker fairly close to the mic
+    rng = np.random.default_rng(0)
+    t = np.arange(8 * sr) / sr
+
+    def voice(pitch, level, syllables_per_second):
+        # a few harmonics over a wandering pitch, chopped into syllables: close enough to speech
+        phase = 2 * np.pi * np.cumsum(pitch * (1 + 0.15 * np.sin(2 * np.pi * 0.7 * t))) / sr
+        tone = sum(np.sin(k * phase) / k for k in range(1, 6))
+        syllables = np.clip(np.sin(2 * np.pi * syllables_per_second * t) + 0.3, 0, 1)
+        return (level * tone * syllables).astype(np.float32)
+
+    cat, user = voice(220, 0.4, 3.0), voice(130, 0.25, 2.3)
+
+    def trial(user_onset, gate):
+        engine = AudioEngine(blocksize=block)
+        engine.samplerate = sr
+        engine.capture, engine.output = CaptureRing(10 * sr), CaptureRing(10 * sr)
+        engine._allocate(block)
+        engine.round_trip = delay
+        engine.stream = types.SimpleNamespace(active=True)
+        engine.queue(cat, ducks=True)
+        stopped = []
+        barge = BargeIn(engine, on_barge_in=lambda: (stopped.append(engine.frame), engine.stop_all()), gate=gate)
+        played = np.zeros(len(cat) + sr, dtype=np.float32)
+        ti = types.SimpleNamespace(currentTime=0.0, outputBufferDacTime=0.0)
+        next_time = time.monotonic()
+        for pos in range(0, len(played) - block, block):
+            mic = 0.002 * rng.standard_normal(block).astype(np.float32)
+            if pos >= delay:
+                mic += echo_gain * played[pos - delay:pos - delay + block]
+            if user_onset is not None and pos + block > user_onset:
+                idx = np.arange(pos, pos + block)
+                mic += np.where(idx >= user_onset, user[idx % len(user)], 0).astype(np.float32)
+            out = np.zeros((block, 1), dtype=np.float32)
+            engine._callback(mic[:, None], out, block, ti, None)
+            played[pos:pos + block] = out[:, 0]
+            next_time += block / sr
+            time.sleep(max(0.0, next_time - time.monotonic()))
+            if engine.voices == [] and engine.frame > block:
+                break
+        barge.close()
+        if user_onset is None:
+            return barge.detected.is_set(), None
+        talking_from = user_onset + int(np.argmax(np.abs(user[user_onset:]) > 0.01))   # skip a syllable gap
+        loud = np.flatnonzero(np.abs(played[talking_from:]) > 1e-4)
+        silent_from = talking_from + (loud[-1] + 1 if len(loud) else 0)
+        return barge.detected.is_set(), (silent_from - talking_from) / sr
+
+    detected, reaction = trial(int(1.5 * sr), EchoGate(sr, noise_floor=10 * np.log10(0.002 ** 2)))
+    print("first reply, echo path not learned yet: " + (f"cat silent {reaction * 1000:.0f} ms later" if detected else "MISSED"))
+    gate = EchoGate(sr, noise_floor=10 * np.log10(0.002 ** 2))
+    false_alarm, _ = trial(None, gate)
+    print(f"echo only, no user: {'FALSE barge-in' if false_alarm else 'no barge-in'}")
+    reactions = []
+    for onset_s in (1.5, 2.37, 3.1, 4.05, 5.6):
+        detected, reaction = trial(int(onset_s * sr), gate)
+        reactions.append(reaction * 1000 if detected else np.inf)
+        print(f"user starts at {onset_s:.2f}s: " + (f"cat silent {reaction * 1000:.0f} ms later" if detected else "MISSED"))
+    print(f"barge-in reaction: median {np.median(reactions):.0f} ms, max {np.max(reactions):.0f} ms "
+          f"(onset {ONSET_FRAMES * FRAME_MS} ms + up to a {FRAME_MS} ms frame + a block + the fade)")
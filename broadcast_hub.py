@@ -0,0 +1,191 @@
+import json
+import time
+import asyncio
+from collections import deque
+
+# ---------------------------- CONFIG ----------------------------
+QUEUE_SIZE = 32           # messages buffered per client before the oldest is dropped
+SEND_TIMEOUT = 2.0        # a single send taking longer than this evicts the client
+MAX_DROPS = 64            # a client that keeps overflowing its queue is evicted too
+LATENCY_WINDOW = 256      # recent send latencies kept for the metrics
+
+
+def _is_mood_only(data):
+    # mood flips supersede each other, so only the latest pending one is worth sending
+    return set(data) == {"mood"}
+
+
+class _Client:
+    def __init__(self, ws):
+        self.ws = ws
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.task = None
+
+
+class BroadcastHub:
+    """Fan-out of UI messages to every connected websocket without ever blocking the publisher.
+
+    Each message is serialized once. Every client gets its own bounded queue and sender
+    task: a stalled tab only fills (and drops from) its own queue, and is evicted if
+    a send times out or it keeps overflowing.
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE, send_timeout=SEND_TIMEOUT, max_drops=MAX_DROPS):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.max_drops = max_drops
+        self.clients = {}
+        self.loop = None          # the event loop the clients live on, set by register()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.sent = 0
+        self.dropped = 0
+        self.evicted = 0
+
+    # ---- connections ----
+    def register(self, ws):
+        self.loop = asyncio.get_running_loop()
+        client = _Client(ws)
+        client.task = asyncio.create_task(self._sender(client))
+        self.clients[ws] = client
+        return client
+
+    def unregister(self, ws):
+        client = self.clients.pop(ws, None)
+        if client is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def _evict(self, client, reason):
+        if self.clients.get(client.ws) is not client:
+            return
+        print(f"Evicting UI client ({reason})")
+        self.evicted += 1
+        self.unregister(client.ws)
+        asyncio.create_task(self._close(client.ws))
+
+    async def _close(self, ws):
+        try:
+            await asyncio.wait_for(ws.close(), self.send_timeout)
+        except Exception:
+            pass
+
+    # ---- publishing ----
+    def publish(self, data):
+        """Queues `data` for every client and returns immediately. Safe from any thread:
+        off the event loop (e.g. a player's worker thread) it is handed to the loop."""
+        if self.loop is not None and not self._on_loop():
+            self.loop.call_soon_threadsafe(self._publish, data)
+            return
+        self._publish(data)
+
+    def _on_loop(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def _publish(self, data):
+        msg = json.dumps(data)
+        mood_only = _is_mood_only(data)
+        for client in list(self.clients.values()):
+            queue = client.queue
+            if mood_only and queue and queue[-1][1]:
+                queue[-1] = (msg, True)
+            else:
+                if len(queue) >= self.queue_size:
+                    queue.popleft()
+                    client.dropped += 1
+                    self.dropped += 1
+                    if client.dropped > self.max_drops:
+                        self._evict(client, "too slow")
+                        continue
+                queue.append((msg, mood_only))
+            client.ready.set()
+
+    async def _sender(self, client):
+        while True:
+            await client.ready.wait()
+            client.ready.clear()
+            while client.queue:
+                msg, _ = client.queue.popleft()
+                start = time.perf_counter()
+                try:
+                    await asyncio.wait_for(client.ws.send(msg), self.send_timeout)
+                except asyncio.TimeoutError:
+                    self._evict(client, "send timed out")
+                    return
+                except Exception as e:
+                    self._evict(client, f"send failed: {e!r}")
+                    return
+                self.latencies.append(time.perf_counter() - start)
+                self.sent += 1
+
+    # ---- metrics ----
+    def metrics(self):
+        depths = [len(c.queue) for c in self.clients.values()]
+        latencies_ms = sorted(l * 1000 for l in self.latencies)
+
+        def pct(p):
+            return latencies_ms[min(len(latencies_ms) - 1, int(p * len(latencies_ms)))] if latencies_ms else 0.0
+
+        return {
+            "clients": len(self.clients),
+            "queue_depth_max": max(depths, default=0),
+            "queue_depth_mean": sum(depths) / len(depths) if depths else 0.0,
+            "send_latency_p50_ms": pct(0.5),
+            "send_latency_p95_ms": pct(0.95),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+        }
+
+
+# ---------------------------- TEST BLOCK ----------------------------
+if __name__ == "__main__":
+    # Fifty fake browser tabs, ten of them stalled, while a "voice loop" publishes at 30 Hz.
+    class FakeSocket:
+        def __init__(self, stalled):
+            self.stalled = stalled
+
+        async def send(self, msg):
+            await asyncio.sleep(3600 if self.stalled else 0.001)
+
+        async def close(self):
+            pass
+
+    async def demo():
+        hub = BroadcastHub()
+        for i in range(50):
+            hub.register(FakeSocket(stalled=i % 5 == 0))
+        frame = 1 / 30
+        lateness = []
+        next_tick = time.perf_counter()
+        for i in range(150):
+            hub.publish({"mood": "responding" if i % 2 else "idle"} if i % 10 else {"response": f"line {i}"})
+            next_tick += frame
+            await asyncio.sleep(max(0, next_tick - time.perf_counter()))
+            lateness.append((time.perf_counter() - next_tick) * 1000)
+        lateness.sort()
+        print(f"voice loop tick lateness: p50 {lateness[len(lateness) // 2]:.2f} ms, max {lateness[-1]:.2f} ms")
+        print(hub.metrics())
+
+    asyncio.run(demo())
+
+    # Publishing from a worker thread (what the players' word-timing hook does) while a
+    # stalled tab overflows and gets evicted: everything has to happen on the loop.
+    async def from_thread():
+        hub = BroadcastHub(max_drops=4)
+        hub.register(FakeSocket(stalled=True))
+        await asyncio.sleep(0)   # let the sender pick up the first message and stall
+
+        def worker():
+            for i in range(40):
+                hub.publish({"response": f"line {i}"})
+
+        await asyncio.to_thread(worker)
+        await asyncio.sleep(0.05)   # the handed-over publishes run here
+        assert hub.evicted == 1 and not hub.clients, hub.metrics()
+        print(f"publish from a worker thread: stalled tab evicted on the loop, {hub.dropped} dropped")
+
+    asyncio.run(from_thread())
@@ -0,0 +1,101 @@
+import os
+import glob
+import random
+import numpy as np
+from response_cache import cache_key
+from envelope import envelope
+
+# ---------------------------- CONFIG ----------------------------
+LIBRARY_FOLDER = "canned_responses"
+VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "XdflFrQO8wbGpWMNZHFr")
+MODEL_ID = "eleven_monolingual_v1"
+
+CANNED_LINES = [
+    "Ugh. Give me a second, I'm busy being superior.",
+    "Hold on, I'm deciding whether you're worth answering.",
+    "Wow. That question made me dumber. Thinking...",
+    "Patience, human. Greatness takes time.",
+    "I heard you. I'm just choosing to ignore you for a moment.",
+    "Hmm. Let me find words small enough for you.",
+    "Don't rush me. I was napping.",
+    "Seriously? Fine. One moment.",
+]
+
+
+def amplitude_envelope(data, sr, fps=30):
+    """[level, low, high] rows per frame, same as the voice scripts compute."""
+    return envelope(data, sr, fps)
+
+
+# ---------------------------- BUILD ----------------------------
+def library_path(text, folder=LIBRARY_FOLDER, voice_id=VOICE_ID, model_id=MODEL_ID):
+    return os.path.join(folder, f"{cache_key(voice_id, model_id, text)[:16]}.npz")
+
+
+def build_library(synth, lines=CANNED_LINES, folder=LIBRARY_FOLDER, voice_id=VOICE_ID, model_id=MODEL_ID, fps=30):
+    """Synthesizes every line that isn't in the library yet. `synth(text)` returns (data, sr) or (None, None)."""
+    os.makedirs(folder, exist_ok=True)
+    built = 0
+    for text in lines:
+        path = library_path(text, folder, voice_id, model_id)
+        if os.path.exists(path):
+            continue
+        data, sr = synth(text)
+        if data is None:
+            print("Skipping line with no audio:", text)
+            continue
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim > 1:
+            data = np.mean(data, axis=1)
+        np.savez(path, text=text, data=data, sr=sr, levels=amplitude_envelope(data, sr, fps))
+        built += 1
+        print(f"Built {path}: {text}")
+    return built
+
+
+# ---------------------------- RUNTIME ----------------------------
+class CannedLibrary:
+    """The pre-rendered lines, resampled to the output rate and peak-normalized at startup.
+
+    Entries are (text, audio, levels); levels are at 30 fps.
+    """
+
+    def __init__(self, target_sr, resample, folder=LIBRARY_FOLDER):
+        self.entries = []
+        self.last = None
+        for path in sorted(glob.glob(os.path.join(folder, "*.npz"))):
+            with np.load(path, allow_pickle=False) as npz:
+                data = resample(npz["data"], int(npz["sr"]), target_sr)
+                peak = np.max(np.abs(data)) if len(data) else 0
+                if peak > 0:
+                    data = data / peak
+                self.entries.append((str(npz["text"]), np.ascontiguousarray(data, dtype=np.float32), npz["levels"]))
+        if self.entries:
+            print(f"Loaded {len(self.entries)} canned responses")
+        else:
+            print(f"No canned responses in {folder}/ (run canned_responses.py to build them)")
+
+    def pick(self):
+        """A random line, never the same one twice in a row."""
+        if not self.entries:
+            return None
+        choices = [e for e in self.entries if e is not self.last] or self.entries
+        self.last = random.choice(choices)
+        return self.last
+
+
+# ---------------------------- BATCH TOOL ----------------------------
+if __name__ == "__main__":
+    # Renders CANNED_LINES once through the streaming TTS endpoint; re-running only adds new lines.
+    from tts_stream import iter_tts_pcm, STREAM_SR
+
+    api_key = os.getenv("ELEVENLABS_API_KEY")
+    if not api_key:
+        raise ValueError("Set ELEVENLABS_API_KEY environment variable!")
+
+    def synth(text):
+        parts = list(iter_tts_pcm(text, api_key, VOICE_ID, model_id=MODEL_ID))
+        return (np.concatenate(parts), STREAM_SR) if parts else (None, None)
+
+    built = build_library(synth)
+    print(f"{built} new lines, {len(glob.glob(os.path.join(LIBRARY_FOLDER, '*.npz')))} in the library")
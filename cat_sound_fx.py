@@ -2,7 +2,8 @@ import os
 import sounddevice as sd
 import soundfile as sf
 import numpy as np
-import requests
+import elevenlabs_client
+from audio_upload import encode_for_upload
 from io import BytesIO
 import random
 import glob
@@ -71,15 +72,13 @@ def record_audio(seconds, samplerate):
 
 # ---------------------------- HELPER: SPEECH-TO-TEXT ----------------------------
 def speech_to_text(audio_np, samplerate):
-    wav_file = "temp.wav"
-    sf.write(wav_file, audio_np, samplerate)
-
+    # encoded in memory (16 kHz FLAC): no temp.wav on disk, no file handle left open
     url = "https://api.elevenlabs.io/v1/speech-to-text"
     headers = {"xi-api-key": API_KEY}
-    files = {"file": ("temp.wav", open(wav_file, "rb"), "audio/wav")}
+    files = {"file": encode_for_upload(audio_np, samplerate)}
     data = {"model_id": "scribe_v2"}  # correct model
 
-    r = requests.post(url, headers=headers, files=files, data=data)
+    r = elevenlabs_client.post(url, headers=headers, files=files, data=data)
     if r.status_code != 200:
         print("STT failed:", r.text)
         return ""
@@ -105,7 +104,7 @@ def speak(text):
     url = f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}"
     headers = {"xi-api-key": API_KEY, "Content-Type": "application/json"}
     payload = {"text": text, "model_id": "eleven_monolingual_v1"}
-    r = requests.post(url, headers=headers, json=payload)
+    r = elevenlabs_client.post(url, headers=headers, json=payload)
     if r.status_code != 200:
         print("TTS failed:", r.text)
         return
@@ -151,7 +150,7 @@ def agent_reply(user_text):
         "new_turns_limit": 1
     }
 
-    r = requests.post(url, headers=headers, json=payload)
+    r = elevenlabs_client.post(url, headers=headers, json=payload)
     if r.status_code != 200:
         print("Agent call failed:", r.text)
         return ""
@@ -164,6 +163,7 @@ def agent_reply(user_text):
     return ""
 
 # ---------------------------- MAIN LOOP ----------------------------
+elevenlabs_client.prewarm()
 print("\nVoice agent ready! Speak into your mic.")
 print("Press Enter to start recording a message, Ctrl+C to exit.\n")
 
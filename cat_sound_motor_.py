@@ -2,12 +2,19 @@ import os
 import sounddevice as sd
 import soundfile as sf
 import numpy as np
-import requests
+import elevenlabs_client
 from io import BytesIO
-import random
-import glob
-import time
 from motors_just_fcns import motorA_forward, motorB_forward, stop_motors, cleanup_motors
+from tts_stream import iter_tts_pcm, play_pcm_stream, STREAM_SR
+from vad_recorder import record_until_silence
+from stt import STTSelector, default_backends
+from sound_bank import SoundBank
+from resampler import resample
+from lipsync import play_with_lipsync
+from envelope import envelope, jaw_speeds
+from conversation_memory import ConversationMemory
+from wake_word import WakeDetector, KeywordSpotter
+from audio_devices import AudioDeviceManager
 
 # ---------------------------- CONFIG ----------------------------
 API_KEY = os.getenv("ELEVENLABS_API_KEY")
@@ -17,74 +24,51 @@ if not API_KEY:
 AGENT_ID = "agent_1601khf3r1jfff2saez29f6frfny"  # your agent ID
 VOICE_ID = "XdflFrQO8wbGpWMNZHFr"                 # your TTS voice ID
 
-RECORD_SECONDS = 5
+RECORD_SECONDS = 15  # max utterance length, recording ends on silence
+
+# Stream TTS audio and start talking before the whole clip has downloaded
+STREAM_TTS = True
 
 # Folder containing cat sound effects (WAV files)
 CAT_SOUNDS_FOLDER = "cat_sounds"  # make sure this folder exists with meows/purrs etc.
 
+# Recordings of a wake word ("hey kitty"); without any, just start talking
+WAKE_WORDS_FOLDER = "wake_words"
+
+# Rolling, token-bounded conversation history sent with every agent call
+memory = ConversationMemory()
+
 # ---------------------------- AUTO-SELECT AUDIO DEVICE ----------------------------
-for i, d in enumerate(sd.query_devices()):
-    if d["max_input_channels"] > 0 and d["max_output_channels"] > 0:
-        sd.default.device = (i, i)
-        print("Using audio device:", d["name"])
-        DEFAULT_SR = int(d['default_samplerate'])
-        break
-else:
-    raise RuntimeError("No suitable input/output device found")
-
-def resample_audio(audio, orig_sr, target_sr):
-    if orig_sr == target_sr:
-        return audio.astype(np.float32)
-
-    duration = len(audio) / orig_sr
-    new_length = int(duration * target_sr)
-
-    # mono
-    if audio.ndim == 1:
-        resampled = np.interp(
-            np.linspace(0, len(audio)-1, new_length),
-            np.arange(len(audio)),
-            audio
-        )
-
-    # stereo or multi-channel
-    else:
-        channels = []
-        for ch in range(audio.shape[1]):
-            channels.append(
-                np.interp(
-                    np.linspace(0, len(audio)-1, new_length),
-                    np.arange(len(audio)),
-                    audio[:, ch]
-                )
-            )
-        resampled = np.stack(channels, axis=1)
+# Remembered in .audio_device.json, so a normal start is one query, not a full scan.
+# Not watched for replugs: the sounds below are resampled to this rate once.
+devices = AudioDeviceManager(watch=False)
+DEFAULT_SR = devices.samplerate
+
+def resample_audio(audio, orig_sr, target_sr, out=None):
+    # polyphase filter (no aliasing), float32 throughout, all channels in one go
+    return resample(audio, orig_sr, target_sr, out=out)
 
-    return resampled.astype(np.float32)
+
+# ---------------------------- CAT SOUND BANK ----------------------------
+# Load every cat sound once at startup so playing one is just a lookup
+cat_sounds = SoundBank(CAT_SOUNDS_FOLDER, DEFAULT_SR, resample_audio)
 
 
 # ---------------------------- HELPER: RECORD AUDIO ----------------------------
+# Waits for the user to start talking (or say the wake word) instead of a key press
+wake = WakeDetector(DEFAULT_SR, KeywordSpotter.from_folder(WAKE_WORDS_FOLDER, DEFAULT_SR))
+
 def record_audio(seconds, samplerate):
-    print(f"Recording for {seconds} seconds at {samplerate} Hz...")
-    audio = sd.rec(int(seconds * samplerate), samplerate=samplerate, channels=1, dtype="float32")
-    sd.wait()
-    return audio.flatten()
+    # Stops on its own once the speaker goes quiet; `seconds` is only the upper bound
+    return record_until_silence(samplerate, max_seconds=seconds, wake=wake)
 
 # ---------------------------- HELPER: SPEECH-TO-TEXT ----------------------------
-def speech_to_text(audio_np, samplerate):
-    wav_file = "temp.wav"
-    sf.write(wav_file, audio_np, samplerate)
-
-    url = "https://api.elevenlabs.io/v1/speech-to-text"
-    headers = {"xi-api-key": API_KEY}
-    files = {"file": ("temp.wav", open(wav_file, "rb"), "audio/wav")}
-    data = {"model_id": "scribe_v2"}  # correct model
+# ElevenLabs scribe, plus offline Whisper if faster-whisper is installed; each turn
+# goes to whichever has been answering fastest, the other one if it fails
+stt = STTSelector(default_backends(API_KEY)).warm()
 
-    r = requests.post(url, headers=headers, files=files, data=data)
-    if r.status_code != 200:
-        print("STT failed:", r.text)
-        return ""
-    return r.json().get("text", "")
+def speech_to_text(audio_np, samplerate):
+    return stt.transcribe(audio_np, samplerate)
 
 # ---------------------------- HELPER: PLAY AUDIO ----------------------------
 def play_audio(audio_data, sr):
@@ -99,23 +83,19 @@ def play_audio(audio_data, sr):
     sd.play(audio_data, DEFAULT_SR)
     sd.wait()
 
-def play_audio_dont_wait(audio_data, sr):
+def prepare_audio(audio_data, sr):
     audio_data = resample_audio(audio_data, sr, DEFAULT_SR)
 
-    # ensure float32 (PortAudio prefers this)
-    audio_data = audio_data.astype(np.float32)
-
     audio_data = audio_data / np.max(np.abs(audio_data))
 
-
-    sd.play(audio_data, DEFAULT_SR)
+    return audio_data
 
 # ---------------------------- HELPER: TTS ----------------------------
 def get_speech_from_elevenlabs(text):
     url = f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}"
     headers = {"xi-api-key": API_KEY, "Content-Type": "application/json"}
     payload = {"text": text, "model_id": "eleven_monolingual_v1"}
-    r = requests.post(url, headers=headers, json=payload)
+    r = elevenlabs_client.post(url, headers=headers, json=payload)
     if r.status_code != 200:
         print("TTS failed:", r.text)
         return None, None
@@ -125,39 +105,23 @@ def get_speech_from_elevenlabs(text):
 
 # ---------------------------- HELPER: CALCULATE AMPLITUDE ENVELOPE ----------------------------
 def get_amplitude_envelope(data, sr, fps=30):
-    """
-    Takes raw audio data and returns a list of volume levels synced to a framerate.
-    """
-    # 1. Calculate how many audio samples fit into one "frame" of movement
-    chunk_size = sr // fps
-    
-    # 2. Ensure data is 1D (Mono). If it's stereo, average the two channels.
-    if len(data.shape) > 1:
-        data = np.mean(data, axis=1)
-        
-    # 3. Truncate the end of the audio array so it divides perfectly into our chunks
-    num_chunks = len(data) // chunk_size
-    truncated_data = data[:num_chunks * chunk_size]
-    
-    # 4. Reshape the flat array into a 2D array of chunks
-    chunks = truncated_data.reshape(num_chunks, chunk_size)
-    
-    # 5. Calculate the RMS (volume) for each chunk
-    # Square the data, find the mean of each chunk, then get the square root
-    rms_values = np.sqrt(np.mean(chunks**2, axis=1))
-    
-    # 6. Normalize the values to be between 0.0 and 1.0
-    # This makes it infinitely easier to map to motor speeds or PWM duty cycles later
-    max_rms = np.max(rms_values)
-    if max_rms > 0:
-        normalized_rms = rms_values / max_rms
-    else:
-        normalized_rms = rms_values
-        
-    return normalized_rms
+    # [level, low band, high band] per frame, tail frame included; see envelope.py
+    return envelope(data, sr, fps)
 
 # ---------------------------- HELPER: PLAY SOUND AND MOVE MOTORS ----------------------------
 
+def set_jaw(level):
+    # --- DC Motor Logic ---
+    # level is a [level, low, high] envelope row (see envelope.py). jaw_speeds() stops both motors during pauses/breaths (overall
+    # level under 0.1); otherwise motor A follows the low band and motor B the high one.
+    speed_a, speed_b = jaw_speeds(level)
+    if speed_a or speed_b:
+        motorA_forward(speed=speed_a)
+        motorB_forward(speed=speed_b)
+    else:
+        # If the audio is quiet, stop moving
+        stop_motors()
+
 def play_cat_sound_and_move_motor(data, sr):
     # 1. Play intro sound
     play_cat_sound()
@@ -165,53 +129,41 @@ def play_cat_sound_and_move_motor(data, sr):
     # 2. Get the pre-calculated volume chunks
     fps = 30 # Updates 30 times per second
     amplitudes = get_amplitude_envelope(data, sr, fps=fps)
-    delay_between_frames = 1.0 / fps
     
     print("Starting to 'lip sync'")
     
-    # 3. START AUDIO ONCE (It plays in the background)
-    play_audio_dont_wait(data, sr)
-    
-    # 4. Loop through the pre-calculated motor speeds
-    for amp in amplitudes:
-        start_time = time.time()
-        
-        # --- DC Motor Logic ---
-        # amp is a value between 0.0 and 1.0
-        # We use a threshold (0.1) so the mouth completely stops during pauses/breaths
-        if amp > 0.1: 
-            # DC motors need a minimum speed to overcome physical friction.
-            # Let's map the amplitude to a speed between 40 and 100.
-            speed = int((amp * 100)) 
-            
-            # Move the motor! (Assuming Motor A controls the jaw)
-            motorA_forward(speed=speed) 
-            motorB_forward(speed=speed)
-        else:
-            # If the audio is quiet, stop moving
-            stop_motors()
-            
-        # 5. Keep the loop synchronized with the audio track
-        elapsed = time.time() - start_time
-        time.sleep(max(0, delay_between_frames - elapsed))
+    # 3. Play the audio and move the jaw for each frame as it actually reaches the speaker.
+    #    Deadlines come from the output stream's clock, so GPIO delays can't pile up into drift.
+    sync = play_with_lipsync(prepare_audio(data, sr), DEFAULT_SR, amplitudes, set_jaw, fps=fps)
         
-    # 6. Cleanup
+    # 4. Cleanup
     stop_motors() # Ensure mouth is completely stopped at the end of the sentence
-    sd.wait()     # Catch-all to make sure the audio track is 100% finished
+    print(sync.report())
     
-    # 7. Play outro sound
+    # 5. Play outro sound
+    play_cat_sound()
+
+def stream_cat_speech_and_move_motor(text):
+    # Same as above, but the TTS audio is played (and lip synced) chunk by chunk
+    # while it is still downloading, so the first syllable isn't held up by synthesis.
+    play_cat_sound()
+    chunks = iter_tts_pcm(text, API_KEY, VOICE_ID)
+    stats = play_pcm_stream(chunks, STREAM_SR, out_sr=DEFAULT_SR, on_frame=set_jaw, fps=30)
+    stop_motors()
+    if stats["first_audio_s"] is not None:
+        print(f"First TTS audio after {stats['first_audio_s']:.2f}s")
     play_cat_sound()
 
 
 
 # ---------------------------- HELPER: CAT SOUND EFFECT ----------------------------
 def play_cat_sound():
-    cat_files = glob.glob(os.path.join(CAT_SOUNDS_FOLDER, "*.wav"))
-    if not cat_files:
+    # clips are already decoded, resampled to DEFAULT_SR and normalized at startup
+    clip = cat_sounds.random_clip()
+    if clip is None:
         return
-    cat_file = random.choice(cat_files)
-    data, sr = sf.read(cat_file, dtype="float32")
-    play_audio(data, sr)
+    sd.play(clip, DEFAULT_SR)
+    sd.wait()
 
 # ---------------------------- HELPER: GET AGENT REPLY ----------------------------
 def agent_reply(user_text):
@@ -234,12 +186,13 @@ def agent_reply(user_text):
                     "'What are you even sad about? It's not like you're doing anything. Look at how incompetent you are—you can't even buy me the fancy food I deserve.'"
                 ),
                 "llm_override": "Respond exactly in this toxic cat style. No polite words, no brackets like [sarcastic]."
-            }
+            },
+            "partial_conversation_history": memory.history()
         },
         "new_turns_limit": 1
     }
 
-    r = requests.post(url, headers=headers, json=payload)
+    r = elevenlabs_client.post(url, headers=headers, json=payload)
     if r.status_code != 200:
         print("Agent call failed:", r.text)
         return ""
@@ -248,17 +201,22 @@ def agent_reply(user_text):
     for turn in turns:
         if turn.get("role") == "agent":
             # clean brackets just in case
-            return turn.get("message", "").replace("[sarcastic]", "").strip()
+            reply = turn.get("message", "").replace("[sarcastic]", "").strip()
+            memory.add(user_text, reply)
+            return reply
     return ""
 
 # ---------------------------- MAIN LOOP ----------------------------
+elevenlabs_client.prewarm()
 print("\nVoice agent ready! Speak into your mic.")
-print("Press Enter to start recording a message, Ctrl+C to exit.\n")
+print("Just start talking to the cat, Ctrl+C to exit.\n")
 
 try:
     while True:
-        input("Press Enter to record your message...")
         audio_np = record_audio(RECORD_SECONDS, DEFAULT_SR)
+        if not len(audio_np):
+            print("No speech detected.\n")
+            continue
         print("Processing...")
         user_text = speech_to_text(audio_np, DEFAULT_SR)
         if not user_text:
@@ -272,6 +230,10 @@ try:
             continue
 
         print(f"CAT AI: {reply_text}\n")
+        if STREAM_TTS:
+            stream_cat_speech_and_move_motor(reply_text)
+            continue
+
         data, sr = get_speech_from_elevenlabs(reply_text)
 
         if data is not None and sr is not None:
@@ -0,0 +1,98 @@
+import re
+from collections import deque
+
+# ---------------------------- CONFIG ----------------------------
+CHARS_PER_TOKEN = 4          # rough English average, good enough for budgeting
+HISTORY_TOKENS = 800         # verbatim turns sent with every agent call
+SUMMARY_TOKENS = 200         # gist of everything older than that
+MAX_MESSAGE_TOKENS = 300     # a single rambling turn is clipped to this
+MAX_EXCHANGES = 10           # hard cap on verbatim exchanges, whatever their size
+
+
+def approx_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def clip_tokens(text, tokens):
+    limit = tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def first_sentence(text):
+    return re.split(r"(?<=[.!?])\s+", text.strip(), maxsplit=1)[0]
+
+
+class ConversationMemory:
+    """Rolling window of the conversation, kept under a token budget.
+
+    Recent exchanges (human turn + cat reply) are sent verbatim. Once they go over
+    budget the oldest ones are folded into a short summary (the first sentence of
+    each turn), and the summary itself drops its oldest lines when it outgrows its
+    own budget. So what gets sent per call is bounded however long the session runs.
+    """
+
+    def __init__(self, history_tokens=HISTORY_TOKENS, summary_tokens=SUMMARY_TOKENS,
+                 max_message_tokens=MAX_MESSAGE_TOKENS, max_exchanges=MAX_EXCHANGES):
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.max_message_tokens = max_message_tokens
+        self.max_exchanges = max_exchanges
+        self.exchanges = deque()      # (user_text, agent_text, tokens)
+        self.tokens = 0
+        self.summary = deque()        # (line, tokens)
+        self.summary_size = 0
+        self.total_exchanges = 0
+
+    def add(self, user_text, agent_text):
+        user_text = clip_tokens(user_text.strip(), self.max_message_tokens)
+        agent_text = clip_tokens(agent_text.strip(), self.max_message_tokens)
+        tokens = approx_tokens(user_text) + approx_tokens(agent_text)
+        self.exchanges.append((user_text, agent_text, tokens))
+        self.tokens += tokens
+        self.total_exchanges += 1
+        while len(self.exchanges) > 1 and (self.tokens > self.history_tokens
+                                           or len(self.exchanges) > self.max_exchanges):
+            self._evict()
+
+    def _evict(self):
+        user_text, agent_text, tokens = self.exchanges.popleft()
+        self.tokens -= tokens
+        line = f"Human: {first_sentence(user_text)} / Cat: {first_sentence(agent_text)}"
+        line_tokens = approx_tokens(line)
+        self.summary.append((line, line_tokens))
+        self.summary_size += line_tokens
+        while len(self.summary) > 1 and self.summary_size > self.summary_tokens:
+            self.summary_size -= self.summary.popleft()[1]
+
+    def history(self):
+        """The conversation so far as simulate-conversation `partial_conversation_history`."""
+        turns = []
+        for i, (user_text, agent_text, _) in enumerate(self.exchanges):
+            if i == 0 and self.summary:
+                earlier = "\n".join(line for line, _ in self.summary)
+                user_text = f"(Earlier in this conversation:\n{earlier})\n{user_text}"
+            turns.append({"role": "user", "message": user_text, "time_in_call_secs": 0})
+            turns.append({"role": "agent", "message": agent_text, "time_in_call_secs": 0})
+        return turns
+
+    def clear(self):
+        self.exchanges.clear()
+        self.summary.clear()
+        self.tokens = self.summary_size = 0
+
+
+# ---------------------------- TEST BLOCK ----------------------------
+if __name__ == "__main__":
+    # Payload size should stop growing after the first few turns of a long session.
+    import json
+
+    memory = ConversationMemory()
+    for turn in range(1, 501):
+        user_text = f"This is what I said on turn {turn}. " + "I keep talking about my day. " * (turn % 7)
+        agent_text = f"Turn {turn}, and you are still boring me. " + "Feed me instead. " * (turn % 5)
+        payload = {"simulation_specification": {"simulated_user_config": {"first_message": user_text},
+                                                "partial_conversation_history": memory.history()}}
+        if turn in (1, 2, 5, 10, 50, 100, 250, 500):
+            print(f"turn {turn:3d}: payload {len(json.dumps(payload)):5d} bytes, "
+                  f"{len(memory.exchanges)} verbatim exchanges, {len(memory.summary)} summary lines")
+        memory.add(user_text, agent_text)
@@ -0,0 +1,178 @@
+import os
+import threading
+import httpx
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
+
+# ---------------------------- CONFIG ----------------------------
+# One pooled keep-alive client shared by every script, so a turn (STT -> agent -> TTS)
+# reuses the same TLS connection instead of doing three fresh handshakes.
+BASE_URL = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io")
+
+TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+LIMITS = httpx.Limits(max_connections=8, max_keepalive_connections=8, keepalive_expiry=120)
+MAX_ATTEMPTS = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+PREWARM_CONNECTIONS = 2
+
+try:
+    import h2  # noqa: F401  (httpx only speaks HTTP/2 when this is installed)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+_client = None
+_lock = threading.Lock()
+
+
+def make_client(base_url=BASE_URL, verify=True):
+    return httpx.Client(base_url=base_url, http2=HTTP2, timeout=TIMEOUT, limits=LIMITS, verify=verify)
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = make_client()
+    return _client
+
+
+class RetryableStatus(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+def _retryable(e):
+    # A read timeout means the server already had the request for TIMEOUT seconds:
+    # retrying would only stretch the wait to MAX_ATTEMPTS times that (and might run
+    # the agent turn twice). Connection failures and busy statuses are worth retrying.
+    return isinstance(e, (httpx.TransportError, RetryableStatus)) and not isinstance(e, httpx.ReadTimeout)
+
+
+def _rewind(files):
+    # multipart bodies are read on every attempt, so put file objects back at the start
+    for value in (files or {}).values():
+        fileobj = value[1] if isinstance(value, tuple) else value
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+
+
+@retry(stop=stop_after_attempt(MAX_ATTEMPTS),
+       wait=wait_exponential(multiplier=0.2, max=2),
+       retry=retry_if_exception(_retryable),
+       reraise=True)
+def _send(method, url, stream=False, client=None, **kwargs):
+    client = client or get_client()
+    _rewind(kwargs.get("files"))
+    request = client.build_request(method, url, **kwargs)
+    r = client.send(request, stream=stream)
+    if r.status_code in RETRY_STATUSES:
+        if stream:
+            r.read()
+            r.close()
+        raise RetryableStatus(r)
+    return r
+
+
+def post(url, stream=False, client=None, **kwargs):
+    """POST through the shared client. Accepts the same headers/json/data/files as requests.
+
+    With stream=True the caller must close() the response when done with iter_bytes().
+    """
+    try:
+        return _send("POST", url, stream=stream, client=client, **kwargs)
+    except RetryableStatus as e:
+        return e.response
+
+
+def get(url, client=None, **kwargs):
+    try:
+        return _send("GET", url, client=client, **kwargs)
+    except RetryableStatus as e:
+        return e.response
+
+
+def prewarm(connections=PREWARM_CONNECTIONS, background=True):
+    """Opens keep-alive connections ahead of the first turn."""
+    def warm():
+        try:
+            get_client().head("/")
+        except httpx.HTTPError as e:
+            print("Pre-warm failed:", e)
+
+    threads = [threading.Thread(target=warm, daemon=True) for _ in range(connections)]
+    for t in threads:
+        t.start()
+    if not background:
+        for t in threads:
+            t.join()
+
+
+def close():
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+# ---------------------------- TEST BLOCK (benchmark) ----------------------------
+if __name__ == "__main__":
+    # Round-trip latency per "turn" (3 POSTs) against a local TLS stand-in server:
+    # a fresh connection per call (what bare requests.post does) vs the pooled client.
+    import ssl
+    import time
+    import tempfile
+    import subprocess
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            body = b'{"text": "hello"}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    tmp = tempfile.mkdtemp()
+    cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+                   check=True, capture_output=True)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"https://127.0.0.1:{server.server_port}"
+
+    turns = 30
+    paths = ["/v1/speech-to-text", "/v1/convai/agents/x/simulate-conversation", "/v1/text-to-speech/x"]
+
+    start = time.perf_counter()
+    for _ in range(turns):
+        for path in paths:
+            httpx.post(url + path, json={"text": "hi"}, verify=False)
+    fresh = (time.perf_counter() - start) / turns
+
+    pooled_client = make_client(url, verify=False)
+    pooled_client.head("/")   # pre-warm
+    start = time.perf_counter()
+    for _ in range(turns):
+        for path in paths:
+            post(path, json={"text": "hi"}, client=pooled_client)
+    pooled = (time.perf_counter() - start) / turns
+    pooled_client.close()
+
+    print(f"fresh connection per call: {fresh * 1000:7.2f} ms/turn")
+    print(f"pooled keep-alive client:  {pooled * 1000:7.2f} ms/turn  (HTTP/2: {HTTP2})")
+    server.shutdown()
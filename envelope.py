@@ -0,0 +1,336 @@
+from functools import lru_cache
+import numpy as np
+
+# ---------------------------- CONFIG ----------------------------
+OVERLAP = 2                   # each frame's energy window spans this many frames (itself plus history)
+ANALYSIS_SR = 2400            # frames are box-decimated to about this rate for the low band's DFT
+LOW_BAND = (80, 800)          # voice fundamental + first formant: drives motor A
+HIGH_CUTOFF = 800             # consonants and brightness, everything above this: drives motor B
+PEAK_HALF_LIFE = 3.0          # seconds for the running peak to decay by half after loud bits
+MIN_PEAK = 0.01               # RMS floor for the peak, so silence/noise never maps to full jaw
+JAW_THRESHOLD = 0.1           # overall level under which the jaw stops (pauses, breaths)
+BATCH = 1024                  # most frames worked on at once (longer clips go in slices)
+SMALL_CHUNK = 8               # chunks up to this many frames sum their windows in one batched matmul
+
+# Output columns
+LEVEL, LOW, HIGH = 0, 1, 2
+
+
+@lru_cache(maxsize=None)
+def low_band_basis(sr, hop, q, band=LOW_BAND, cutoff=HIGH_CUTOFF):
+    """The DFT bins under `cutoff` of a frame box-summed every q samples, as a basis and weights.
+
+    Returns (basis, weights): basis is (hop // q, 2 * bins + 1), interleaved cos/sin
+    columns and an empty last one for the frame's whole sum of squares to go in. A
+    frame's squared projections with that sum, times `weights`, give its [level, low,
+    high] sums of squares: high is the whole minus everything under the cutoff. Each
+    bin is divided by the box's gain there, so the decimation doesn't tilt the band.
+    """
+    block = hop // q
+    bins = int(np.ceil(cutoff * hop / sr))
+    freqs = np.arange(bins) * sr / hop
+    phase = 2 * np.pi * np.outer(np.arange(block), np.arange(bins)) / block
+    basis = np.zeros((block, 2 * bins + 1))
+    basis[:, :-1] = np.stack([np.cos(phase), np.sin(phase)], axis=2).reshape(block, 2 * bins)
+    # gain of a q-sample box sum at each bin (q at DC)
+    x = np.pi * freqs / sr
+    gain = np.where(freqs > 0, np.abs(np.sin(q * x)) / np.maximum(np.abs(np.sin(x)), 1e-12), q)
+    # Parseval, one-sided: DC counts once, every other bin for itself and its mirror
+    scale = np.where(freqs > 0, 2.0, 1.0) / (hop * gain * gain)
+    weights = np.zeros((2 * bins + 1, 3))
+    weights[:-1, LOW] = np.repeat(scale * ((freqs >= band[0]) & (freqs < band[1])), 2)
+    weights[:-1, HIGH] = -np.repeat(scale, 2)
+    weights[-1, [LEVEL, HIGH]] = 1.0
+    return basis.astype(np.float32), weights.astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def window_weights(sr, hop, q, overlap, decay):
+    """low_band_basis' weights once per frame of an overlap-frame window, as one copy for
+    each frame of a SMALL_CHUNK-frame chunk with that frame's peak decay divided out."""
+    weights = np.concatenate([low_band_basis(sr, hop, q)[1]] * overlap)
+    ramp = decay ** np.arange(1, SMALL_CHUNK + 1)
+    return (weights / np.square(ramp)[:, None, None]).astype(np.float32)
+
+
+# a row-by-row dot product: a ufunc on numpy 2, a batch of matmuls before it
+if hasattr(np, "vecdot"):
+    dot = np.vecdot
+else:
+    def dot(a, b, out):
+        return np.matmul(a[:, None, :], b[:, :, None], out=out[:, None, None])
+
+
+class EnvelopeExtractor:
+    """Streaming level / low-band / high-band envelope, one row per 1/fps frame.
+
+    Feed it audio in chunks of any size; process() returns the rows for every frame
+    that completed. Each frame's energy is taken over a window of OVERLAP frames (the
+    new one plus history). Levels are normalized by a slowly decaying running peak, so
+    the same numbers come out whether a clip arrives all at once or in pieces. Buffers
+    are preallocated and reused: once warmed up, a chunk allocates nothing.
+
+    The level is each frame's plain sum of squares. The low band comes from a small
+    DFT of the frame box-summed down to ~ANALYSIS_SR (only the bins under HIGH_CUTOFF
+    are computed), and the high band is the level minus everything under the cutoff.
+    With bands=False each row is just the level: for audio that doesn't drive the
+    motors (word timings, UI).
+    """
+
+    def __init__(self, sr, fps=30, overlap=OVERLAP, peak_half_life=PEAK_HALF_LIFE, min_peak=MIN_PEAK,
+                 bands=True):
+        self.bands = bands
+        self.hop = sr // fps
+        self.overlap = overlap
+        self.decay = 0.5 ** (1.0 / (peak_half_life * fps))
+        if bands:
+            # the largest box that still keeps the decimated rate over ANALYSIS_SR
+            self.q = max(1, sr // ANALYSIS_SR)
+            while self.hop % self.q:
+                self.q -= 1
+            self.box = np.ones(self.q, dtype=np.float32)
+            self.basis, self.weights = low_band_basis(sr, self.hop, self.q)
+            self.ramped = window_weights(sr, self.hop, self.q, overlap, self.decay)
+            self.row = (3,)
+            self.width = (len(self.weights),)
+        else:
+            self.row = self.width = ()
+        # energies are plain sums of squares over the window: scale the floor to match
+        self.min_peak = np.float32(min_peak * np.sqrt(self.hop * overlap))
+        self.carried = 0   # samples of the frame in progress, kept at the start of self.frames
+        self.capacity = 0  # buffers are sized by the first chunk
+
+    def _reserve(self, frames):
+        if self.capacity >= max(frames, 1):
+            return
+        # projected[:overlap-1] always holds the frames before the next chunk, and
+        # scaled[0] the running peak so far
+        h = self.overlap - 1
+        history = self.projected[:h].copy() if self.capacity else np.zeros((h,) + self.width, dtype=np.float32)
+        peak = self.scaled[:1].copy() if self.capacity else np.full((1,) + self.row, self.min_peak, dtype=np.float32)
+        carry = self.frames[:self.carried].copy() if self.capacity else None
+        self.capacity = frames = max(frames, 2 * self.capacity, SMALL_CHUNK)
+        self.frames = np.empty((frames + 1) * self.hop, dtype=np.float32)
+        if carry is not None:
+            self.frames[:len(carry)] = carry
+        self.projected = np.empty((frames + h,) + self.width, dtype=np.float32)
+        self.projected[:h] = history
+        self.rms = np.empty((frames,) + self.row, dtype=np.float32)
+        # the running peak's decay, one row per frame (plain rows: no broadcasting per chunk)
+        ramp = self.decay ** np.arange(frames + 1, dtype=np.float32)
+        self.ramp = np.repeat(ramp[:, None], 3, axis=1) if self.bands else ramp
+        self.floor = self.min_peak / self.ramp
+        if self.bands:
+            self.blocks = np.empty((frames, self.hop // self.q), dtype=np.float32)
+            self.energy = np.empty((frames + h, 3), dtype=np.float32)
+        else:
+            self.energy = self.projected
+        self.scaled = np.empty((frames + 1,) + self.row, dtype=np.float32)
+        self.scaled[:1] = peak
+        self.peaks = np.empty_like(self.scaled)
+        self.out = np.empty_like(self.rms)
+        self.views = {}
+
+    def _views(self, n):
+        """The buffer slices for an n-frame chunk, made once per chunk size: numpy's slicing
+        costs about as much as the arithmetic on a few frames."""
+        views = self.views.get(n)
+        if views is None:
+            h, used = self.overlap - 1, n * self.hop
+            projected, energy = self.projected, self.energy
+            small = None
+            if self.bands and n <= SMALL_CHUNK:
+                # row i is rows i..i+h of `projected` back to back (a view, no copy; made
+                # directly, as_strided alone costs as much as the rest of a flush)
+                windows = np.ndarray((n, 1, self.overlap * self.width[0]), np.float32, projected,
+                                     strides=(projected.strides[0], 0, projected.itemsize))
+                small = windows, self.ramped[:n], self.scaled[1:n + 1, None]
+            views = self.views[n] = (
+                # the frames, when they start with a carried-over partial one
+                self.frames[:used].reshape(n, self.hop), self.frames[:used].reshape(-1, self.q) if self.bands else None,
+                # per-frame rows
+                self.blocks[:n].reshape(-1) if self.bands else None, self.blocks[:n] if self.bands else None,
+                projected[h:n + h], projected[h:n + h, -1] if self.bands else projected[h:n + h],
+                projected[:h], projected[n:n + h],
+                # windows
+                small, projected[:n + h], energy[:n + h], energy[h:n + h],
+                [energy[k:k + n] for k in range(h - 1, -1, -1)], self.rms[:n],
+                # running peak
+                self.ramp[1:n + 1], self.scaled[:n + 1], self.scaled[1:n + 1], self.peaks[:n + 1],
+                self.peaks[1:n + 1], self.floor[:n + 1], self.peaks[n:n + 1], self.ramp[n:n + 1],
+                self.scaled[:1], self.out[:n])
+        return views
+
+    def process(self, samples):
+        """Returns a (frames, 3) view of [level, low, high] rows (a (frames,) view of levels
+        with bands=False), valid until the next call."""
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        if len(samples) > BATCH * self.hop:
+            # long clips in slices, so the decay divided out never leaves float32's range
+            return np.concatenate([self.process(part).copy()
+                                   for part in np.array_split(samples, -(-len(samples) // (BATCH * self.hop)))])
+        total = self.carried + len(samples)
+        n = total // self.hop
+        if n > self.capacity or not self.capacity:
+            self._reserve(n)
+        if not n:
+            self.frames[self.carried:total] = samples
+            self.carried = total
+            return self.out[:0]
+
+        (frames, boxes, decimated, blocks, projected, level, history, newest, small, stacked, energies, energy, before, rms,
+         ramp, prefixed, scaled, peaks, new_peaks, floor, last_peak, last_ramp, peak, out) = self._views(n)
+        # whole frames, starting with the carried-over partial one (if there is none,
+        # the frames are read straight out of `samples`)
+        used = n * self.hop
+        if self.carried:
+            self.frames[self.carried:total] = samples
+            rest = self.frames[used:total]
+        else:
+            frames, rest = samples[:used].reshape(n, self.hop), samples[used:]
+            boxes = frames.reshape(-1, self.q) if self.bands else None
+
+        # each frame's row: the squared DFT bins under the cutoff (box-summed every q
+        # samples first: a dot, numpy reduces a tiny inner axis much slower), then its
+        # sum of squares in the basis' empty last column
+        if self.bands:
+            np.dot(boxes, self.box, out=decimated)
+            np.dot(blocks, self.basis, out=projected)
+            np.square(projected, out=projected)
+        dot(frames, frames, out=level)
+        self.carried = len(rest)
+        self.frames[:self.carried] = rest
+
+        # the weights turn each row into [level, low, high] sums of squares, summed over the
+        # frame's window (it plus the overlap-1 before it), then the rms with the running
+        # peak's decay so far divided out (see below). A few frames' worth is cheapest as one
+        # batched matmul over overlapping views; many, as a dot and plain adds
+        if small:
+            windows, ramped, scaled_rows = small
+            np.matmul(windows, ramped, out=scaled_rows)
+            np.sqrt(scaled, out=scaled)
+        else:
+            if self.bands:
+                np.dot(stacked, self.weights, out=energies)
+            if before:
+                np.add(energy, before[0], out=rms)
+            else:
+                rms[:] = energy
+            for row in before[1:]:
+                rms += row
+            np.sqrt(rms, out=rms)
+            np.divide(rms, ramp, out=scaled)
+        history[:] = newest
+
+        # running peak p[i] = max(p[i-1] * decay, rms[i]) for the whole chunk at once: with
+        # the decay divided out it's a cumulative max (scaled[0] is the peak so far), and
+        # rms / max(p, floor) is the same ratio with the decay divided out of both
+        np.maximum.accumulate(prefixed, axis=0, out=peaks)
+        np.maximum(peaks, floor, out=peaks)
+        np.multiply(last_peak, last_ramp, out=peak)
+        return np.divide(scaled, new_peaks, out=out)
+
+    def flush(self):
+        """Pads the partial last frame with silence and returns its row."""
+        if not self.carried:
+            return self.out[:0]
+        return self.process(np.zeros(self.hop - self.carried, dtype=np.float32))
+
+
+def envelope(data, sr, fps=30, bands=True):
+    """Whole-clip [level, low, high] rows (just levels with bands=False), tail frame included."""
+    extractor = EnvelopeExtractor(sr, fps, bands=bands)
+    rows = extractor.process(data).copy()
+    return np.concatenate([rows, extractor.flush()])
+
+
+def jaw_speeds(level, threshold=JAW_THRESHOLD):
+    """(motor A, motor B) speeds 0..100 for one envelope row: A follows the low band, B the high.
+
+    A plain 0..1 level (older cached clips, simple scripts) drives both motors alike.
+    Returns (0, 0) when the overall level is under the threshold.
+    """
+    if np.ndim(level):
+        overall, low, high = level[LEVEL], level[LOW], level[HIGH]
+    else:
+        overall = low = high = level
+    if overall <= threshold:
+        return 0, 0
+    return int(min(low, 1.0) * 100), int(min(high, 1.0) * 100)
+
+
+# ---------------------------- TEST BLOCK (benchmark) ----------------------------
+if __name__ == "__main__":
+    # Old reshape/mean envelope vs this one, offline and fed in ~93 ms network-sized chunks,
+    # plus how much memory the streaming path allocates per frame once warmed up.
+    import time
+    import tracemalloc
+
+    sr, fps = 48000, 30
+    rng = np.random.default_rng(0)
+    t = np.arange(10 * sr + sr // 50) / sr   # 10 s plus a 20 ms tail
+    audio = ((0.3 * np.sin(2 * np.pi * 150 * t) + 0.05 * rng.standard_normal(len(t)))
+             * (np.sin(2 * np.pi * 2 * t) > 0)).astype(np.float32)
+
+    def old_envelope(data, sr, fps=30):
+        chunk_size = sr // fps
+        num_chunks = len(data) // chunk_size
+        chunks = data[:num_chunks * chunk_size].reshape(num_chunks, chunk_size)
+        rms_values = np.sqrt(np.mean(chunks**2, axis=1))
+        return rms_values / np.max(rms_values)
+
+    def old_streaming(chunks, sr, fps=30):
+        # what StreamingPlayer did per chunk: concatenate the carry, then a Python loop per frame
+        frame, carry, peak, levels = sr // fps, np.zeros(0, dtype=np.float32), 0.0, []
+        for chunk in chunks:
+            data = np.concatenate([carry, chunk])
+            n = len(data) // frame
+            for rms in np.sqrt(np.mean(np.square(data[:n * frame].reshape(n, frame)), axis=1)):
+                peak = max(peak, float(rms))
+                levels.append(rms / peak if peak > 0 else 0.0)
+            carry = data[n * frame:]
+        return levels
+
+    def new_streaming(chunks, sr, fps=30, bands=True):
+        extractor = EnvelopeExtractor(sr, fps, bands=bands)
+        return sum(len(extractor.process(chunk)) for chunk in chunks)
+
+    chunks = np.array_split(audio, len(audio) // 4458)
+
+    def bench(fn, *args, runs=20):
+        # best of the runs, so a stray scheduler hiccup doesn't pick the winner
+        fn(*args)
+        best = float("inf")
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn(*args)
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+    frames = len(audio) // (sr // fps)
+    for label, fn, args in [("old offline (1 band)", old_envelope, (audio, sr)),
+                            ("new offline (level only)", envelope, (audio, sr, fps, False)),
+                            ("new offline (3 bands)", envelope, (audio, sr)),
+                            ("old streaming (1 band)", old_streaming, (chunks, sr)),
+                            ("new streaming (level only)", new_streaming, (chunks, sr, fps, False)),
+                            ("new streaming (3 bands)", new_streaming, (chunks, sr))]:
+        ms = bench(fn, *args)
+        print(f"{label:27s} {ms:7.2f} ms per 10 s clip, {ms * 1000 / frames:6.1f} us/frame")
+
+    extractor = EnvelopeExtractor(sr, fps)
+    for chunk in chunks[:20]:
+        extractor.process(chunk)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for chunk in chunks[20:]:
+        extractor.process(chunk)
+    grown = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"streaming, warmed up: {grown} bytes retained, peak transient {peak_bytes} bytes per chunk "
+          f"(slice objects), over {len(chunks) - 20} chunks")
+
+    rows = envelope(audio, sr)
+    print(f"offline frames: {len(rows)} (old dropped the tail: {len(old_envelope(audio, sr))})")
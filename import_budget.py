@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+import types
+
+# Checks that `import all_in_one` is cheap and side-effect free: no audio devices,
+# GPIO, API key or network. Hardware libraries are replaced by fakes that fail
+# loudly if anything touches them during import. Usage: python import_budget.py
+
+# ---------------------------- CONFIG ----------------------------
+BUDGET_MS = 50
+# Third-party libraries are loaded up front: their own import cost isn't ours to fix,
+# and on the Pi they are warm in the page cache anyway.
+PRELOAD = ["numpy", "soundfile", "httpx", "tenacity", "websockets", "requests", "asyncio", "json"]
+
+
+class HardwareTouched(AssertionError):
+    pass
+
+
+class FakeBackend(types.ModuleType):
+    """A module where every attribute access means something touched hardware."""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        raise HardwareTouched(f"{self.__name__}.{name} used during import")
+
+
+def install_fakes():
+    sys.modules["sounddevice"] = FakeBackend("sounddevice")
+    sys.modules["pigpio"] = FakeBackend("pigpio")
+    rpi = types.ModuleType("RPi")
+    rpi.GPIO = FakeBackend("RPi.GPIO")
+    sys.modules["RPi"] = rpi
+    sys.modules["RPi.GPIO"] = rpi.GPIO
+    os.environ.pop("ELEVENLABS_API_KEY", None)
+
+
+if __name__ == "__main__":
+    for name in PRELOAD:
+        __import__(name)
+    install_fakes()
+    start = time.perf_counter()
+    import all_in_one  # noqa: F401
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"import all_in_one: {elapsed_ms:.1f} ms (budget {BUDGET_MS} ms)")
+    if elapsed_ms > BUDGET_MS:
+        sys.exit("over the import-time budget")
@@ -0,0 +1,70 @@
+import time
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+def once(fn):
+    """Turns a zero-argument setup function into a lazy, thread-safe singleton.
+
+    The first call runs it, concurrent callers wait for that result, and every later
+    call returns it straight away. If setup raises, the next call tries again.
+    """
+    lock = threading.Lock()
+    result = []
+
+    @functools.wraps(fn)
+    def wrapper():
+        if not result:
+            with lock:
+                if not result:
+                    result.append(fn())
+        return result[0]
+
+    wrapper.ready = lambda: bool(result)
+    return wrapper
+
+
+def once_per(key):
+    """Like `once`, but the result is rebuilt whenever key() changes, e.g. anything
+    resampled to the device rate after a dongle with a different rate is plugged in."""
+    def decorate(fn):
+        lock = threading.Lock()
+        result = []   # [(key, value)]
+
+        @functools.wraps(fn)
+        def wrapper():
+            current = key()
+            if not result or result[0][0] != current:
+                with lock:
+                    if not result or result[0][0] != current:
+                        result[:] = [(current, fn())]
+            return result[0][1]
+
+        wrapper.ready = lambda: bool(result)
+        return wrapper
+    return decorate
+
+
+def probe_in_parallel(*probes):
+    """Calls every probe at the same time and prints how long each took.
+
+    Probes that depend on each other (e.g. the sound bank needs the device sample
+    rate) just block on the other's `once` lock. The first failure is re-raised
+    after all of them have finished.
+    """
+    def timed(probe):
+        start = time.perf_counter()
+        probe()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(probes), thread_name_prefix="probe") as pool:
+        futures = [(probe.__name__, pool.submit(timed, probe)) for probe in probes]
+    for name, future in futures:
+        if future.exception() is None:
+            print(f"  {name}: {future.result() * 1000:.0f} ms")
+    print(f"Startup probes done in {(time.perf_counter() - start) * 1000:.0f} ms")
+    for _, future in futures:
+        if future.exception() is not None:
+            raise future.exception()
@@ -0,0 +1,168 @@
+import time
+import threading
+import numpy as np
+import sounddevice as sd
+
+# ---------------------------- CONFIG ----------------------------
+POLL_SECONDS = 0.005                    # re-read the audio clock at least this often while waiting
+FADE_SECONDS = 0.02                     # ramp down when playback is stopped early, so it doesn't click
+HIST_EDGES_MS = [-np.inf, -10, -5, -2, 0, 2, 5, 10, 20, 50, np.inf]
+
+
+# ---------------------------- AUDIO CLOCK ----------------------------
+class AudioClock:
+    """Maps output sample positions to time.monotonic() deadlines.
+
+    The output callback calls update() with the number of samples it had already
+    played before the current block. PortAudio tells us when that block will reach
+    the DAC, so every motor deadline is derived from where the speaker actually is,
+    not from how long our own loop has been sleeping.
+    """
+
+    def __init__(self, sr):
+        self.sr = sr
+        self.anchor = None   # (monotonic time the anchor sample hits the DAC, anchor sample)
+
+    def update(self, frame, time_info, fallback_latency=0.0, offset=0.0):
+        # offset: seconds into the block where `frame` starts (voices mixed mid-block)
+        now = time.monotonic()
+        dac_delay = time_info.outputBufferDacTime - time_info.currentTime
+        if not 0 <= dac_delay < 1:   # some host APIs report zeros here
+            dac_delay = fallback_latency
+        self.anchor = (now + dac_delay + offset, frame)
+
+    def time_of(self, frame):
+        anchor = self.anchor
+        if anchor is None:
+            return None
+        return anchor[0] + (frame - anchor[1]) / self.sr
+
+    def wait_until(self, frame, stop_event):
+        """Sleeps until `frame` is audible. Returns how late we are in seconds, or None if stopped."""
+        while not stop_event.is_set():
+            deadline = self.time_of(frame)
+            if deadline is None:
+                time.sleep(0.001)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return -remaining
+            time.sleep(min(remaining, POLL_SECONDS))
+        return None
+
+
+# ---------------------------- SYNC STATS ----------------------------
+class SyncStats:
+    """Motor-vs-audio error per frame (positive = jaw moved after the sound)."""
+
+    def __init__(self):
+        self.errors_ms = []
+        self.skipped = 0
+
+    def add(self, error_s):
+        self.errors_ms.append(error_s * 1000)
+
+    def histogram(self):
+        counts, _ = np.histogram(self.errors_ms, bins=HIST_EDGES_MS)
+        return counts
+
+    def report(self):
+        if not self.errors_ms:
+            return "lip-sync: no frames"
+        errors = np.asarray(self.errors_ms)
+        lines = [f"lip-sync error over {len(errors)} frames ({self.skipped} skipped): "
+                 f"mean {errors.mean():.1f} ms, p50 {np.percentile(errors, 50):.1f} ms, "
+                 f"p95 {np.percentile(errors, 95):.1f} ms, max {errors.max():.1f} ms"]
+        for lo, hi, count in zip(HIST_EDGES_MS[:-1], HIST_EDGES_MS[1:], self.histogram()):
+            lines.append(f"  [{lo:>5} ms, {hi:>5} ms) {'#' * int(count * 40 / len(errors)):40s} {count}")
+        return "\n".join(lines)
+
+
+# ---------------------------- PLAYBACK + MOTORS ----------------------------
+def follow_levels(clock, sr, levels, on_frame, fps, done, stats):
+    """Calls on_frame(level) as each 1/fps frame of the audio behind `clock` becomes audible.
+
+    Frames we are more than one frame late for are skipped rather than played late,
+    so a slow GPIO call can never push the jaw behind the voice for good.
+    """
+    frame_period = 1.0 / fps
+    for i, level in enumerate(levels):
+        frame = int(round(i * sr / fps))
+        late = clock.wait_until(frame, done)
+        if late is None:
+            break
+        if late > frame_period and i + 1 < len(levels):
+            stats.skipped += 1
+            continue
+        on_frame(level)
+        stats.add(time.monotonic() - clock.time_of(frame))
+    return stats
+
+
+def play_with_lipsync(audio, sr, levels, on_frame, fps=30, stop_event=None, engine=None, on_voice=None):
+    """Plays `audio` (already at `sr`) and calls on_frame(level) as each 1/fps frame becomes audible.
+
+    Setting `stop_event` fades the audio out and returns within one audio block.
+    With an AudioEngine the clip is queued on its shared stream as a speech voice
+    (ducking effects) instead of opening one; on_voice(voice) can mix things around it.
+    """
+    if engine is not None:
+        voice = engine.queue(audio, ducks=True)
+        if on_voice is not None:
+            on_voice(voice)
+        if stop_event is not None:
+            def stop_when_asked():
+                while not voice.done.is_set():
+                    if stop_event.wait(0.05):
+                        voice.stop()
+                        return
+            threading.Thread(target=stop_when_asked, daemon=True).start()
+        stats = follow_levels(voice.clock, sr, levels, on_frame, fps, voice.done, SyncStats())
+        voice.wait()
+        return stats
+
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+    if audio.ndim == 1:
+        audio = audio[:, None]
+    clock = AudioClock(sr)
+    done = threading.Event()
+    position = [0]
+    latency = [0.0]
+
+    def callback(outdata, frames, time_info, status):
+        start = position[0]
+        chunk = audio[start:start + frames]
+        outdata[:len(chunk)] = chunk
+        outdata[len(chunk):] = 0
+        clock.update(start, time_info, latency[0])
+        position[0] = start + len(chunk)
+        if stop_event is not None and stop_event.is_set():
+            fade = min(frames, max(1, int(sr * FADE_SECONDS)))
+            outdata[:fade] *= np.linspace(1, 0, fade, dtype=np.float32)[:, None]
+            outdata[fade:] = 0
+            raise sd.CallbackStop
+        if len(chunk) < frames:
+            raise sd.CallbackStop
+
+    stream = sd.OutputStream(samplerate=sr, channels=audio.shape[1], dtype="float32",
+                             callback=callback, finished_callback=done.set)
+    latency[0] = stream.latency
+    with stream:
+        stats = follow_levels(clock, sr, levels, on_frame, fps, done, SyncStats())
+        done.wait()
+    return stats
+
+
+# ---------------------------- TEST BLOCK ----------------------------
+if __name__ == "__main__":
+    # 20 s of modulated tone with a deliberately slow "GPIO" call, to check the jaw doesn't drift.
+    sr = int(sd.query_devices(kind="output")["default_samplerate"])
+    fps = 30
+    t = np.arange(20 * sr) / sr
+    audio = (0.2 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 2 * t) > 0)).astype(np.float32)
+    levels = (np.sin(2 * np.pi * 2 * np.arange(20 * fps) / fps) > 0).astype(np.float32)
+
+    def slow_motor(level):
+        time.sleep(0.004)
+
+    print(play_with_lipsync(audio, sr, levels, slow_motor, fps=fps).report())
@@ -1,9 +1,13 @@
 import os
-import requests
+import elevenlabs_client
 import sounddevice as sd
 import soundfile as sf
 import numpy as np
 from io import BytesIO
+from stt import STTSelector, default_backends
+from audio_devices import AudioDeviceManager
+from vad_recorder import record_until_silence
+from wake_word import WakeDetector, KeywordSpotter
 
 # -----------------------
 # CONFIG
@@ -15,33 +19,30 @@ if not API_KEY:
 AGENT_ID = "agent_5301khev8757e4qskqcpqhq6em2e"  # your agent
 VOICE_ID = "EXAVITQu4vr4xnSDxMaL"                 # your real voice_id
 
-RECORD_SECONDS = 5  # seconds to record per turn
+RECORD_SECONDS = 15  # max seconds to record per turn, recording ends on silence
+WAKE_WORDS_FOLDER = "wake_words"  # recordings of a wake word; without any, just start talking
 
 # -----------------------
-# Auto-select USB mic + speaker
+# Auto-select USB mic + speaker (remembered in .audio_device.json)
 # -----------------------
-devices = sd.query_devices()
-usb_index = None
-for i, d in enumerate(devices):
-    if d['max_input_channels'] > 0 and d['max_output_channels'] > 0 and "USB" in d['name']:
-        usb_index = i
-        break
-if usb_index is None:
-    raise RuntimeError("No USB duplex device found")
-
-sd.default.device = (usb_index, usb_index)
-print("Using audio device:", devices[usb_index]['name'])
+devices = AudioDeviceManager(match="USB")
 
 # -----------------------
 # Helper: record audio from mic
 # -----------------------
+wake = None
+
 def record_audio(seconds=RECORD_SECONDS):
-    device_info = sd.query_devices(sd.default.device[0])
-    samplerate = int(device_info['default_samplerate'])
-    print(f"Recording for {seconds} seconds at {samplerate} Hz...")
-    audio = sd.rec(int(seconds * samplerate), samplerate=samplerate, channels=1, dtype='float32')
-    sd.wait()
-    return audio.flatten(), samplerate
+    # waits for the user to start talking (or say the wake word), no key press; if the
+    # device is unplugged mid-recording, it is found again and the recording retried
+    devices.ensure()
+
+    def record(samplerate):
+        global wake
+        if wake is None or wake.samplerate != samplerate:
+            wake = WakeDetector(samplerate, KeywordSpotter.from_folder(WAKE_WORDS_FOLDER, samplerate))
+        return record_until_silence(samplerate, max_seconds=seconds, wake=wake), samplerate
+    return devices.with_device(record)
 
 # -----------------------
 # Helper: TTS and play
@@ -51,7 +52,7 @@ def speak(text):
     headers = {"xi-api-key": API_KEY, "Content-Type": "application/json"}
     payload = {"text": text, "model_id": "eleven_monolingual_v1"}
 
-    r = requests.post(url, headers=headers, json=payload)
+    r = elevenlabs_client.post(url, headers=headers, json=payload)
     if r.status_code != 200:
         print("TTS failed:", r.text)
         return
@@ -61,32 +62,12 @@ def speak(text):
     sd.wait()
 
 # -----------------------
-# Helper: STT (Scribe v2)
+# Helper: STT (Scribe v2, or offline Whisper if installed: whichever answers faster)
 # -----------------------
-def speech_to_text(audio_np, samplerate):
-    import soundfile as sf
-    import requests
+stt = STTSelector(default_backends(API_KEY)).warm()
 
-    # Save audio temporarily
-    wav_file = "temp.wav"
-    sf.write(wav_file, audio_np, samplerate)
-
-    url = "https://api.elevenlabs.io/v1/speech-to-text"
-
-    headers = {"xi-api-key": API_KEY}
-    files = {
-        "file": ("temp.wav", open(wav_file, "rb"), "audio/wav")
-    }
-    data = {
-        "model_id": "scribe_v2"  # correct model
-    }
-
-    r = requests.post(url, headers=headers, files=files, data=data)
-    if r.status_code != 200:
-        print("STT failed:", r.text)
-        return ""
-    result = r.json()
-    return result.get("text", "")
+def speech_to_text(audio_np, samplerate):
+    return stt.transcribe(audio_np, samplerate)
 
 
 # -----------------------
@@ -101,7 +82,7 @@ def agent_reply(text):
         },
         "new_turns_limit": 1
     }
-    r = requests.post(url, headers=headers, json=payload)
+    r = elevenlabs_client.post(url, headers=headers, json=payload)
     if r.status_code != 200:
         print("Agent call failed:", r.text)
         return ""
@@ -118,11 +99,13 @@ def agent_reply(text):
 # -----------------------
 # Main loop
 # -----------------------
-print("\nVoice agent ready! Speak into your USB mic.")
+elevenlabs_client.prewarm()
+print("\nVoice agent ready! Just start talking into your USB mic.")
 
 while True:
-    input("Press Enter to record your message...")
     audio_np, sr = record_audio()
+    if not len(audio_np):
+        continue
     user_text = speech_to_text(audio_np, sr)
     if not user_text:
         print("No speech detected.")
@@ -0,0 +1,192 @@
+import os
+import time
+from collections import deque
+
+try:
+    import pigpio   # hardware/DMA-timed PWM through the pigpiod daemon
+except ImportError:
+    pigpio = None
+
+try:
+    import RPi.GPIO as GPIO
+except (ImportError, RuntimeError):   # RuntimeError: not running on a Pi
+    GPIO = None
+
+# ---------------------------- CONFIG ----------------------------
+# BCM pin numbers: (in1, in2, enable) per motor
+MOTOR_PINS = {
+    "A": (17, 27, 18),
+    "B": (22, 23, 24),
+}
+SOFT_PWM_FREQ = 100        # RPi.GPIO software PWM, what the motors always ran at
+PWM_FREQ = 8000            # pigpio: above most of the audible whine, valid for both HW and DMA PWM
+HARDWARE_PWM_PINS = (12, 13, 18, 19)
+SIM_LOG_SIZE = 10000       # simulated driver keeps this many recent updates
+MOTOR_DRIVER = os.getenv("MOTOR_DRIVER", "auto")   # "auto", "pigpio", "rpi" or "sim"
+
+# H-bridge direction -> (in1, in2) levels
+FORWARD, REVERSE, BRAKE, COAST = "forward", "reverse", "brake", "coast"
+DIRECTION_LEVELS = {FORWARD: (1, 0), REVERSE: (0, 1), BRAKE: (1, 1), COAST: (0, 0)}
+
+
+# ---------------------------- BACKENDS ----------------------------
+class MotorDriver:
+    """Backends implement set_direction(motor, direction), set_duty(motor, speed 0-100) and cleanup()."""
+
+    pins = MOTOR_PINS
+
+    def forward(self, motor, speed):
+        self.set_direction(motor, FORWARD)
+        self.set_duty(motor, speed)
+
+    def stop(self):
+        for motor in self.pins:
+            self.set_direction(motor, COAST)
+            self.set_duty(motor, 0)
+
+    def cleanup(self):
+        self.stop()
+
+
+class RPiGPIODriver(MotorDriver):
+    """RPi.GPIO software PWM: a Python thread per pin toggles the enable line."""
+
+    name = "rpi"
+
+    def __init__(self, pins=MOTOR_PINS, freq=SOFT_PWM_FREQ):
+        if GPIO is None:
+            raise RuntimeError("RPi.GPIO is not available")
+        self.pins = pins
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)   # Prevents annoying warnings if you restart the script quickly
+        GPIO.setup([p for in1, in2, _ in pins.values() for p in (in1, in2)], GPIO.OUT)
+        GPIO.setup([en for _, _, en in pins.values()], GPIO.OUT)
+        self.pwm = {}
+        for motor, (_, _, en) in pins.items():
+            self.pwm[motor] = GPIO.PWM(en, freq)
+            self.pwm[motor].start(0)
+
+    def set_direction(self, motor, direction):
+        in1, in2, _ = self.pins[motor]
+        GPIO.output([in1, in2], DIRECTION_LEVELS[direction])
+
+    def set_duty(self, motor, speed):
+        self.pwm[motor].ChangeDutyCycle(speed)
+
+    def cleanup(self):
+        self.stop()
+        for pwm in self.pwm.values():
+            pwm.stop()
+        GPIO.cleanup()
+
+
+class PigpioDriver(MotorDriver):
+    """pigpio PWM generated by the PWM peripheral (pins 12/13/18/19) or DMA (any other pin).
+
+    No Python thread is involved, so the duty cycle doesn't jitter when the CPU is busy
+    decoding audio, and an update is a single socket write to pigpiod.
+    """
+
+    name = "pigpio"
+
+    def __init__(self, pins=MOTOR_PINS, freq=PWM_FREQ):
+        if pigpio is None:
+            raise RuntimeError("pigpio is not installed")
+        self.pi = pigpio.pi()
+        if not self.pi.connected:
+            raise RuntimeError("pigpiod is not running (sudo systemctl start pigpiod)")
+        self.pins = pins
+        self.freq = freq
+        for in1, in2, en in pins.values():
+            for pin in (in1, in2, en):
+                self.pi.set_mode(pin, pigpio.OUTPUT)
+            if en not in HARDWARE_PWM_PINS:
+                self.pi.set_PWM_frequency(en, freq)
+                self.pi.set_PWM_range(en, 100)
+        self.stop()
+
+    def set_direction(self, motor, direction):
+        in1, in2, _ = self.pins[motor]
+        level1, level2 = DIRECTION_LEVELS[direction]
+        self.pi.write(in1, level1)
+        self.pi.write(in2, level2)
+
+    def set_duty(self, motor, speed):
+        en = self.pins[motor][2]
+        speed = max(0, min(100, speed))
+        if en in HARDWARE_PWM_PINS:
+            self.pi.hardware_PWM(en, self.freq, int(speed * 10000))   # 0..1_000_000
+        else:
+            self.pi.set_PWM_dutycycle(en, speed)
+
+    def cleanup(self):
+        self.stop()
+        self.pi.stop()
+
+
+class SimulatedDriver(MotorDriver):
+    """No hardware: keeps the current state and a log of (time, motor, what, value) for tests."""
+
+    name = "sim"
+
+    def __init__(self, pins=MOTOR_PINS):
+        self.pins = pins
+        self.directions = {motor: COAST for motor in pins}
+        self.speeds = {motor: 0 for motor in pins}
+        self.log = deque(maxlen=SIM_LOG_SIZE)
+
+    def set_direction(self, motor, direction):
+        self.directions[motor] = direction
+        self.log.append((time.monotonic(), motor, "direction", direction))
+
+    def set_duty(self, motor, speed):
+        self.speeds[motor] = speed
+        self.log.append((time.monotonic(), motor, "duty", speed))
+
+
+DRIVERS = {"pigpio": PigpioDriver, "rpi": RPiGPIODriver, "sim": SimulatedDriver}
+
+
+def make_driver(name=MOTOR_DRIVER):
+    """Builds the named driver; "auto" prefers pigpio, then RPi.GPIO, then the simulator."""
+    if name != "auto":
+        return DRIVERS[name]()
+    for candidate in ("pigpio", "rpi"):
+        try:
+            return DRIVERS[candidate]()
+        except RuntimeError as e:
+            print(f"Motor driver {candidate} unavailable: {e}")
+    print("No motor hardware found, using the simulated driver")
+    return SimulatedDriver()
+
+
+# ---------------------------- TEST BLOCK (benchmark) ----------------------------
+if __name__ == "__main__":
+    # Per-update latency of a jaw-style duty change, and CPU burned while merely holding
+    # a duty cycle (software PWM keeps a thread busy even when nothing changes).
+    import numpy as np
+
+    updates = 3000
+    hold_seconds = 3.0
+    speeds = (np.abs(np.sin(np.arange(updates) / 5)) * 100).astype(int)
+    for name in DRIVERS:
+        try:
+            driver = DRIVERS[name]()
+        except RuntimeError as e:
+            print(f"{name:7s} skipped: {e}")
+            continue
+        latencies = np.empty(updates)
+        for i, speed in enumerate(speeds):
+            start = time.perf_counter()
+            driver.forward("A", int(speed))
+            driver.forward("B", int(speed))
+            latencies[i] = time.perf_counter() - start
+        driver.forward("A", 50)
+        driver.forward("B", 50)
+        cpu_start = time.process_time()
+        time.sleep(hold_seconds)
+        cpu = (time.process_time() - cpu_start) / hold_seconds
+        driver.cleanup()
+        lat_us = latencies * 1e6
+        print(f"{name:7s} update p50 {np.percentile(lat_us, 50):7.1f} us, p99 {np.percentile(lat_us, 99):7.1f} us, "
+              f"max {lat_us.max():8.1f} us | CPU while holding 50%: {cpu * 100:5.1f}%")
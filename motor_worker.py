@@ -0,0 +1,153 @@
+import os
+import time
+import heapq
+import threading
+from collections import deque
+from motor_drivers import FORWARD, COAST
+
+# ---------------------------- CONFIG ----------------------------
+QUEUE_SIZE = 64          # setpoints waiting to be applied; on overflow the oldest unread one is dropped
+RT_PRIORITY = 10         # SCHED_FIFO priority for the worker (needs root or CAP_SYS_NICE)
+
+
+class MotorWorker:
+    """The one thread that touches the motor driver.
+
+    Callers queue timestamped setpoints {motor: (direction, speed)} and return right
+    away. The worker applies each one at its time; if several are due at once only
+    the latest per motor is written, and a write is skipped entirely when the pin
+    state wouldn't change, so a jaw holding still costs no GPIO calls at all.
+    """
+
+    def __init__(self, driver, queue_size=QUEUE_SIZE, rt_priority=RT_PRIORITY):
+        self.driver = driver
+        self.rt_priority = rt_priority
+        self.queue_size = queue_size
+        self.inbox = deque(maxlen=queue_size)   # (generation, due monotonic time, setpoints); append/popleft are atomic
+        self.schedule = []                      # worker-only heap of (due, arrival, setpoints)
+        self.arrivals = 0
+        # stop() starts a new generation instead of queuing a marker the bounded inbox
+        # could evict: older setpoints are dropped once the worker sees a newer one
+        self.generation = 0
+        self.seen = 0
+        self.wake = threading.Event()
+        self.state = {motor: [COAST, 0] for motor in driver.pins}
+        self.writes = 0
+        self.skipped = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="motors", daemon=True)
+        self.thread.start()
+
+    # ---- producer side (any thread) ----
+    def submit(self, setpoints, at=None):
+        """Queues {motor: (direction, speed)} to be applied at monotonic time `at` (default: now)."""
+        if self.closed:
+            return
+        self.inbox.append((self.generation, time.monotonic() if at is None else at, setpoints))
+        self.wake.set()
+
+    def forward(self, motor, speed, at=None):
+        self.submit({motor: (FORWARD, speed)}, at)
+
+    def stop(self):
+        """Drops everything still scheduled and stops both motors now."""
+        self.generation += 1
+        self.submit({motor: (COAST, 0) for motor in self.state})
+
+    def close(self):
+        self.stop()
+        self.closed = True   # after stop(): the worker applies that before it exits
+        self.wake.set()
+        self.thread.join(timeout=1.0)
+        self.driver.cleanup()
+
+    # ---- worker side ----
+    def _raise_priority(self):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.rt_priority))
+        except (AttributeError, PermissionError, OSError):
+            pass   # not Linux or not allowed: stay at normal priority
+
+    def _apply(self, motor, direction, speed):
+        state = self.state[motor]
+        if state[0] != direction:
+            self.driver.set_direction(motor, direction)
+            state[0] = direction
+            self.writes += 1
+        else:
+            self.skipped += 1
+        if state[1] != speed:
+            self.driver.set_duty(motor, speed)
+            state[1] = speed
+            self.writes += 1
+        else:
+            self.skipped += 1
+
+    def _drain_inbox(self):
+        """Moves new setpoints onto the schedule, dropping any from before a stop()."""
+        while self.inbox:
+            generation, at, setpoints = self.inbox.popleft()
+            if generation > self.seen:
+                self.schedule.clear()
+                self.seen = generation
+            elif generation < self.seen:
+                continue
+            self.arrivals += 1
+            heapq.heappush(self.schedule, (at, self.arrivals, setpoints))
+        if len(self.schedule) > self.queue_size:
+            self.schedule = heapq.nsmallest(self.queue_size, self.schedule)
+
+    def _run(self):
+        self._raise_priority()
+        timeout = None
+        while True:
+            self.wake.wait(timeout)
+            self.wake.clear()
+            closing = self.closed   # read first: the final stop() is queued by then
+            self._drain_inbox()
+            now = time.monotonic()
+            due = {}
+            while self.schedule and self.schedule[0][0] <= now:
+                due.update(heapq.heappop(self.schedule)[2])
+            for motor, (direction, speed) in due.items():
+                try:
+                    self._apply(motor, direction, speed)
+                except Exception as e:
+                    print(f"Motor {motor} write failed: {e!r}")
+            if closing:
+                return
+            timeout = max(0.0, self.schedule[0][0] - time.monotonic()) if self.schedule else None
+
+
+# ---------------------------- TEST BLOCK (benchmark) ----------------------------
+if __name__ == "__main__":
+    # A 30 fps jaw envelope for 5 s, written inline (old way) vs through the worker, in real time.
+    import numpy as np
+    from motor_drivers import SimulatedDriver
+
+    fps = 30
+    levels = np.clip(np.abs(np.sin(np.arange(5 * fps) / 7)) * 1.4 - 0.4, 0, 1)
+    levels = (np.round(levels * 10) / 10).tolist()   # speech envelopes hover on the same few values
+
+    def jaw_speed(amp):
+        return int(amp * 100) if amp > 0.1 else 0
+
+    inline = SimulatedDriver()
+    for amp in levels:
+        speed = jaw_speed(amp)
+        if speed:
+            inline.forward("A", speed)
+            inline.forward("B", speed)
+        else:
+            inline.stop()
+
+    worker = MotorWorker(SimulatedDriver())
+    start = time.monotonic()
+    for i, amp in enumerate(levels):
+        time.sleep(max(0.0, start + i / fps - time.monotonic()))
+        speed = jaw_speed(amp)
+        worker.submit({m: (FORWARD if speed else COAST, speed) for m in ("A", "B")})
+    time.sleep(0.1)
+    print(f"inline: {len(inline.log)} GPIO writes for {len(levels)} frames")
+    print(f"worker: {worker.writes} GPIO writes, {worker.skipped} coalesced away")
+    worker.close()
@@ -1,52 +1,34 @@
-import RPi.GPIO as GPIO
 import time
+from motor_drivers import make_driver
+from motor_worker import MotorWorker
+from lazy_init import once
 
 # ==========================================
-# SETUP (This runs once when imported)
+# SETUP (This runs on first use, not on import)
 # ==========================================
-MotorA_in1 = 17
-MotorA_in2 = 27
-MotorB_in3 = 22
-MotorB_in4 = 23
-MotorA_en = 18
-MotorB_en = 24
-
-GPIO.setmode(GPIO.BCM)
-GPIO.setwarnings(False) # Prevents annoying warnings if you restart the script quickly
-
-GPIO.setup([MotorA_in1, MotorA_in2, MotorB_in3, MotorB_in4], GPIO.OUT)
-GPIO.setup([MotorA_en, MotorB_en], GPIO.OUT)
-
-# PWM setup for speed control
-pwmA = GPIO.PWM(MotorA_en, 100)  # 100Hz
-pwmB = GPIO.PWM(MotorB_en, 100)
-pwmA.start(0)
-pwmB.start(0)
+# Pins and PWM live in motor_drivers.py. Pick the backend with MOTOR_DRIVER=pigpio/rpi/sim;
+# the default uses pigpio's hardware PWM when pigpiod is running, else RPi.GPIO.
+# Only the worker thread touches the driver; everything below just queues setpoints.
+@once
+def get_motors():
+    return MotorWorker(make_driver())
 
 # ==========================================
 # FUNCTIONS (Available to your main script)
 # ==========================================
 def motorA_forward(speed=50):
-    GPIO.output(MotorA_in1, GPIO.HIGH)
-    GPIO.output(MotorA_in2, GPIO.LOW)
-    pwmA.ChangeDutyCycle(speed)
+    get_motors().forward("A", speed)
 
 def motorB_forward(speed=50):
-    GPIO.output(MotorB_in3, GPIO.HIGH)
-    GPIO.output(MotorB_in4, GPIO.LOW)
-    pwmB.ChangeDutyCycle(speed)
+    get_motors().forward("B", speed)
 
 def stop_motors():
-    GPIO.output([MotorA_in1, MotorA_in2, MotorB_in3, MotorB_in4], GPIO.LOW)
-    pwmA.ChangeDutyCycle(0)
-    pwmB.ChangeDutyCycle(0)
+    get_motors().stop()
 
 def cleanup_motors():
     """Wipes the GPIO pins. Call this when your main program shuts down."""
-    stop_motors()
-    pwmA.stop()
-    pwmB.stop()
-    GPIO.cleanup()
+    if get_motors.ready():
+        get_motors().close()
 
 # ==========================================
 # TEST BLOCK (Ignored during import)
@@ -0,0 +1,130 @@
+from math import gcd
+from functools import lru_cache
+import numpy as np
+
+# ---------------------------- CONFIG ----------------------------
+HALF_TAPS = 16        # filter half-length, in samples of the lower of the two rates
+KAISER_BETA = 8.6     # ~80 dB stopband
+ROLLOFF = 0.94        # cutoff as a fraction of the lower Nyquist, leaves room for the transition band
+
+
+# ---------------------------- FILTER BANK ----------------------------
+@lru_cache(maxsize=16)
+def filter_bank(orig_sr, target_sr):
+    """Windowed-sinc low-pass split into `up` polyphase branches, cached per rate pair.
+
+    Returns (up, down, delay, bank) where bank[p, k] is tap k of phase p.
+    """
+    g = gcd(orig_sr, target_sr)
+    up, down = target_sr // g, orig_sr // g
+    factor = max(up, down)
+    cutoff = ROLLOFF * 0.5 / factor
+    delay = HALF_TAPS * factor
+    length = 2 * delay + 1
+    n = np.arange(length) - delay
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, KAISER_BETA) * up
+    taps = -(-length // up)
+    h = np.concatenate([h, np.zeros(taps * up - length)])
+    bank = h.reshape(taps, up).T
+    return up, down, delay, np.ascontiguousarray(bank, dtype=np.float32)
+
+
+def output_length(num_samples, orig_sr, target_sr):
+    return num_samples * target_sr // orig_sr
+
+
+# ---------------------------- RESAMPLE ----------------------------
+def resample(audio, orig_sr, target_sr, out=None):
+    """Rational-ratio polyphase resampling of a (n,) or (n, channels) array.
+
+    Everything stays float32; all channels go through the same vectorized step.
+    Pass `out` (shaped output_length(n, orig_sr, target_sr)[, channels]) to avoid
+    allocating the result.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if orig_sr == target_sr:
+        if out is None:
+            return audio.copy()
+        out[:] = audio
+        return out
+
+    up, down, delay, bank = filter_bank(orig_sr, target_sr)
+    taps = bank.shape[1]
+    n_out = output_length(len(audio), orig_sr, target_sr)
+    if out is None:
+        out = np.empty((n_out,) + audio.shape[1:], dtype=np.float32)
+    if n_out == 0:
+        return out[:0]   # too short to yield a sample (e.g. a tiny streamed chunk)
+
+    # Output m = q*up + r always uses filter phase (r*down + delay) % up and reads input
+    # samples spaced `down` apart, so each of the `up` output phases is one strided
+    # (rows, taps) @ (taps,) product over a sliding-window view of the input.
+    # Channels go first so the taps axis stays unit-stride for BLAS.
+    left = taps
+    right = delay // up + taps + 1
+    channels = audio.reshape(len(audio), -1).T
+    padded = np.zeros((len(channels), left + len(audio) + right), dtype=np.float32)
+    padded[:, left:left + len(audio)] = channels
+    windows = np.lib.stride_tricks.sliding_window_view(padded, taps, axis=1)
+    reversed_bank = bank[:, ::-1]
+    out_channels = out.reshape(n_out, -1).T
+
+    for r in range(min(up, n_out)):
+        count = (n_out - r + up - 1) // up
+        t = r * down + delay
+        first = t // up + left - (taps - 1)
+        rows = windows[:, first:first + (count - 1) * down + 1:down]
+        np.matmul(rows, reversed_bank[t % up], out=out_channels[:, r::up])
+    return out
+
+
+# ---------------------------- TEST BLOCK (benchmark) ----------------------------
+if __name__ == "__main__":
+    # Old np.interp resample_audio vs the polyphase resampler on the bundled cat sounds.
+    import os
+    import glob
+    import time
+    import soundfile as sf
+
+    def interp_resample(audio, orig_sr, target_sr):
+        if orig_sr == target_sr:
+            return audio.astype(np.float32)
+        duration = len(audio) / orig_sr
+        new_length = int(duration * target_sr)
+        if audio.ndim == 1:
+            resampled = np.interp(np.linspace(0, len(audio)-1, new_length), np.arange(len(audio)), audio)
+        else:
+            channels = [np.interp(np.linspace(0, len(audio)-1, new_length), np.arange(len(audio)), audio[:, ch])
+                        for ch in range(audio.shape[1])]
+            resampled = np.stack(channels, axis=1)
+        return resampled.astype(np.float32)
+
+    target_sr = 48000
+    total_old = total_new = 0.0
+    for path in sorted(glob.glob(os.path.join("cat_sounds", "*.wav"))):
+        data, sr = sf.read(path, dtype="float32")
+        if sr == target_sr:
+            sr, target_sr_used = sr, 44100
+        else:
+            target_sr_used = target_sr
+        out = np.empty((output_length(len(data), sr, target_sr_used),) + data.shape[1:], dtype=np.float32)
+        resample(data[:sr // 10], sr, target_sr_used)   # build + cache the filter bank
+
+        start = time.perf_counter()
+        interp_resample(data, sr, target_sr_used)
+        old = time.perf_counter() - start
+        start = time.perf_counter()
+        resample(data, sr, target_sr_used, out=out)
+        new = time.perf_counter() - start
+        total_old += old
+        total_new += new
+        print(f"{os.path.basename(path)[:40]:40s} {sr}->{target_sr_used} "
+              f"interp {old * 1000:7.1f} ms  polyphase {new * 1000:7.1f} ms")
+    print(f"{'total':40s} interp {total_old * 1000:7.1f} ms  polyphase {total_new * 1000:7.1f} ms")
+
+    # Aliasing check: a 20 kHz tone taken down to 16 kHz should vanish, not fold to 4 kHz.
+    sr = 48000
+    tone = np.sin(2 * np.pi * 20000 * np.arange(sr) / sr).astype(np.float32)
+    for label, fn in [("interp", interp_resample), ("polyphase", resample)]:
+        y = fn(tone, sr, 16000)[1000:-1000]
+        print(f"{label:10s} 20 kHz tone after 48k->16k: rms {np.sqrt(np.mean(y ** 2)):.4f}")
@@ -0,0 +1,160 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# ---------------------------- CONFIG ----------------------------
+CACHE_FOLDER = ".response_cache"
+MEMORY_BYTES = 64 * 1024 * 1024     # hot entries kept decoded in RAM
+DISK_BYTES = 512 * 1024 * 1024      # on-disk store, least recently used files go first
+
+
+def normalize_text(text):
+    """'Hello?!', ' hello ' and 'HELLO.' all map to 'hello'."""
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+def cache_key(*parts):
+    return hashlib.sha1(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def _nbytes(entry):
+    return sum(np.asarray(v).nbytes for v in entry.values())
+
+
+class ResponseCache:
+    """Two-level cache of dicts of numpy arrays: an in-memory LRU in front of .npz files.
+
+    Both levels are bounded in bytes. A disk hit is promoted to memory and its file
+    mtime refreshed, so disk eviction is least-recently-used too. Safe to call from
+    the TTS worker threads.
+    """
+
+    def __init__(self, name, folder=CACHE_FOLDER, memory_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES):
+        self.folder = os.path.join(folder, name) if folder else None
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()    # key -> (entry, nbytes)
+        self.memory_size = 0
+        self.files = OrderedDict()     # key -> file size, oldest use first
+        self.disk_size = 0
+        self.hits = self.misses = 0
+        if self.folder:
+            os.makedirs(self.folder, exist_ok=True)
+            self._scan()
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.npz")
+
+    def _scan(self):
+        found = []
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if name.endswith(".tmp.npz"):
+                os.remove(path)
+            elif name.endswith(".npz"):
+                st = os.stat(path)
+                found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self.files[key] = size
+            self.disk_size += size
+        self._evict_disk()
+
+    # ---- memory level ----
+    def _remember(self, key, entry):
+        if key in self.memory:
+            self.memory_size -= self.memory.pop(key)[1]
+        size = _nbytes(entry)
+        self.memory[key] = (entry, size)
+        self.memory_size += size
+        while len(self.memory) > 1 and self.memory_size > self.memory_bytes:
+            self.memory_size -= self.memory.popitem(last=False)[1][1]
+
+    # ---- disk level ----
+    def _evict_disk(self):
+        while self.files and self.disk_size > self.disk_bytes:
+            key, size = self.files.popitem(last=False)
+            self.disk_size -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                entry = {k: npz[k] for k in npz.files}
+        except (OSError, ValueError) as e:
+            print(f"Dropping unreadable cache entry {path}: {e!r}")
+            self.disk_size -= self.files.pop(key, 0)
+            return None
+        os.utime(path)
+        self.files.move_to_end(key)
+        return entry
+
+    def _store(self, key, entry):
+        path = self._path(key)
+        tmp = path[:-4] + ".tmp.npz"
+        np.savez(tmp, **entry)
+        os.replace(tmp, path)
+        self.disk_size -= self.files.pop(key, 0)
+        self.files[key] = os.path.getsize(path)
+        self.disk_size += self.files[key]
+        self._evict_disk()
+
+    # ---- public ----
+    def get(self, key):
+        with self.lock:
+            hit = self.memory.get(key)
+            if hit is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return hit[0]
+            entry = self._load(key) if self.folder and key in self.files else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        entry = {k: np.asarray(v) for k, v in entry.items()}
+        with self.lock:
+            self._remember(key, entry)
+            if self.folder:
+                self._store(key, entry)
+
+
+# ---------------------------- TEST BLOCK ----------------------------
+if __name__ == "__main__":
+    # Cold synth vs memory hit vs disk hit (fresh process state) for a 3 s clip.
+    import time
+    import tempfile
+
+    folder = tempfile.mkdtemp()
+    sr = 22050
+    clip = np.random.default_rng(0).standard_normal(3 * sr).astype(np.float32)
+    key = cache_key("voice", "eleven_monolingual_v1", "what do you want, human?")
+
+    cache = ResponseCache("speech", folder=folder)
+    cache.put(key, {"data": clip, "sr": sr, "levels": np.ones(90, dtype=np.float32)})
+    start = time.perf_counter()
+    cache.get(key)
+    print(f"memory hit: {(time.perf_counter() - start) * 1000:.3f} ms")
+
+    cache = ResponseCache("speech", folder=folder)
+    start = time.perf_counter()
+    entry = cache.get(key)
+    print(f"disk hit:   {(time.perf_counter() - start) * 1000:.3f} ms, sr={int(entry['sr'])}")
+
+    small = ResponseCache("speech", folder=folder, disk_bytes=300_000)
+    for i in range(5):
+        small.put(cache_key(i), {"data": clip})
+    print(f"disk bound: {len(small.files)} files, {small.disk_size} bytes <= {small.disk_bytes}")
+    print(normalize_text("  Hello?!  "), "|", normalize_text("What's UP."))
@@ -0,0 +1,93 @@
+import re
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from tts_stream import StreamingPlayer, StreamResampler
+
+# ---------------------------- CONFIG ----------------------------
+TTS_WORKERS = 3            # concurrent TTS requests per reply
+MIN_SENTENCE_CHARS = 20    # short bits ("Ugh!") get glued onto the next sentence
+
+_SENTENCE = re.compile(r'\s*(.+?(?:[.!?…]+["\'”’)]*(?=\s|$)|$))', re.S)
+_executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+
+
+def split_sentences(text, min_chars=MIN_SENTENCE_CHARS):
+    merged = []
+    for sentence in _SENTENCE.findall(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if merged and len(merged[-1]) < min_chars:
+            merged[-1] += " " + sentence
+        else:
+            merged.append(sentence)
+    return merged
+
+
+class SentenceSynthesizer:
+    """Splits a reply into sentences and starts TTS for all of them on a small shared pool.
+
+    `synth(text)` must return (data, sr) or (None, None), like get_speech_from_elevenlabs.
+    Requests start as soon as this is constructed, so it can be created before the
+    intro meow and collected afterwards.
+    """
+
+    def __init__(self, text, synth):
+        self.sentences = split_sentences(text)
+        self.futures = [_executor.submit(synth, s) for s in self.sentences]
+
+    def results(self):
+        """Yields (data, sr) per sentence in order, waiting only for the one needed next."""
+        for sentence, future in zip(self.sentences, self.futures):
+            data, sr = future.result()
+            if data is None:
+                print("Skipping sentence with no audio:", sentence)
+                continue
+            yield data, sr
+
+    def whole(self, fps=30):
+        """(data, sr) of the whole reply as play_sentences plays it, or (None, None) if a
+        sentence failed or is still being synthesized (nothing here waits)."""
+        if not self.futures or not all(future.done() and not future.exception() for future in self.futures):
+            return None, None
+        results = [future.result() for future in self.futures]
+        if any(data is None for data, _ in results):
+            return None, None
+        sr = results[0][1]
+        return np.concatenate([conform(data, clip_sr, sr, fps) for data, clip_sr in results]), sr
+
+
+def conform(data, clip_sr, sr, fps):
+    """One sentence's clip as mono float32 at `sr`, padded to a whole 1/fps frame."""
+    if data.ndim > 1:
+        data = np.mean(data, axis=1)
+    if clip_sr != sr:
+        data = StreamResampler(clip_sr, sr).process(data)
+    data = np.concatenate([data, np.zeros((-len(data)) % (sr // fps), dtype=np.float32)])
+    return data.astype(np.float32)
+
+
+def play_sentences(synthesizer, envelope, out_sr, on_frame=None, fps=30, engine=None, on_voice=None,
+                   on_envelope=None):
+    """Plays each sentence as soon as it arrives, back to back in one output stream.
+
+    Each clip is padded to a whole motor frame and its `envelope(data, sr, fps)` levels
+    are queued right before its audio, so the concatenated envelope stays aligned.
+    """
+    results = synthesizer.results()
+    first = next(results, None)
+    if first is None:
+        return None
+    sr = first[1]
+    player = StreamingPlayer(sr, out_sr=out_sr, on_frame=on_frame, fps=fps, external_levels=True,
+                             engine=engine, on_voice=on_voice, on_envelope=on_envelope)
+
+    def clips():
+        for data, clip_sr in itertools.chain([first], results):
+            data = conform(data, clip_sr, sr, fps)
+            if on_frame is not None or on_envelope is not None:
+                player.push_levels(envelope(data, sr, fps=fps))
+            yield data
+
+    return player.play(clips())
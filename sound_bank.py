@@ -0,0 +1,70 @@
+import os
+import glob
+import random
+import numpy as np
+import soundfile as sf
+
+# ---------------------------- CONFIG ----------------------------
+CACHE_FOLDER = ".sound_cache"   # decoded + resampled clips, reused across restarts
+
+
+class SoundBank:
+    """Every clip in a folder, decoded once, resampled to the output rate and peak-normalized.
+
+    Decoded clips are cached as .npy files keyed by the source file's mtime, size and
+    the target rate, so a restart only reads raw float32 instead of re-decoding.
+    With in_memory=False the cached arrays stay memory-mapped to save RAM on the Pi.
+    """
+
+    def __init__(self, folder, target_sr, resample, cache_folder=CACHE_FOLDER, in_memory=True):
+        self.folder = folder
+        self.target_sr = target_sr
+        self.resample = resample
+        self.cache_folder = cache_folder
+        self.in_memory = in_memory
+        self.clips = {}
+        self.names = []
+        self.load()
+
+    def _cache_path(self, path):
+        st = os.stat(path)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self.cache_folder, f"{stem}.{self.target_sr}.{st.st_mtime_ns}.{st.st_size}.npy")
+
+    def _decode(self, path):
+        data, sr = sf.read(path, dtype="float32")
+        data = self.resample(data, sr, self.target_sr)
+        peak = np.max(np.abs(data)) if len(data) else 0
+        if peak > 0:
+            data = data / peak
+        return np.ascontiguousarray(data, dtype=np.float32)
+
+    def load(self):
+        if self.cache_folder:
+            os.makedirs(self.cache_folder, exist_ok=True)
+        for path in sorted(glob.glob(os.path.join(self.folder, "*.wav"))):
+            name = os.path.basename(path)
+            cache = self._cache_path(path) if self.cache_folder else None
+            if cache and os.path.exists(cache):
+                data = np.load(cache, mmap_mode=None if self.in_memory else "r")
+            else:
+                data = self._decode(path)
+                if cache:
+                    self._drop_stale(path)
+                    np.save(cache, data)
+            self.clips[name] = data
+        self.names = list(self.clips)
+        print(f"Loaded {len(self.names)} sounds from {self.folder}")
+
+    def _drop_stale(self, path):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for old in glob.glob(os.path.join(self.cache_folder, f"{glob.escape(stem)}.{self.target_sr}.*.npy")):
+            os.remove(old)
+
+    def get(self, name):
+        return self.clips.get(name)
+
+    def random_clip(self):
+        if not self.names:
+            return None
+        return self.clips[random.choice(self.names)]
@@ -0,0 +1,105 @@
+import os
+import gzip
+import hashlib
+import mimetypes
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import brotli   # optional, adds a "br" variant next to gzip
+except ImportError:
+    brotli = None
+
+# ---------------------------- CONFIG ----------------------------
+ASSETS_FOLDER = os.path.join("toxiccat-frontend", "assets")
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_BYTES = 512
+HTML_CACHE_CONTROL = "no-cache"                  # always revalidate, the ETag makes that a cheap 304
+ASSET_CACHE_CONTROL = "public, max-age=86400"
+
+
+# ---------------------------- PRE-ENCODED FILES ----------------------------
+class StaticFile:
+    """A response body encoded once at startup, with gzip/brotli variants and strong ETags."""
+
+    def __init__(self, body, content_type, cache_control):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {"identity": (body, f'"{digest}"')}
+        if content_type.startswith(COMPRESSIBLE) and len(body) >= MIN_COMPRESS_BYTES:
+            self.variants["gzip"] = (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gzip"')
+            if brotli is not None:
+                self.variants["br"] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+
+    def pick(self, accept_encoding):
+        """Returns (encoding, body, etag) for the best variant the client accepts."""
+        accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.variants:
+                return (encoding,) + self.variants[encoding]
+        return ("identity",) + self.variants["identity"]
+
+
+def load_site(html, assets_folder=ASSETS_FOLDER):
+    """Maps URL paths to StaticFiles: the UI page plus everything in the assets folder."""
+    page = StaticFile(html.encode("utf-8"), "text/html; charset=utf-8", HTML_CACHE_CONTROL)
+    site = {"/": page, "/index.html": page}
+    if os.path.isdir(assets_folder):
+        for name in sorted(os.listdir(assets_folder)):
+            path = os.path.join(assets_folder, name)
+            if not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                body = f.read()
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            site[f"/assets/{name}"] = StaticFile(body, content_type, ASSET_CACHE_CONTROL)
+    return site
+
+
+# ---------------------------- HTTP ----------------------------
+def make_handler(site):
+    class StaticHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self, send_body):
+            entry = site.get(self.path.split("?", 1)[0].split("#", 1)[0])
+            if entry is None:
+                self.send_error(404)
+                return
+            encoding, body, etag = entry.pick(self.headers.get("Accept-Encoding"))
+            if_none_match = self.headers.get("If-None-Match", "")
+            if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", entry.cache_control)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", entry.content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", entry.cache_control)
+            if len(entry.variants) > 1:
+                self.send_header("Vary", "Accept-Encoding")
+            if encoding != "identity":
+                self.send_header("Content-Encoding", encoding)
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self._respond(send_body=True)
+
+        def do_HEAD(self):
+            self._respond(send_body=False)
+
+        def log_message(self, *args):
+            pass
+
+    return StaticHandler
+
+
+def make_server(address, html, assets_folder=ASSETS_FOLDER):
+    server = ThreadingHTTPServer(address, make_handler(load_site(html, assets_folder)))
+    server.daemon_threads = True
+    return server
@@ -1,6 +1,6 @@
 import os
 import json
-import requests
+import elevenlabs_client
 import sounddevice as sd
 import soundfile as sf
 import numpy as np
@@ -38,7 +38,7 @@ def speak(text):
         "model_id": "eleven_monolingual_v1"
     }
 
-    r = requests.post(url, headers=headers, json=payload)
+    r = elevenlabs_client.post(url, headers=headers, json=payload)
     if r.status_code != 200:
         print("TTS failed:", r.text)
         return
@@ -70,7 +70,7 @@ payload = {
 
 print("\nRunning conversation simulation...\n")
 
-r = requests.post(url, headers=headers, json=payload)
+r = elevenlabs_client.post(url, headers=headers, json=payload)
 
 if r.status_code != 200:
     print(r.text)
@@ -0,0 +1,258 @@
+import threading
+import time
+import importlib.util
+import numpy as np
+import elevenlabs_client
+from audio_upload import encode_for_upload
+from resampler import resample
+
+# ---------------------------- CONFIG ----------------------------
+SCRIBE_MODEL = "scribe_v2"
+LOCAL_MODEL = "tiny.en"        # small enough for a Pi; "base.en" is better and ~2x slower
+LOCAL_COMPUTE_TYPE = "int8"    # quantized weights: ~4x less memory, faster on ARM
+LOCAL_THREADS = 4
+LOCAL_SR = 16000
+LATENCY_ADAPT = 0.3            # weight of the newest turn in a backend's latency estimate
+EXPLORE_EVERY = 20             # every Nth turn goes to the runner-up, so its estimate stays current
+FAILURE_COOLDOWN = 60.0        # seconds a failed backend is only used as a last resort
+FIXTURES_FOLDER = "stt_fixtures"
+
+
+class STTError(Exception):
+    pass
+
+
+# ---------------------------- BACKENDS ----------------------------
+# A backend has a `name` and stream(audio, samplerate): a generator of the transcript
+# so far, the last one being the final text. It raises if it can't transcribe.
+class ScribeSTT:
+    """ElevenLabs scribe over HTTP. No partials: the only result is the final text."""
+
+    name = "scribe"
+
+    def __init__(self, api_key, model=SCRIBE_MODEL, url=None):
+        self.api_key = api_key
+        self.model = model
+        self.url = url or f"{elevenlabs_client.BASE_URL}/v1/speech-to-text"
+
+    def warm(self):
+        elevenlabs_client.prewarm(background=False)
+
+    def stream(self, audio, samplerate):
+        r = elevenlabs_client.post(self.url, headers={"xi-api-key": self.api_key},
+                                   files={"file": encode_for_upload(audio, samplerate)},
+                                   data={"model_id": self.model})
+        if r.status_code != 200:
+            raise STTError(f"HTTP {r.status_code}: {r.text}")
+        yield r.json().get("text", "")
+
+
+class LocalSTT:
+    """Whisper on the CPU (faster-whisper, int8), for when the network is slow or gone.
+
+    The model is loaded once, by warm() or the first turn, and a short decode of
+    silence right after loading pages the weights in, so the first real turn isn't
+    the slow one. Decoding starts once the recording has ended; text is yielded per
+    segment, and a single short utterance is one segment, so it is usually only the
+    final text.
+    """
+
+    name = "local"
+
+    def __init__(self, model=LOCAL_MODEL, compute_type=LOCAL_COMPUTE_TYPE, threads=LOCAL_THREADS):
+        self.model_name = model
+        self.compute_type = compute_type
+        self.threads = threads
+        self.model = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        # optional dependency, only imported by warm(): it pulls in ctranslate2, far too
+        # slow for import time
+        return importlib.util.find_spec("faster_whisper") is not None
+
+    def warm(self):
+        with self.lock:
+            if self.model is None:
+                if not self.available():
+                    raise STTError("faster-whisper is not installed (pip install faster-whisper)")
+                from faster_whisper import WhisperModel
+                start = time.perf_counter()
+                model = WhisperModel(self.model_name, device="cpu", compute_type=self.compute_type,
+                                     cpu_threads=self.threads)
+                segments, _ = model.transcribe(np.zeros(LOCAL_SR, dtype=np.float32), language="en", beam_size=1)
+                list(segments)
+                self.model = model
+                print(f"Local STT ({self.model_name}, {self.compute_type}) ready in {time.perf_counter() - start:.1f}s")
+        return self.model
+
+    def stream(self, audio, samplerate):
+        model = self.warm()
+        audio = resample(np.asarray(audio, dtype=np.float32), samplerate, LOCAL_SR)
+        segments, _ = model.transcribe(audio, language="en", beam_size=1, without_timestamps=True,
+                                       condition_on_previous_text=False)
+        text = ""
+        for segment in segments:
+            text = (text + " " + segment.text.strip()).strip()
+            yield text
+        if not text:
+            yield ""
+
+
+def default_backends(api_key):
+    """The HTTP backend, plus the local one when faster-whisper is installed."""
+    backends = [ScribeSTT(api_key)]
+    if LocalSTT.available():
+        backends.append(LocalSTT())
+    return backends
+
+
+# ---------------------------- SELECTION ----------------------------
+class STTSelector:
+    """Sends each turn to the backend that has been answering fastest.
+
+    Every backend's turn latency (end of speech -> final text) is tracked as a moving
+    average. Backends without a measurement go first so each gets one, then the
+    fastest wins, except every EXPLORE_EVERY turns when the runner-up is re-measured.
+    A backend that raises (e.g. Wi-Fi down) is skipped for FAILURE_COOLDOWN seconds
+    and the same turn goes on to the next one, so one failure costs one attempt.
+    """
+
+    def __init__(self, backends, explore_every=EXPLORE_EVERY):
+        self.backends = list(backends)
+        self.explore_every = explore_every
+        self.latency = {b.name: None for b in self.backends}
+        self.failed_until = {b.name: 0.0 for b in self.backends}
+        self.turns = 0
+        self.lock = threading.Lock()
+
+    def warm(self):
+        """Warms every backend. One that fails (no network, model missing) only cools
+        down like after a failed turn; it doesn't stop the others or startup."""
+        for backend in self.backends:
+            try:
+                backend.warm()
+            except Exception as e:
+                print(f"STT {backend.name} failed to warm up ({e})")
+                self._record(backend, 0.0, failed=True)
+        return self
+
+    def ranked(self):
+        with self.lock:
+            self.turns += 1
+            now = time.monotonic()
+            healthy = [b for b in self.backends if self.failed_until[b.name] <= now]
+            cooling = [b for b in self.backends if b not in healthy]
+            new = [b for b in healthy if self.latency[b.name] is None]
+            measured = sorted((b for b in healthy if b not in new), key=lambda b: self.latency[b.name])
+            if len(measured) > 1 and self.turns % self.explore_every == 0:
+                measured[0], measured[1] = measured[1], measured[0]
+            return new + measured + cooling
+
+    def _record(self, backend, seconds, failed=False):
+        with self.lock:
+            if failed:
+                self.failed_until[backend.name] = time.monotonic() + FAILURE_COOLDOWN
+                return
+            self.failed_until[backend.name] = 0.0
+            old = self.latency[backend.name]
+            self.latency[backend.name] = seconds if old is None else old + LATENCY_ADAPT * (seconds - old)
+
+    def stream(self, audio, samplerate):
+        """The transcript so far, from the first backend that gets through."""
+        for backend in self.ranked():
+            start = time.perf_counter()
+            try:
+                for text in backend.stream(audio, samplerate):
+                    yield text
+            except Exception as e:
+                print(f"STT {backend.name} failed ({e}), trying the next backend")
+                self._record(backend, 0.0, failed=True)
+                continue
+            self._record(backend, time.perf_counter() - start)
+            return
+        print("STT failed on every backend")
+
+    def transcribe(self, audio, samplerate, on_partial=None):
+        text = ""
+        for text in self.stream(audio, samplerate):
+            if on_partial is not None:
+                on_partial(text)
+        return text
+
+    def report(self):
+        return ", ".join(f"{name} {'?' if s is None else f'{s:.2f}s'}" for name, s in self.latency.items())
+
+
+# ---------------------------- TEST BLOCK (benchmark) ----------------------------
+if __name__ == "__main__":
+    # Turn latency per backend on recorded WAV fixtures: python stt.py [folder]
+    # Each fixture is a short utterance (as record_until_silence would capture it);
+    # an optional same-named .txt holds what was said, for a rough word error count.
+    # Backends that can't run here (no API key, faster-whisper missing) are skipped.
+    import os
+    import sys
+    import glob
+    import soundfile as sf
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else FIXTURES_FOLDER
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.wav"))):
+        audio, sr = sf.read(path, dtype="float32")
+        expected = None
+        if os.path.exists(path[:-4] + ".txt"):
+            with open(path[:-4] + ".txt") as f:
+                expected = f.read().lower().split()
+        fixtures.append((os.path.basename(path), audio.mean(axis=1) if audio.ndim > 1 else audio, sr, expected))
+    if not fixtures:
+        sys.exit(f"no WAV fixtures in {folder}/ (record a few utterances there first)")
+
+    backends = []
+    if os.getenv("ELEVENLABS_API_KEY"):
+        backends.append(ScribeSTT(os.getenv("ELEVENLABS_API_KEY")))
+    else:
+        print("scribe: skipped, ELEVENLABS_API_KEY not set")
+    if LocalSTT.available():
+        backends.append(LocalSTT())
+    else:
+        print("local: skipped, faster-whisper not installed")
+
+    def word_errors(said, heard):
+        # edit distance over words
+        row = list(range(len(heard) + 1))
+        for i, w in enumerate(said, 1):
+            prev, row[0] = row[0], i
+            for j, h in enumerate(heard, 1):
+                prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (w != h))
+        return row[-1]
+
+    selector = STTSelector(backends)
+    for backend in backends:
+        start = time.perf_counter()
+        backend.warm()
+        print(f"{backend.name}: warm-up {time.perf_counter() - start:.2f}s")
+        latencies, errors, words = [], 0, 0
+        for name, audio, sr, expected in fixtures:
+            start = time.perf_counter()
+            first = None
+            text = ""
+            try:
+                for text in backend.stream(audio, sr):
+                    first = first or time.perf_counter() - start
+            except Exception as e:
+                print(f"  {name}: failed ({e})")
+                continue
+            total = time.perf_counter() - start
+            latencies.append(total)
+            selector._record(backend, total)
+            if expected is not None:
+                errors += word_errors(expected, text.lower().replace(",", "").replace(".", "").split())
+                words += len(expected)
+            print(f"  {name:24s} {len(audio) / sr:5.2f}s audio  first text {first or 0:5.2f}s  "
+                  f"final {total:5.2f}s  \"{text}\"")
+        if latencies:
+            wer = f", word errors {errors}/{words}" if words else ""
+            print(f"{backend.name}: median {np.median(latencies):.2f}s, max {np.max(latencies):.2f}s per turn{wer}")
+    if backends:
+        print(f"measured: {selector.report()}; next turn goes to {selector.ranked()[0].name}")
@@ -2,8 +2,11 @@ import os
 import sounddevice as sd
 import soundfile as sf
 import numpy as np
-import requests
+import elevenlabs_client
 from io import BytesIO
+from vad_recorder import record_until_silence
+from audio_upload import encode_for_upload
+from audio_devices import AudioDeviceManager
 
 # ----------------------------
 # CONFIG
@@ -15,42 +18,32 @@ if not API_KEY:
 AGENT_ID = "agent_1601khf3r1jfff2saez29f6frfny"  # your agent ID
 VOICE_ID = "XdflFrQO8wbGpWMNZHFr"                  # your TTS voice ID
 
-RECORD_SECONDS = 5
+RECORD_SECONDS = 15  # max utterance length, recording ends on silence
 
 # ----------------------------
-# auto-select duplex audio device
+# auto-select duplex audio device (remembered in .audio_device.json)
 # ----------------------------
-for i, d in enumerate(sd.query_devices()):
-    if d["max_input_channels"] > 0 and d["max_output_channels"] > 0:
-        sd.default.device = (i, i)
-        print("Using audio device:", d["name"])
-        DEFAULT_SR = int(d['default_samplerate'])
-        break
-else:
-    raise RuntimeError("No suitable input/output device found")
+devices = AudioDeviceManager()   # its samplerate can change after a replug, so read it per turn
 
 # ----------------------------
 # HELPER: Record from mic
 # ----------------------------
-def record_audio(seconds, samplerate):
-    print(f"Recording for {seconds} seconds at {samplerate} Hz...")
-    audio = sd.rec(int(seconds * samplerate), samplerate=samplerate, channels=1, dtype="float32")
-    sd.wait()
-    return audio.flatten()
+def record_audio(seconds):
+    # Stops on its own once the speaker goes quiet; `seconds` is only the upper bound.
+    # Recorded at devices.samplerate
+    devices.ensure()
+    return devices.with_device(record_until_silence, max_seconds=seconds)
 
 # ----------------------------
 # HELPER: Speech-to-text using Scribe v2
 # ----------------------------
 def speech_to_text(audio_np, samplerate):
-    wav_file = "temp.wav"
-    sf.write(wav_file, audio_np, samplerate)
-
     url = "https://api.elevenlabs.io/v1/speech-to-text"
     headers = {"xi-api-key": API_KEY}
-    files = {"file": ("temp.wav", open(wav_file, "rb"), "audio/wav")}
+    files = {"file": encode_for_upload(audio_np, samplerate)}
     data = {"model_id": "scribe_v2"}  # correct model for Scribe v2
 
-    r = requests.post(url, headers=headers, files=files, data=data)
+    r = elevenlabs_client.post(url, headers=headers, files=files, data=data)
     if r.status_code != 200:
         print("STT failed:", r.text)
         return ""
@@ -67,7 +60,7 @@ def speak(text):
         "text": text,
         "model_id": "eleven_monolingual_v1"
     }
-    r = requests.post(url, headers=headers, json=payload)
+    r = elevenlabs_client.post(url, headers=headers, json=payload)
     if r.status_code != 200:
         print("TTS failed:", r.text)
         return
@@ -104,7 +97,7 @@ def agent_reply(user_text):
         "new_turns_limit": 1
     }
 
-    r = requests.post(url, headers=headers, json=payload)
+    r = elevenlabs_client.post(url, headers=headers, json=payload)
     if r.status_code != 200:
         print("Agent call failed:", r.text)
         return ""
@@ -123,15 +116,19 @@ def agent_reply(user_text):
 # ----------------------------
 # MAIN LOOP
 # ----------------------------
+elevenlabs_client.prewarm()
 print("\nVoice agent ready! Speak into your mic.")
 print("Press Enter to start recording a message, Ctrl+C to exit.\n")
 
 try:
     while True:
         input("Press Enter to record your message...")
-        audio_np = record_audio(RECORD_SECONDS, DEFAULT_SR)
+        audio_np = record_audio(RECORD_SECONDS)
+        if not len(audio_np):
+            print("No speech detected.\n")
+            continue
         print("Processing...")
-        user_text = speech_to_text(audio_np, DEFAULT_SR)
+        user_text = speech_to_text(audio_np, devices.samplerate)
         if not user_text:
             print("No speech detected.\n")
             continue
@@ -0,0 +1,363 @@
+import os
+import time
+import queue
+import threading
+import numpy as np
+import sounddevice as sd
+import elevenlabs_client
+from lipsync import AudioClock, SyncStats
+from envelope import EnvelopeExtractor
+
+# ---------------------------- CONFIG ----------------------------
+# ElevenLabs can stream raw 16-bit little-endian PCM, which we can decode chunk by
+# chunk without waiting for a complete WAV/MP3 container.
+STREAM_SR = 22050
+
+PREBUFFER_SECONDS = 0.1    # audio to queue up before the output stream starts
+RING_SECONDS = 30          # producer blocks if it gets this far ahead of playback
+HTTP_CHUNK_BYTES = 4096
+
+
+# ---------------------------- RING BUFFER ----------------------------
+class RingBuffer:
+    """Single-producer / single-consumer float32 ring buffer.
+
+    The HTTP reader writes decoded samples, the sounddevice callback reads them.
+    """
+
+    def __init__(self, capacity):
+        self.buf = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.read_pos = 0
+        self.write_pos = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    @property
+    def available(self):
+        return self.write_pos - self.read_pos
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=np.float32)
+        offset = 0
+        while offset < len(samples):
+            with self.cond:
+                while self.capacity - self.available == 0 and not self.closed:
+                    self.cond.wait(0.05)
+                if self.closed:
+                    return
+                n = min(len(samples) - offset, self.capacity - self.available)
+                start = self.write_pos % self.capacity
+                first = min(n, self.capacity - start)
+                self.buf[start:start + first] = samples[offset:offset + first]
+                self.buf[:n - first] = samples[offset + first:offset + n]
+                self.write_pos += n
+                offset += n
+
+    def read_into(self, out):
+        """Fills `out` with buffered samples (zero-padding on underrun) and returns how many were real."""
+        with self.cond:
+            n = min(len(out), self.available)
+            start = self.read_pos % self.capacity
+            first = min(n, self.capacity - start)
+            out[:first] = self.buf[start:start + first]
+            out[first:n] = self.buf[:n - first]
+            out[n:] = 0
+            self.read_pos += n
+            self.cond.notify()
+        return n
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+# ---------------------------- STREAMING RESAMPLER ----------------------------
+class StreamResampler:
+    """Linear resampler that keeps its phase between chunks so there are no seams."""
+
+    def __init__(self, orig_sr, target_sr):
+        self.step = orig_sr / target_sr
+        self.passthrough = orig_sr == target_sr
+        self.pos = 0.0
+        self.tail = np.zeros(0, dtype=np.float32)
+
+    def process(self, chunk):
+        if self.passthrough:
+            return chunk
+        buf = np.concatenate([self.tail, chunk])
+        if len(buf) < 2 or len(buf) - 1 < self.pos:
+            self.tail = buf
+            return np.zeros(0, dtype=np.float32)
+        n = int((len(buf) - 1 - self.pos) / self.step) + 1
+        idx = self.pos + np.arange(n) * self.step
+        out = np.interp(idx, np.arange(len(buf)), buf).astype(np.float32)
+        next_pos = self.pos + n * self.step
+        keep_from = int(next_pos)
+        self.tail = buf[keep_from:]
+        self.pos = next_pos - keep_from
+        return out
+
+
+# ---------------------------- HTTP -> PCM CHUNKS ----------------------------
+def iter_tts_pcm(text, api_key, voice_id, model_id="eleven_monolingual_v1",
+                 sr=STREAM_SR, base_url=elevenlabs_client.BASE_URL):
+    """Yields float32 mono chunks of the synthesized reply as the HTTP body arrives."""
+    url = f"{base_url}/v1/text-to-speech/{voice_id}/stream"
+    headers = {"xi-api-key": api_key, "Content-Type": "application/json"}
+    params = {"output_format": f"pcm_{sr}"}
+    payload = {"text": text, "model_id": model_id}
+    r = elevenlabs_client.post(url, headers=headers, params=params, json=payload, stream=True)
+    try:
+        if r.status_code != 200:
+            r.read()
+            print("TTS stream failed:", r.text)
+            return
+        leftover = b""
+        for raw in r.iter_bytes(chunk_size=HTTP_CHUNK_BYTES):
+            raw = leftover + raw
+            usable = len(raw) - (len(raw) % 2)   # int16 samples can straddle chunks
+            leftover = raw[usable:]
+            if usable:
+                yield np.frombuffer(raw[:usable], dtype="<i2").astype(np.float32) / 32768.0
+    finally:
+        r.close()
+
+
+def prefetch(chunks):
+    """Starts pulling `chunks` on a background thread right away and yields them in order.
+
+    Lets the TTS request get going while something else (e.g. the intro meow) is playing.
+    """
+    q = queue.Queue()
+
+    def pull():
+        try:
+            for chunk in chunks:
+                q.put(chunk)
+        except Exception as e:
+            q.put(e)
+        finally:
+            q.put(None)
+
+    threading.Thread(target=pull, daemon=True).start()
+
+    def drain():
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    return drain()
+
+
+# ---------------------------- STREAMING PLAYER ----------------------------
+class StreamingPlayer:
+    """Plays PCM chunks through one OutputStream while they are still arriving.
+
+    `on_frame(row)` is called from a helper thread with a [level, low, high]
+    envelope row (see envelope.py) for each 1/fps slice of audio, at the moment
+    that slice starts playing, so the jaw motors are driven from exactly the
+    same samples that reach the speaker. Given an AudioEngine, the audio is
+    queued on its long-lived stream instead of opening a new one.
+
+    `on_envelope(levels, start)` is called once all the audio has arrived, with every
+    envelope row and the monotonic time the first sample reached (or will reach) the
+    speaker, so word timings can be derived from the real audio and anchored to it.
+    """
+
+    def __init__(self, sr, out_sr=None, on_frame=None, fps=30,
+                 prebuffer_seconds=PREBUFFER_SECONDS, external_levels=False, engine=None, on_voice=None,
+                 on_envelope=None):
+        self.sr = sr
+        self.engine = engine       # AudioEngine to play through instead of opening a stream
+        self.on_voice = on_voice   # called with the engine voice once it is queued
+        self.out_sr = out_sr or sr
+        self.on_frame = on_frame
+        self.on_envelope = on_envelope
+        self.levels = []           # every envelope row so far, for on_envelope
+        self.external_levels = external_levels   # caller supplies levels via push_levels()
+        self.frame_size = self.out_sr // fps
+        self.prebuffer = int(prebuffer_seconds * self.out_sr)
+        self.ring = RingBuffer(int(RING_SECONDS * self.out_sr))
+        self.resampler = StreamResampler(sr, self.out_sr)
+        self.frames = queue.Queue()
+        self.done = threading.Event()
+        self.clock = AudioClock(self.out_sr)
+        self.sync = SyncStats()
+        self.latency = 0.0
+        self.played = 0
+        self.written = 0
+        self.first_audio_time = None
+        # the FFT bands are only worth computing when they drive the motors
+        self._envelope = EnvelopeExtractor(self.out_sr, fps, bands=on_frame is not None)
+        self._env_index = 0
+        self.voice = None
+        self.motor_thread = None
+
+    def _callback(self, outdata, frames, time_info, status):
+        n = self.ring.read_into(outdata[:, 0])
+        self.clock.update(self.played, time_info, self.latency)
+        if n and self.first_audio_time is None:
+            self.first_audio_time = time.perf_counter()
+        self.played += n
+        if n < frames and self.ring.closed and self.ring.available == 0:
+            raise sd.CallbackStop
+
+    def _push_envelope(self, samples):
+        # the extractor keeps a running peak, since we never see the whole clip
+        self.push_levels(self._envelope.process(samples))
+
+    def push_levels(self, levels):
+        """Queues precomputed levels or envelope rows for the audio about to be written, one per frame."""
+        for level in np.asarray(levels).tolist():
+            if self.on_frame is not None:
+                self.frames.put((self._env_index * self.frame_size, level))
+            if self.on_envelope is not None:
+                self.levels.append(level)
+            self._env_index += 1
+
+    def _motor_loop(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            start_sample, level = item
+            late = self.clock.wait_until(start_sample, self.done)
+            if late is None:
+                continue
+            if late > self.frame_size / self.out_sr and not self.frames.empty():
+                self.sync.skipped += 1
+                continue
+            self.on_frame(level)
+            self.sync.add(time.monotonic() - self.clock.time_of(start_sample))
+
+    def _report_envelope(self):
+        # the clock is anchored by the first block that plays this voice
+        while self.clock.time_of(0) is None and not self.done.is_set():
+            time.sleep(0.005)
+        start = self.clock.time_of(0)
+        if start is not None:
+            self.on_envelope(self.levels, start)
+
+    def _start(self, stream):
+        if stream is not None:
+            stream.start()
+        else:
+            # the engine's stream is already running: the voice is audible from the next block
+            self.voice = self.engine.queue_stream(self.ring, ducks=True)
+            self.clock, self.done = self.voice.clock, self.voice.done
+            self.first_audio_time = time.perf_counter()
+            if self.on_voice is not None:
+                self.on_voice(self.voice)
+        if self.motor_thread is not None:
+            self.motor_thread.start()
+        return True
+
+    def play(self, chunks):
+        """Consumes `chunks` (an iterator of float32 arrays) and blocks until playback ends."""
+        start_time = time.perf_counter()
+        stream = None
+        if self.engine is None:
+            stream = sd.OutputStream(samplerate=self.out_sr, channels=1, dtype="float32",
+                                     callback=self._callback, finished_callback=self.done.set)
+            self.latency = stream.latency
+        if self.on_frame is not None:
+            self.motor_thread = threading.Thread(target=self._motor_loop, daemon=True)
+        started = False
+        own_levels = (self.on_frame is not None or self.on_envelope is not None) and not self.external_levels
+        try:
+            for chunk in chunks:
+                if self.voice is not None and self.voice.done.is_set():
+                    break   # cut off (barge-in): stop downloading the rest
+                chunk = self.resampler.process(chunk)
+                if not len(chunk):
+                    continue
+                if own_levels:
+                    self._push_envelope(chunk)
+                self.ring.write(chunk)
+                self.written += len(chunk)
+                if not started and self.written >= self.prebuffer:
+                    started = self._start(stream)
+            if own_levels:
+                self.push_levels(self._envelope.flush())   # the partial last frame
+            self.ring.close()
+            if self.written and not started:
+                started = self._start(stream)
+            if started and self.on_envelope is not None:
+                self._report_envelope()
+            if self.voice is not None:
+                self.voice.wait()
+            elif started:
+                self.done.wait()
+        finally:
+            self.ring.close()
+            if stream is not None:
+                stream.close()
+            if self.voice is not None:
+                self.voice.stop()
+                self.played = self.voice.played
+            self.done.set()
+            if started and self.motor_thread is not None:
+                self.frames.put(None)
+                self.motor_thread.join()
+        first_audio = None
+        if self.first_audio_time is not None:
+            first_audio = self.first_audio_time - start_time
+        return {"first_audio_s": first_audio, "samples": self.played, "sr": self.out_sr, "sync": self.sync}
+
+
+def play_pcm_stream(chunks, sr, out_sr=None, on_frame=None, fps=30, engine=None, on_voice=None,
+                    on_envelope=None):
+    return StreamingPlayer(sr, out_sr=out_sr, on_frame=on_frame, fps=fps,
+                           engine=engine, on_voice=on_voice, on_envelope=on_envelope).play(chunks)
+
+
+# ---------------------------- TEST BLOCK (local stand-in server) ----------------------------
+if __name__ == "__main__":
+    # Serves a bundled cat sound as raw PCM, trickled out slower than real time,
+    # so we can see playback start long before the "synthesis" finishes.
+    import glob
+    import soundfile as sf
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    wav = sorted(glob.glob(os.path.join("cat_sounds", "*.wav")))[0]
+    data, file_sr = sf.read(wav, dtype="float32")
+    if data.ndim > 1:
+        data = np.mean(data, axis=1)
+    data = StreamResampler(file_sr, STREAM_SR).process(data)
+    pcm = (np.clip(data, -1, 1) * 32767).astype("<i2").tobytes()
+    bytes_per_second = STREAM_SR * 2
+
+    class SlowTTSHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.end_headers()
+            time.sleep(0.3)   # pretend the first chunk takes a while to synthesize
+            for i in range(0, len(pcm), HTTP_CHUNK_BYTES):
+                self.wfile.write(pcm[i:i + HTTP_CHUNK_BYTES])
+                self.wfile.flush()
+                time.sleep(HTTP_CHUNK_BYTES / bytes_per_second * 0.9)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowTTSHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    out_sr = int(sd.query_devices(kind="output")["default_samplerate"])
+    levels = []
+    t0 = time.perf_counter()
+    stats = play_pcm_stream(iter_tts_pcm("meow", "test-key", "test-voice", base_url=base_url),
+                            STREAM_SR, out_sr=out_sr, on_frame=levels.append)
+    total = time.perf_counter() - t0
+    print(f"Clip: {len(pcm) / bytes_per_second:.2f}s, whole request: {total:.2f}s")
+    print(f"First audio after {stats['first_audio_s']:.3f}s, {len(levels)} motor frames")
+    server.shutdown()
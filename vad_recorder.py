@@ -0,0 +1,202 @@
+import queue
+import numpy as np
+import sounddevice as sd
+
+# ---------------------------- CONFIG ----------------------------
+FRAME_MS = 20                 # VAD decision granularity
+BLOCK_FRAMES = 5              # frames handed over per InputStream callback (100 ms)
+CALIBRATION_SECONDS = 0.2     # initial noise floor estimate
+SPEECH_MARGIN_DB = 12.0       # how far above the noise floor counts as speech
+FRICATIVE_ZCR = 0.25          # quieter frames still count if they are "hissy" (s, f, sh...)
+ONSET_FRAMES = 3              # consecutive speech frames needed to start (60 ms)
+PRE_ROLL_SECONDS = 0.3        # audio kept from before the detected onset
+TAIL_SECONDS = 0.2            # audio kept after the last speech frame
+NOISE_ADAPT = 0.05            # how fast the noise floor follows quiet frames
+
+MAX_RECORD_SECONDS = 15
+SILENCE_HANGOVER_SECONDS = 0.8
+WAIT_FOR_SPEECH_SECONDS = 10
+INPUT_TIMEOUT = 1.0           # no mic block for this long: the device is gone (same as audio_engine)
+
+
+# ---------------------------- VAD ----------------------------
+def frame_features(frames):
+    """Per-frame energy (dB) and zero-crossing rate for a (num_frames, frame_len) array."""
+    energy_db = 10 * np.log10(np.mean(np.square(frames), axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frames.shape[1] - 1)
+    return energy_db, zcr
+
+
+class VoiceActivityDetector:
+    """Energy + zero-crossing VAD with an adaptive noise floor."""
+
+    def __init__(self, margin_db=SPEECH_MARGIN_DB, fricative_zcr=FRICATIVE_ZCR):
+        self.margin_db = margin_db
+        self.fricative_zcr = fricative_zcr
+        self.noise_floor = None
+
+    def calibrate(self, frames):
+        energy_db, _ = frame_features(frames)
+        self.noise_floor = float(np.median(energy_db))
+
+    def process(self, frames):
+        energy_db, zcr = frame_features(frames)
+        if self.noise_floor is None:
+            self.noise_floor = float(np.min(energy_db))
+        loud = energy_db > self.noise_floor + self.margin_db
+        hissy = (energy_db > self.noise_floor + self.margin_db / 2) & (zcr > self.fricative_zcr)
+        is_speech = loud | hissy
+        quiet = energy_db[~is_speech]
+        if len(quiet):
+            self.noise_floor += NOISE_ADAPT * (float(np.mean(quiet)) - self.noise_floor)
+        return is_speech
+
+
+# ---------------------------- SEGMENTER ----------------------------
+class SpeechSegmenter:
+    """Collects frames, starts on speech onset and stops after a silence hangover."""
+
+    def __init__(self, samplerate, max_seconds=MAX_RECORD_SECONDS,
+                 hangover_seconds=SILENCE_HANGOVER_SECONDS,
+                 wait_seconds=WAIT_FOR_SPEECH_SECONDS, noise_floor=None):
+        self.frame_len = int(samplerate * FRAME_MS / 1000)
+        frames_per_second = 1000 / FRAME_MS
+        self.hangover_frames = int(hangover_seconds * frames_per_second)
+        self.max_frames = int(max_seconds * frames_per_second)
+        self.wait_frames = int(wait_seconds * frames_per_second)
+        self.pre_roll_frames = int(PRE_ROLL_SECONDS * frames_per_second)
+        self.tail_frames = int(TAIL_SECONDS * frames_per_second)
+        self.calibration_frames = int(CALIBRATION_SECONDS * frames_per_second)
+        self.vad = VoiceActivityDetector()
+        self.vad.noise_floor = noise_floor   # known already (e.g. from barge-in): skip calibration
+        self.frames = []          # list of (frame_len,) arrays, one per frame
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.onset = None         # index of the first speech frame
+        self.last_speech = None
+        self.run = 0
+        self.done = False
+
+    def feed(self, samples):
+        """Adds raw samples; returns True once the utterance is complete (or we gave up)."""
+        if self.done:
+            return True
+        data = np.concatenate([self.pending, samples])
+        num = len(data) // self.frame_len
+        self.pending = data[num * self.frame_len:]
+        if not num:
+            return False
+        block = data[:num * self.frame_len].reshape(num, self.frame_len)
+        base = len(self.frames)
+        self.frames.extend(block)
+        if self.vad.noise_floor is None and len(self.frames) < self.calibration_frames:
+            return False
+        if self.vad.noise_floor is None:
+            self.vad.calibrate(np.stack(self.frames))
+        for i, speech in enumerate(self.vad.process(block)):
+            idx = base + i
+            if speech:
+                self.run += 1
+                self.last_speech = idx
+                if self.onset is None and self.run >= ONSET_FRAMES:
+                    self.onset = idx - ONSET_FRAMES + 1
+            else:
+                self.run = 0
+            if self.onset is not None:
+                if idx - self.last_speech >= self.hangover_frames or idx - self.onset >= self.max_frames:
+                    self.done = True
+                    break
+            elif idx >= self.wait_frames:
+                self.done = True
+                break
+        return self.done
+
+    def audio(self):
+        """Trimmed utterance (pre-roll + speech + short tail), or an empty array if nobody spoke."""
+        if self.onset is None:
+            return np.zeros(0, dtype=np.float32)
+        start = max(0, self.onset - self.pre_roll_frames)
+        end = min(len(self.frames), self.last_speech + 1 + self.tail_frames)
+        return np.concatenate(self.frames[start:end]).astype(np.float32)
+
+
+# ---------------------------- RECORDING ----------------------------
+def after_wake(wake, segmenter):
+    """A feed(samples, playing=False) that holds samples back from the segmenter until
+    the wake detector starts the turn, then hands it the turn's opening audio."""
+    started = []
+
+    def feed(samples, playing=False):
+        if not started:
+            samples = wake.feed(samples, playing)
+            if samples is None:
+                return False
+            started.append(True)
+            if segmenter.vad.noise_floor is None:
+                segmenter.vad.noise_floor = wake.noise_floor
+            print("Listening... (I'll stop when you do)")
+        return segmenter.feed(samples)
+    return feed
+
+
+def record_until_silence(samplerate, max_seconds=MAX_RECORD_SECONDS,
+                         hangover_seconds=SILENCE_HANGOVER_SECONDS,
+                         wait_seconds=WAIT_FOR_SPEECH_SECONDS, device=None, engine=None,
+                         since=None, noise_floor=None, wake=None):
+    # with an engine, `since` starts from mic audio already captured (e.g. a barge-in's pre-roll).
+    # With `wake` (a wake_word.WakeDetector) nothing is recorded until it says the turn started.
+    segmenter = SpeechSegmenter(samplerate, max_seconds, hangover_seconds, wait_seconds, noise_floor)
+    feed = segmenter.feed if wake is None else after_wake(wake, segmenter)
+    if wake is None:
+        print("Listening... (start talking, I'll stop when you do)")
+    else:
+        print("Waiting for you to talk..." if wake.spotter is None else "Waiting for the wake word...")
+    if engine is not None:
+        # the engine's duplex stream is always capturing: just follow its input ring
+        # (a block at a time while waiting for the wake detector: waking every 100 ms is plenty)
+        reader = engine.reader(since)
+        idle = segmenter.frame_len * BLOCK_FRAMES if wake is not None else 1
+        while not feed(reader.read(min_samples=1 if segmenter.frames else idle), engine.playing):
+            pass
+    else:
+        blocks = queue.Queue()
+
+        def callback(indata, frames, time_info, status):
+            blocks.put(indata[:, 0].copy())
+
+        with sd.InputStream(samplerate=samplerate, channels=1, dtype="float32", device=device,
+                            blocksize=segmenter.frame_len * BLOCK_FRAMES, callback=callback):
+            while True:
+                try:
+                    block = blocks.get(timeout=INPUT_TIMEOUT)
+                except queue.Empty:
+                    # unplugged: PortAudio stops calling back without raising, so say so
+                    # the way CaptureReader.read does (AudioDeviceManager.with_device retries)
+                    raise sd.PortAudioError(f"no audio input for {INPUT_TIMEOUT:.1f}s") from None
+                if feed(block):
+                    break
+    audio = segmenter.audio()
+    print(f"Captured {len(audio) / samplerate:.2f}s of speech")
+    return audio
+
+
+# ---------------------------- TEST BLOCK ----------------------------
+if __name__ == "__main__":
+    # Synthetic turn: room noise, a 1.2 s "utterance", then silence.
+    sr = 16000
+    rng = np.random.default_rng(0)
+    t = np.arange(int(1.2 * sr)) / sr
+    voiced = 0.3 * np.sin(2 * np.pi * 180 * t) * (1 + np.sin(2 * np.pi * 4 * t)) / 2
+    signal = np.concatenate([np.zeros(sr // 2), voiced, np.zeros(4 * sr)]).astype(np.float32)
+    signal += 0.003 * rng.standard_normal(len(signal)).astype(np.float32)
+
+    segmenter = SpeechSegmenter(sr)
+    block = segmenter.frame_len * BLOCK_FRAMES
+    consumed = 0
+    for i in range(0, len(signal), block):
+        consumed = i + block
+        if segmenter.feed(signal[i:i + block]):
+            break
+    audio = segmenter.audio()
+    print(f"Stopped listening after {consumed / sr:.2f}s (fixed window: 5.00s)")
+    print(f"Trimmed clip: {len(audio) / sr:.2f}s, {len(audio) * 2} bytes as 16-bit PCM")
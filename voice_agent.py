@@ -1,6 +1,6 @@
 import os
 import json
-import requests
+import elevenlabs_client
 import numpy as np
 import sounddevice as sd
 import soundfile as sf
@@ -82,7 +82,7 @@ payload = {
 
 print("Requesting ElevenLabs TTS...")
 
-r = requests.post(url, headers=headers, json=payload)
+r = elevenlabs_client.post(url, headers=headers, json=payload)
 
 if r.status_code != 200:
     print(r.text)
@@ -0,0 +1,327 @@
+import os
+import glob
+from functools import lru_cache
+import numpy as np
+import soundfile as sf
+from resampler import resample
+from vad_recorder import FRAME_MS, ONSET_FRAMES, PRE_ROLL_SECONDS, VoiceActivityDetector, frame_features
+
+# ---------------------------- CONFIG ----------------------------
+MFCC_SR = 16000               # audio is box-decimated to about this rate for the features
+MFCC_WINDOW_MS = 25
+MFCC_HOP_MS = 10
+N_MELS = 26
+N_MFCC = 13                   # c0 (loudness) is dropped, the other 12 are compared
+KEYWORD_GAP_SECONDS = 0.3     # a pause this long ends the wake word candidate...
+KEYWORD_MAX_SECONDS = 1.5     # ...or it is cut here if they just keep talking
+KEYWORD_START_SLACK = 0.5     # the wake word may start this long into the candidate
+WAKE_THRESHOLD = 7.5          # mean MFCC distance along the best alignment that still counts as a match...
+WAKE_MARGIN = 1.5             # ...or, with several recordings, this times the worst match between them
+TRIM_DB = 35.0                # recordings are trimmed to where they are within this of their loudest frame
+HISTORY_SECONDS = PRE_ROLL_SECONDS + KEYWORD_MAX_SECONDS + 0.5
+
+
+# ---------------------------- MFCC ----------------------------
+@lru_cache(maxsize=None)
+def mel_filterbank(sr, n_fft, n_mels=N_MELS):
+    """(n_fft // 2 + 1, n_mels) triangular filters, evenly spaced on the mel scale."""
+    mel = lambda f: 2595 * np.log10(1 + f / 700)
+    edges = 700 * (10 ** (np.linspace(mel(60), mel(sr / 2 * 0.95), n_mels + 2) / 2595) - 1)
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+    lo, mid, hi = edges[:-2], edges[1:-1], edges[2:]
+    up = (freqs[:, None] - lo) / (mid - lo)
+    down = (hi - freqs[:, None]) / (hi - mid)
+    return np.maximum(0, np.minimum(up, down)).astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def dct_matrix(n_mels=N_MELS, n_mfcc=N_MFCC):
+    n = np.arange(n_mels)
+    return np.cos(np.pi / n_mels * (n[:, None] + 0.5) * np.arange(n_mfcc)).astype(np.float32)
+
+
+def mfcc(audio, sr):
+    """(frames, N_MFCC - 1) cepstra every MFCC_HOP_MS, mean-normalized over the clip so
+    the microphone and room colouring mostly cancel out."""
+    q = max(1, sr // MFCC_SR)
+    audio = np.asarray(audio, dtype=np.float32)
+    audio = audio[:len(audio) // q * q].reshape(-1, q).mean(axis=1)
+    sr = sr / q
+    window, hop = int(sr * MFCC_WINDOW_MS / 1000), int(sr * MFCC_HOP_MS / 1000)
+    if len(audio) < window:
+        return np.zeros((0, N_MFCC - 1), dtype=np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(audio, window)[::hop] * np.hamming(window).astype(np.float32)
+    n_fft = 1 << (window - 1).bit_length()
+    power = np.square(np.abs(np.fft.rfft(frames, n_fft, axis=1)))
+    cepstra = np.log(power @ mel_filterbank(sr, n_fft) + 1e-8) @ dct_matrix()
+    cepstra = cepstra[:, 1:]
+    return (cepstra - cepstra.mean(axis=0)).astype(np.float32)
+
+
+def align(template, features, start_slack):
+    """Open-ended DTW of `template` against the beginning of `features`.
+
+    The match may start anywhere in the first `start_slack` frames and end anywhere.
+    Steps are (1,1), (1,2) and (2,1) with the skipped frame's distance added, so the
+    spoken word can be up to twice as fast or slow as the template. Every step only
+    needs the two previous rows, so each template row is one vectorized update.
+    Returns (mean distance along the best path, index of the frame after the match).
+    """
+    t, n = len(template), len(features)
+    dist = np.sqrt(np.sum(np.square(template[:, None, :] - features[None, :, :]), axis=2))
+    cost = np.full((t + 2, n + 2), np.inf, dtype=np.float32)   # cost[i + 2, j + 2]: template i aligned to frame j
+    cost[1, 1:min(start_slack, n) + 2] = 0.0
+    for i in range(t):
+        d = dist[i]
+        prev = dist[i - 1] if i else np.full(n, np.inf, dtype=np.float32)
+        diagonal = cost[i + 1, 1:-1]
+        skip_frame = cost[i + 1, :-2] + np.concatenate([[np.inf], d[:-1]])   # (1,2): frame j-1 too
+        skip_row = cost[i, 1:-1] + prev                                      # (2,1): row i-1 too
+        cost[i + 2, 2:] = d + np.minimum(diagonal, np.minimum(skip_frame, skip_row))
+    end = int(np.argmin(cost[-1, 2:]))
+    return float(cost[-1, end + 2]) / (2 * t), end + 1
+
+
+def loud_span(audio, sr):
+    """(start, end) samples of a clip without the silence around it."""
+    frame_len = int(sr * FRAME_MS / 1000)
+    n = len(audio) // frame_len
+    if not n:
+        return 0, len(audio)
+    energy_db, _ = frame_features(audio[:n * frame_len].reshape(n, frame_len))
+    loud = np.flatnonzero(energy_db > energy_db.max() - TRIM_DB)
+    return loud[0] * frame_len, (loud[-1] + 1) * frame_len
+
+
+class KeywordSpotter:
+    """Matches speech against a few recordings of the wake word.
+
+    Templates are reduced to MFCC frames once; spotting is a DTW alignment of each
+    template against the start of a candidate (a burst of speech the energy gate
+    already found), so it costs nothing while the room is quiet. With no threshold
+    given and several recordings, it is set from how well they match each other.
+    """
+
+    def __init__(self, templates, samplerate, threshold=None):
+        self.samplerate = samplerate
+        self.templates = [mfcc(t[slice(*loud_span(t, samplerate))], samplerate) for t in templates]
+        self.templates = [t for t in self.templates if len(t)]
+        if threshold is None:
+            threshold = WAKE_THRESHOLD
+            if len(self.templates) > 1:
+                threshold = WAKE_MARGIN * max(align(a, b, 0)[0] for a in self.templates
+                                              for b in self.templates if a is not b)
+        self.threshold = threshold
+
+    @classmethod
+    def from_folder(cls, folder, samplerate, threshold=None):
+        """Every WAV in `folder` as a template; None if there are none (any speech wakes the cat)."""
+        templates = []
+        for path in sorted(glob.glob(os.path.join(folder, "*.wav"))):
+            data, sr = sf.read(path, dtype="float32")
+            data = resample(data, sr, samplerate)
+            templates.append(data.mean(axis=1) if data.ndim > 1 else data)
+        if not templates:
+            return None
+        print(f"Loaded {len(templates)} wake word recordings from {folder}")
+        return cls(templates, samplerate, threshold)
+
+    def spot(self, audio):
+        """Sample index in `audio` right after the wake word, or None if it isn't there."""
+        start, stop = loud_span(audio, self.samplerate)
+        features = mfcc(audio[start:stop], self.samplerate)
+        if not len(features):
+            return None
+        slack = int(KEYWORD_START_SLACK * 1000 / MFCC_HOP_MS)
+        best, end = min(align(t, features, slack) for t in self.templates)
+        if best > self.threshold:
+            return None
+        end = start + end * int(self.samplerate * MFCC_HOP_MS / 1000) + int(self.samplerate * MFCC_WINDOW_MS / 1000)
+        return min(len(audio), end)
+
+
+# ---------------------------- WAKE DETECTOR ----------------------------
+class WakeDetector:
+    """Decides, from the always-on mic, when the user's turn starts.
+
+    feed() it mic samples as they arrive. While the room is quiet that is the energy
+    VAD on 20 ms frames plus a copy into a preallocated history ring; nothing else
+    runs. On a speech onset, without a spotter, the turn starts right there. With a
+    KeywordSpotter the burst (until a short pause, or KEYWORD_MAX_SECONDS) is checked
+    for the wake word first: the turn then starts after it, and other talk is ignored
+    until the next pause. The detector (and its learned noise floor) is meant to be
+    kept across turns.
+    """
+
+    def __init__(self, samplerate, spotter=None, noise_floor=None):
+        self.samplerate = samplerate
+        self.spotter = spotter
+        self.frame_len = int(samplerate * FRAME_MS / 1000)
+        frames_per_second = 1000 / FRAME_MS
+        self.pre_roll_frames = int(PRE_ROLL_SECONDS * frames_per_second)
+        self.gap_frames = int(KEYWORD_GAP_SECONDS * frames_per_second)
+        self.max_frames = int(KEYWORD_MAX_SECONDS * frames_per_second)
+        self.vad = VoiceActivityDetector()
+        self.vad.noise_floor = noise_floor
+        self.capacity = int(HISTORY_SECONDS * frames_per_second)
+        self.history = np.zeros((self.capacity, self.frame_len), dtype=np.float32)
+        self.carry = np.zeros(self.frame_len, dtype=np.float32)
+        self.reset()
+
+    @property
+    def noise_floor(self):
+        return self.vad.noise_floor
+
+    def reset(self):
+        self.frames = 0           # frames seen since the last reset
+        self.carried = 0
+        self.run = 0
+        self.onset = None
+        self.last_speech = None
+        self.ignoring = False     # talk that wasn't the wake word, until the next pause
+
+    def _frames_to_audio(self, start):
+        idx = np.arange(max(start, self.frames - self.capacity), self.frames) % self.capacity
+        return np.concatenate([self.history[idx].reshape(-1), self.carry[:self.carried]])
+
+    def feed(self, samples, playing=False):
+        """Returns None while waiting, then the audio the turn starts with (pre-roll
+        included, or what followed the wake word) once it has started. `playing` means
+        the speaker is busy: those frames can't start a turn or move the noise floor."""
+        total = self.carried + len(samples)
+        n = total // self.frame_len
+        if not n:
+            self.carry[self.carried:total] = samples
+            self.carried = total
+            return None
+        # the frame in progress is completed first, then whole frames go straight into the ring
+        head = self.frame_len - self.carried
+        base = self.frames
+        first = base % self.capacity
+        self.carry[self.carried:] = samples[:head]
+        self.history[first] = self.carry
+        rows = (first + np.arange(n)) % self.capacity
+        self.history[rows[1:]] = samples[head:head + (n - 1) * self.frame_len].reshape(n - 1, self.frame_len)
+        self.carried = total - n * self.frame_len
+        self.carry[:self.carried] = samples[len(samples) - self.carried:]
+        self.frames += n
+        if playing:
+            self.run, self.onset, self.ignoring = 0, None, False
+            return None
+
+        for i, speech in enumerate(self.vad.process(self.history[rows])):
+            idx = base + i
+            if speech:
+                self.run += 1
+                self.last_speech = idx
+            else:
+                self.run = 0
+                if self.ignoring and idx - self.last_speech >= self.gap_frames:
+                    self.ignoring = False
+            if self.ignoring:
+                continue
+            if self.onset is None:
+                if self.run >= ONSET_FRAMES:
+                    self.onset = idx - ONSET_FRAMES + 1
+                    if self.spotter is None:
+                        return self._start(self.onset - self.pre_roll_frames, 0)
+                continue
+            if idx - self.last_speech >= self.gap_frames or idx - self.onset >= self.max_frames:
+                start = max(self.onset - self.pre_roll_frames, self.frames - self.capacity)
+                candidate = self._frames_to_audio(start)[:(idx + 1 - start) * self.frame_len]
+                end = self.spotter.spot(candidate)
+                if end is not None:
+                    return self._start(start, end)
+                self.onset = None
+                self.ignoring = speech
+        return None
+
+    def _start(self, start, skip):
+        audio = self._frames_to_audio(start)[skip:]
+        self.reset()
+        return audio
+
+
+# ---------------------------- TEST BLOCK (benchmark) ----------------------------
+if __name__ == "__main__":
+    # Idle CPU: a real-time simulated engine feeding room noise while the wake loop
+    # follows it; the loop's own thread CPU time is enforced against a budget.
+    # Then keyword spotting on synthetic "words" (harmonic voices with a pitch contour).
+    import sys
+    import time
+    import threading
+    import types
+    import sounddevice as sd
+    from audio_engine import AudioEngine, CaptureRing
+    from vad_recorder import record_until_silence
+
+    IDLE_CPU_BUDGET = 0.01   # of one core here; a Pi 4 core is roughly 4-5x slower, so ~5% there
+    sr, block, seconds = 48000, 512, 10
+    rng = np.random.default_rng(0)
+
+    engine = AudioEngine(blocksize=block)
+    engine.samplerate = sr
+    engine.capture, engine.output = CaptureRing(10 * sr), CaptureRing(10 * sr)
+    engine._allocate(block)
+    engine.stream = types.SimpleNamespace(active=True)
+    noise = (0.002 * rng.standard_normal(seconds * sr)).astype(np.float32)
+    used = []
+
+    def listen():
+        start = time.thread_time()
+        try:
+            record_until_silence(sr, engine=engine, wake=WakeDetector(sr))
+        except sd.PortAudioError:
+            pass   # the input "went away" at the end of the run
+        used.append(time.thread_time() - start)
+
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+    ti = types.SimpleNamespace(currentTime=0.0, outputBufferDacTime=0.0)
+    out = np.zeros((block, 1), dtype=np.float32)
+    next_time = time.monotonic()
+    for pos in range(0, len(noise) - block, block):
+        engine._callback(noise[pos:pos + block, None], out, block, ti, None)
+        next_time += block / sr
+        time.sleep(max(0.0, next_time - time.monotonic()))
+    listener.join()
+    idle = used[0] / seconds
+    print(f"wake loop idle cost: {idle * 100:.2f}% of a core (budget {IDLE_CPU_BUDGET * 100:.0f}%)")
+
+    # keyword spotting: same contour at another speed/pitch/noise matches, other words don't
+    def word(contour, seconds, pitch=150, noise=0.003):
+        t = np.arange(int(seconds * sr)) / sr
+        f = pitch * np.interp(t / seconds, np.linspace(0, 1, len(contour)), contour)
+        phase = 2 * np.pi * np.cumsum(f) / sr
+        formant = np.interp(t / seconds, np.linspace(0, 1, len(contour)), contour[::-1])
+        tone = sum(np.sin(k * phase) * formant ** k for k in range(1, 8))
+        return (0.3 * tone * np.hanning(len(t)) + noise * rng.standard_normal(len(t))).astype(np.float32)
+
+    hey_cat = [1.0, 1.3, 0.8, 0.7, 1.2]
+    spotter = KeywordSpotter([word(hey_cat, 0.6), word(hey_cat, 0.7, pitch=140)], sr)
+    silence = np.zeros(int(0.4 * sr), dtype=np.float32)
+    trials = [("wake word, faster", word(hey_cat, 0.45, pitch=170, noise=0.01), True),
+              ("wake word, slower", word(hey_cat, 0.9, pitch=130, noise=0.01), True),
+              ("other word", word([0.8, 0.8, 1.3, 1.3, 0.9], 0.6, noise=0.01), False),
+              ("other word", word([1.2, 0.7, 1.0, 0.6, 0.9], 0.7, noise=0.01), False)]
+    failures = 0
+    for label, audio, expected in trials:
+        detector = WakeDetector(sr, spotter, noise_floor=10 * np.log10(0.003 ** 2))
+        stream = np.concatenate([silence, audio, silence, word([1.0, 1.1], 0.5, pitch=200), silence])
+        started = None
+        for pos in range(0, len(stream), block):
+            turn = detector.feed(stream[pos:pos + block])
+            if turn is not None:
+                started = pos + block - len(turn)
+                break
+        features = mfcc(audio[slice(*loud_span(audio, sr))], sr)
+        cost = min(align(t, features, 50)[0] for t in spotter.templates)
+        woke = started is not None
+        failures += woke != expected
+        where = f", turn starts {(started - len(silence)) / sr:.2f}s into it" if woke else ""
+        print(f"{label:18s} cost {cost:.2f} (threshold {spotter.threshold:.2f}): {'woke' if woke else 'ignored'}{where}")
+
+    if idle > IDLE_CPU_BUDGET:
+        sys.exit("over the idle CPU budget")
+    if failures:
+        sys.exit(f"{failures} keyword spotting mistakes")
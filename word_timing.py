@@ -0,0 +1,35 @@
+import re
+import numpy as np
+
+# ---------------------------- CONFIG ----------------------------
+CHARS_PER_SECOND = 15.0   # typical TTS speaking rate, used when we can't see the audio yet
+VOICED_THRESHOLD = 0.1    # same cut-off the jaw uses for "mouth closed"
+
+
+# Word timings are sent to the UI as [[start_seconds, end_char], ...]: at start_seconds
+# after playback begins, text[:end_char] should be visible.
+def word_spans(text):
+    return [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+
+
+def estimate_timings(text, chars_per_second=CHARS_PER_SECOND):
+    return [[round(start / chars_per_second, 3), end] for start, end in word_spans(text)]
+
+
+def timings_from_envelope(text, levels, fps=30, threshold=VOICED_THRESHOLD):
+    """Spreads the words over the voiced frames of the amplitude envelope.
+
+    Each word gets a share of the speaking time proportional to its length, and
+    pauses (frames under the threshold) push the following words back.
+    """
+    spans = word_spans(text)
+    levels = np.asarray(levels)
+    if levels.ndim > 1:
+        levels = levels[:, 0]   # [level, low, high] rows: the overall level
+    voiced = np.flatnonzero(levels > threshold)
+    if not spans or not len(voiced):
+        return estimate_timings(text)
+    weights = np.array([end - start + 1 for start, end in spans], dtype=np.float64)
+    starts = np.concatenate([[0.0], np.cumsum(weights)[:-1]]) / weights.sum()
+    frames = voiced[np.minimum((starts * len(voiced)).astype(int), len(voiced) - 1)]
+    return [[round(int(frame) / fps, 3), end] for frame, (_, end) in zip(frames, spans)]